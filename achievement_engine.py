@@ -0,0 +1,309 @@
+import copy
+import json
+import os
+from datetime import date, datetime
+
+ACHIEVEMENTS_PATH = "achievements.json"
+
+# Exercises offered in the app, and the workout categories they count towards
+AVAILABLE_EXERCISES = ["squat", "pushup", "curl", "lunge", "plank", "burpee"]
+EXERCISE_CATEGORIES = {
+    "squat": ("strength",),
+    "pushup": ("strength",),
+    "curl": ("strength",),
+    "lunge": ("strength", "balance"),
+    "plank": ("balance",),
+    "burpee": ("cardio",),
+    "jumping_jack": ("cardio",),
+}
+EXTREME_WEATHER = {"heat", "cold", "snow", "storm", "rain", "extreme"}
+DEFAULT_GOALS = {"weekly_workouts": 5, "weekly_calories": 2000, "target_form_score": 90}
+RECENT_FORM_SIZE = 5
+
+
+def load_definitions(path: str = ACHIEVEMENTS_PATH) -> dict:
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading achievements: {e}")
+    return {}
+
+
+def _week_key(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _weeks_between(earlier: str, later: str) -> int:
+    def monday(key):
+        year, week = key.split("-W")
+        return date.fromisocalendar(int(year), int(week), 1)
+    return (monday(later) - monday(earlier)).days // 7
+
+
+def new_state() -> dict:
+    """Per-user incremental counters. Everything here is O(1) to update per workout."""
+    return {
+        "streak": 0,
+        "best_streak": 0,
+        "last_active_day": None,
+        "gap_days": 0,
+        # ISO week -> bitmask of active weekdays (bit 0 = Monday); current and previous week only
+        "week_bitmaps": {},
+        "best_form": 0.0,
+        "best_calories": 0.0,
+        "early_workouts": 0,
+        "late_workouts": 0,
+        "long_workouts": 0,
+        "category_workouts": {},
+        "perfect_balance": 0,
+        "exercises_tried": [],
+        "recent_form": [],
+        "last_weekend_week": None,
+        "weekend_streak": 0,
+        "week": None,
+        "week_workouts": 0,
+        "week_calories": 0.0,
+        "week_score_sum": 0.0,
+        "goal_weeks_streak": 0,
+        "shares": 0,
+        "locations": [],
+    }
+
+
+def _initial_state(user_data: dict) -> dict:
+    """State for a profile that predates the engine, seeded from its summary fields"""
+    state = new_state()
+    last_workout = user_data.get("last_workout")
+    if last_workout:
+        state["last_active_day"] = datetime.fromisoformat(last_workout).date().isoformat()
+        state["streak"] = max(1, int(user_data.get("streak", 0)))
+        state["best_streak"] = state["streak"]
+    return state
+
+
+# ---------- Rules ----------
+# Each rule answers "is this achievement earned?" from the updated state and the
+# workout just logged, without looking at any history.
+def _streak(days):
+    return lambda state, workout, goals: state["streak"] >= days
+
+
+def _category_count(category, count):
+    return lambda state, workout, goals: state["category_workouts"].get(category, 0) >= count
+
+
+def _form_improved(state, workout, goals):
+    recent = state["recent_form"]
+    return len(recent) == RECENT_FORM_SIZE and recent[0] > 0 and recent[-1] >= recent[0] * 1.2
+
+
+def _goals_streak(state, workout, goals):
+    return _week_goals_met(state, goals) and state["goal_weeks_streak"] + 1 >= 4
+
+
+RULES = {
+    "first_workout": lambda state, workout, goals: True,
+    "perfect_form": lambda state, workout, goals: workout["avg_score"] >= 95,
+    "calorie_burner": lambda state, workout, goals: workout["calories"] >= 500,
+    "calorie_master": lambda state, workout, goals: workout["calories"] >= 1000,
+    "speed_demon": lambda state, workout, goals: workout["reps"] > 0 and workout["duration_sec"] < 600,
+    "consistency_king": lambda state, workout, goals: bin(state["week_bitmaps"].get(state["week"], 0)).count("1") >= 5,
+    "variety_seeker": lambda state, workout, goals: set(AVAILABLE_EXERCISES) <= set(state["exercises_tried"]),
+    "early_bird": lambda state, workout, goals: state["early_workouts"] >= 5,
+    "night_owl": lambda state, workout, goals: state["late_workouts"] >= 5,
+    "weekend_warrior": lambda state, workout, goals: state["weekend_streak"] >= 3,
+    "form_improver": _form_improved,
+    "endurance_builder": lambda state, workout, goals: state["long_workouts"] >= 3,
+    "strength_builder": _category_count("strength", 10),
+    "cardio_enthusiast": _category_count("cardio", 10),
+    "balance_master": lambda state, workout, goals: state["perfect_balance"] >= 5,
+    "flexibility_seeker": _category_count("flexibility", 5),
+    "social_fitness": lambda state, workout, goals: state["shares"] >= 5,
+    "goal_crusher": _goals_streak,
+    "comeback_kid": lambda state, workout, goals: state["gap_days"] >= 7,
+    "weather_warrior": lambda state, workout, goals: str(workout.get("weather", "")).lower() in EXTREME_WEATHER,
+    "travel_fitness": lambda state, workout, goals: len(state["locations"]) >= 3,
+}
+for _days in (3, 7, 14, 30, 60, 100):
+    RULES[f"streak_{_days}"] = _streak(_days)
+
+
+def _week_goals_met(state, goals) -> bool:
+    workouts = state["week_workouts"]
+    if workouts == 0:
+        return False
+    return (workouts >= goals["weekly_workouts"]
+            and state["week_calories"] >= goals["weekly_calories"]
+            and state["week_score_sum"] / workouts >= goals["target_form_score"])
+
+
+# ---------- Engine ----------
+def _missing(value) -> bool:
+    """None, a blank string, or NaN/NA/NaT (how an empty CSV cell arrives through pandas)"""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return True
+    try:
+        return bool(value != value)
+    except TypeError:
+        # pd.NA refuses to be truthy either way
+        return True
+
+
+def _num(value) -> float:
+    """A logged number, 0 when the cell is missing"""
+    return 0.0 if _missing(value) else float(value)
+
+
+class AchievementEngine:
+    """Evaluates every achievement in achievements.json in constant time per workout"""
+
+    def __init__(self, definitions: dict = None):
+        self.definitions = load_definitions() if definitions is None else definitions
+        unknown = [key for key in self.definitions if key not in RULES]
+        if unknown:
+            print(f"No rule for achievements: {', '.join(unknown)}")
+
+    def record_workout(self, user_data: dict, workout: dict) -> tuple:
+        """Fold one logged workout into the profile.
+
+        Updates points, streak, totals, unlocked achievements and the incremental
+        state in place. Returns (points_earned, new_achievement_ids).
+        """
+        state = user_data.get("achievement_state") or _initial_state(user_data)
+        workout = self.normalize(workout)
+        self._update_state(state, workout, {**DEFAULT_GOALS, **user_data.get("goals", {})})
+        user_data["achievement_state"] = state
+        user_data["total_workouts"] = user_data.get("total_workouts", 0) + 1
+        user_data["last_workout"] = workout["timestamp"].isoformat()
+        user_data["streak"] = state["streak"]
+        return self._unlock(user_data, state, workout)
+
+    def record_share(self, user_data: dict) -> tuple:
+        """Count a progress share (for share-based achievements)"""
+        state = user_data.get("achievement_state") or _initial_state(user_data)
+        state["shares"] += 1
+        user_data["achievement_state"] = state
+        return self.reevaluate(user_data)
+
+    def reevaluate(self, user_data: dict) -> tuple:
+        """Unlock achievements that do not depend on a workout, such as share counts"""
+        state = user_data.get("achievement_state") or _initial_state(user_data)
+        user_data["achievement_state"] = state
+        return self._unlock(user_data, state, None)
+
+    def evaluate(self, user_data: dict, workout: dict) -> list:
+        """Achievements this workout would unlock, without modifying the profile"""
+        return self.record_workout(copy.deepcopy(user_data), workout)[1]
+
+    def _unlock(self, user_data: dict, state: dict, workout) -> tuple:
+        goals = {**DEFAULT_GOALS, **user_data.get("goals", {})}
+        unlocked = set(user_data.setdefault("achievements", []))
+        new_achievements = []
+        points_earned = 0
+        for achievement_id, definition in self.definitions.items():
+            rule = RULES.get(achievement_id)
+            if achievement_id in unlocked or rule is None:
+                continue
+            if workout is None and achievement_id != "social_fitness":
+                continue
+            if rule(state, workout, goals):
+                new_achievements.append(achievement_id)
+                points_earned += definition.get("points", 0)
+        user_data["achievements"].extend(new_achievements)
+        user_data["points"] = user_data.get("points", 0) + points_earned
+        return points_earned, new_achievements
+
+    @staticmethod
+    def normalize(workout: dict) -> dict:
+        """A logged workout with typed fields; missing cells (None, blank, NaN) count as 0 or now"""
+        timestamp = workout.get("timestamp")
+        if _missing(timestamp):
+            timestamp = datetime.now()
+        elif isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        exercise = workout.get("exercise")
+        return {
+            **workout,
+            "timestamp": timestamp,
+            "exercise": "" if _missing(exercise) else exercise,
+            "reps": int(_num(workout.get("reps"))),
+            "avg_score": _num(workout.get("avg_score")),
+            "duration_sec": _num(workout.get("duration_sec")),
+            "calories": _num(workout.get("calories")),
+        }
+
+    @staticmethod
+    def _update_state(state: dict, workout: dict, goals: dict):
+        day = workout["timestamp"].date()
+        week = _week_key(day)
+
+        # Streak and breaks, from the previous active day only
+        last_day = date.fromisoformat(state["last_active_day"]) if state["last_active_day"] else None
+        state["gap_days"] = 0
+        if last_day is None:
+            state["streak"] = 1
+        elif day > last_day:
+            days_since = (day - last_day).days
+            state["streak"] = state["streak"] + 1 if days_since == 1 else 1
+            state["gap_days"] = days_since - 1
+        if last_day is None or day > last_day:
+            state["last_active_day"] = day.isoformat()
+        state["best_streak"] = max(state["best_streak"], state["streak"])
+
+        # Weekly bitmap and weekly goal totals
+        if state["week"] != week:
+            if state["week"] is not None:
+                finished_met = _week_goals_met(state, goals)
+                consecutive = _weeks_between(state["week"], week) == 1
+                state["goal_weeks_streak"] = state["goal_weeks_streak"] + 1 if finished_met and consecutive else 0
+            state["week"] = week
+            state["week_workouts"] = 0
+            state["week_calories"] = 0.0
+            state["week_score_sum"] = 0.0
+        state["week_bitmaps"][week] = state["week_bitmaps"].get(week, 0) | (1 << day.weekday())
+        for key in [key for key in state["week_bitmaps"] if key != week and _weeks_between(key, week) > 1]:
+            del state["week_bitmaps"][key]
+        state["week_workouts"] += 1
+        state["week_calories"] += workout["calories"]
+        state["week_score_sum"] += workout["avg_score"]
+
+        # Consecutive weekends
+        if day.weekday() >= 5 and state["last_weekend_week"] != week:
+            previous = state["last_weekend_week"]
+            state["weekend_streak"] = state["weekend_streak"] + 1 if previous and _weeks_between(previous, week) == 1 else 1
+            state["last_weekend_week"] = week
+
+        # Bests and counters
+        exercise = workout["exercise"]
+        state["best_form"] = max(state["best_form"], workout["avg_score"])
+        state["best_calories"] = max(state["best_calories"], workout["calories"])
+        hour = workout["timestamp"].hour
+        if hour < 8:
+            state["early_workouts"] += 1
+        if hour >= 21:
+            state["late_workouts"] += 1
+        if workout["duration_sec"] >= 1800:
+            state["long_workouts"] += 1
+        for category in EXERCISE_CATEGORIES.get(exercise, ()):
+            state["category_workouts"][category] = state["category_workouts"].get(category, 0) + 1
+            if category == "balance" and workout["avg_score"] >= 95:
+                state["perfect_balance"] += 1
+        if exercise and exercise not in state["exercises_tried"]:
+            state["exercises_tried"].append(exercise)
+        state["recent_form"] = (state["recent_form"] + [workout["avg_score"]])[-RECENT_FORM_SIZE:]
+        location = workout.get("location")
+        if location and location not in state["locations"] and len(state["locations"]) < 3:
+            state["locations"].append(location)
+
+
+_engine = None
+
+
+def get_engine() -> AchievementEngine:
+    global _engine
+    if _engine is None:
+        _engine = AchievementEngine()
+    return _engine
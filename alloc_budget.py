@@ -0,0 +1,147 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+from scoring import ExerciseScorer, JointPlan, Landmark, ScoreTracker
+from synthetic import COUNTED_EXERCISES, generate
+from timeline import ScoreTimeline
+from utils import atomic_write_json
+
+BUDGET_PATH = "alloc_budget.json"
+EXERCISES = COUNTED_EXERCISES + ["plank"]
+STAGES = ["angles", "score", "frame"]
+WIDTH, HEIGHT = 1280, 720
+WARMUP_FRAMES = 150
+# Headroom written into a regenerated budget over the measured worst case
+BUDGET_HEADROOM = 1.25
+# Fixed slack on top: small for retained bytes so even a list growing by one slot per frame fails
+BUDGET_SLACK = {"peak_bytes": 64, "retained_bytes": 2, "gc_collections": 1}
+
+
+# ---------- Stages ----------
+def _stage(name: str, exercise: str):
+    """A callable running one stage of the per-frame scoring path for a fresh session"""
+    if name == "angles":
+        plan = JointPlan(exercise)
+        return lambda landmarks: plan.compute(landmarks, WIDTH, HEIGHT)
+    scorer = ExerciseScorer(exercise)
+    if name == "score":
+        return lambda landmarks: scorer.update(landmarks, WIDTH, HEIGHT)
+    tracker = ScoreTracker()
+    timeline = ScoreTimeline(scorer.plan.angle_names)
+    clock = [0.0]
+
+    # What main.py does with a scored frame before drawing it
+    def frame(landmarks):
+        clock[0] += 1 / 30
+        if scorer.update(landmarks, WIDTH, HEIGHT):
+            timeline.rep(clock[0])
+        tracker.add(scorer.form_score)
+        tracker.cue(scorer.feedback)
+        timeline.add(clock[0], scorer.form_score, scorer.plan.angles)
+        return tracker.average, tracker.recent_average
+    return frame
+
+
+def _session(exercise: str, reps: int, seed: int) -> list:
+    """Synthetic frames as landmark lists built up front, as MediaPipe hands them over"""
+    frames, _ = generate(exercise, reps=reps, noise=0.002, dropout=0.02, seed=seed)
+    return [[Landmark(*row) for row in frame.tolist()] for frame in frames]
+
+
+def measure(stage, frames: list, warmup: int = WARMUP_FRAMES) -> dict:
+    """Heap traffic of ``stage`` per frame after ``warmup`` frames.
+
+    ``peak_bytes`` is the average high-water mark each frame reaches above where it
+    started (its transient allocations), ``retained_bytes`` what each frame leaves
+    allocated (growth), and ``gc_collections`` the collections triggered per 1000 frames.
+    """
+    for landmarks in frames[:warmup]:
+        stage(landmarks)
+    measured = frames[warmup:]
+    gc.collect()
+    collections = sum(generation["collections"] for generation in gc.get_stats())
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        peak_total = 0
+        for landmarks in measured:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            stage(landmarks)
+            _, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - before
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    collections = sum(generation["collections"] for generation in gc.get_stats()) - collections
+    return {
+        "peak_bytes": peak_total / len(measured),
+        "retained_bytes": max(0, end - start) / len(measured),
+        "gc_collections": collections * 1000 / len(measured),
+    }
+
+
+def run(reps: int = 12, seed: int = 0) -> dict:
+    """Worst case over every exercise for each stage"""
+    sessions = {exercise: _session(exercise, reps, seed) for exercise in EXERCISES}
+    report = {}
+    for name in STAGES:
+        results = {exercise: measure(_stage(name, exercise), frames) for exercise, frames in sessions.items()}
+        report[name] = {key: max(result[key] for result in results.values()) for key in ("peak_bytes", "retained_bytes", "gc_collections")}
+        report[name]["worst"] = max(results, key=lambda exercise: results[exercise]["peak_bytes"])
+    return report
+
+
+def check(report: dict, budget: dict) -> list:
+    """Budget lines the report goes over"""
+    failures = []
+    for name, limits in budget.get("stages", {}).items():
+        for key, limit in limits.items():
+            value = report.get(name, {}).get(key)
+            if value is not None and value > limit:
+                failures.append(f"{name}.{key}: {value:.1f} > {limit}")
+    return failures
+
+
+def budget_from(report: dict) -> dict:
+    return {
+        "python": f"{sys.version_info.major}.{sys.version_info.minor}",
+        "stages": {name: {key: round(values[key] * BUDGET_HEADROOM + slack, 1) for key, slack in BUDGET_SLACK.items()}
+                   for name, values in report.items()},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-frame allocation check for the scoring path over synthetic sessions")
+    parser.add_argument("--budget", default=BUDGET_PATH, help="Committed budget to check against")
+    parser.add_argument("--write", action="store_true", help="Write a new budget from this run instead of checking")
+    parser.add_argument("--reps", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    cli_args = parser.parse_args()
+
+    report = run(cli_args.reps, cli_args.seed)
+    print(f"{'stage':<8} {'peak B/frame':>13} {'retained B/frame':>17} {'GC/1k frames':>13}  worst")
+    for name, values in report.items():
+        print(f"{name:<8} {values['peak_bytes']:>13.1f} {values['retained_bytes']:>17.1f} "
+              f"{values['gc_collections']:>13.2f}  {values['worst']}")
+
+    if cli_args.write:
+        atomic_write_json(cli_args.budget, budget_from(report))
+        print(f"Budget written to {cli_args.budget}")
+    elif not os.path.exists(cli_args.budget):
+        print(f"No budget at {cli_args.budget}; run with --write to create one")
+        sys.exit(2)
+    else:
+        with open(cli_args.budget, 'r', encoding='utf-8') as f:
+            budget = json.load(f)
+        if budget.get("python") != budget_from({})["python"]:
+            print(f"Note: budget was measured on Python {budget.get('python')}; object sizes differ between versions")
+        failures = check(report, budget)
+        for failure in failures:
+            print(f"Over budget: {failure}")
+        print("FAILED" if failures else "Within budget")
+        sys.exit(1 if failures else 0)
@@ -0,0 +1,295 @@
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+
+import pandas as pd
+
+LOG_PATH = "logs/sessions.csv"
+LOG_COLUMNS = ["timestamp", "user", "exercise", "reps", "avg_score", "duration_sec", "calories"]
+NUMERIC_COLUMNS = ["reps", "avg_score", "duration_sec", "calories"]
+STREAM_CHUNK_ROWS = 100_000
+# Logs larger than this are summarised by streaming instead of loading the whole frame
+STREAMING_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+
+# ---------- Loading ----------
+def log_version(log_path: str = LOG_PATH) -> tuple:
+    """Cheap fingerprint of the session history; changes whenever the log is written or compacted"""
+    from log_store import manifest_path
+    version = []
+    for path in (log_path, manifest_path(log_path)):
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+        except OSError:
+            version.append(None)
+    return None if version == [None, None] else tuple(version)
+
+
+def load_history(log_path: str = LOG_PATH, start=None, end=None) -> pd.DataFrame:
+    """Load and type the session history once, adding the derived date columns every query uses.
+
+    Reads the rotated segments overlapping [start, end] plus the active log (see log_store).
+    """
+    from log_store import read_history
+    df = read_history(log_path, start, end, dtype={"user": "string", "exercise": "string"})
+    return prepare_history(df)
+
+
+def prepare_history(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return pd.DataFrame(columns=LOG_COLUMNS + ["date", "iso_year", "iso_week"])
+    for column in NUMERIC_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
+    df['exercise'] = df['exercise'].astype('category')
+    df['user'] = df['user'].astype('category')
+    df['date'] = df['timestamp'].dt.normalize()
+    iso = df['timestamp'].dt.isocalendar()
+    df['iso_year'] = iso['year'].astype('int32')
+    df['iso_week'] = iso['week'].astype('int32')
+    return df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+
+# ---------- Engine ----------
+class AnalyticsEngine:
+    """Loads the session history once and answers every statistics query from it.
+
+    The typed frame is shared by all callers and reloaded only when the log's
+    fingerprint changes. Queries take an optional ``days`` window (None = all time).
+    """
+
+    def __init__(self, log_path: str = LOG_PATH):
+        self.log_path = log_path
+        self.version = None
+        self._frame = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        """Reload the history if the log changed. Returns True when data was (re)loaded."""
+        version = log_version(self.log_path)
+        if version == self.version and self._frame is not None:
+            return False
+        with self._lock:
+            if version == self.version and self._frame is not None:
+                return False
+            if version is None:
+                self._frame = prepare_history(pd.DataFrame(columns=LOG_COLUMNS))
+            else:
+                self._frame = load_history(self.log_path)
+            self.version = version
+        return True
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """The shared, typed history. Treat as read-only."""
+        self.refresh()
+        return self._frame
+
+    def history(self, days: int = None, today=None) -> pd.DataFrame:
+        """Rows from the last ``days`` days (inclusive of the cutoff date)"""
+        df = self.frame
+        if days is None or df.empty:
+            return df
+        cutoff = pd.Timestamp(today or datetime.now().date()) - pd.Timedelta(days=days)
+        return df[df['date'] >= cutoff]
+
+    def totals(self, days: int = None) -> dict:
+        df = self.history(days)
+        return {
+            "total_workouts": len(df),
+            "total_reps": df['reps'].sum(),
+            "total_calories": df['calories'].sum(),
+            "avg_form_score": df['avg_score'].mean(),
+            "total_duration": df['duration_sec'].sum(),
+            "avg_workout_duration": df['duration_sec'].mean(),
+        }
+
+    def favourite_exercise(self, days: int = None) -> str:
+        modes = self.history(days)['exercise'].mode()
+        return modes.iloc[0] if not modes.empty else "None"
+
+    def workout_frequency(self, days: int = None) -> int:
+        """Number of distinct days with at least one workout"""
+        return self.history(days)['date'].nunique()
+
+    def stats(self, days: int = None) -> dict:
+        """Summary used by ``utils.calculate_workout_stats``"""
+        df = self.history(days)
+        if df.empty:
+            return {}
+        totals = self.totals(days)
+        return {
+            "total_workouts": totals["total_workouts"],
+            "total_reps": totals["total_reps"],
+            "total_calories": totals["total_calories"],
+            "avg_form_score": totals["avg_form_score"],
+            "total_duration": totals["total_duration"],
+            "favorite_exercise": self.favourite_exercise(days),
+            "workout_frequency": self.workout_frequency(days),
+            "avg_workout_duration": totals["avg_workout_duration"],
+        }
+
+    def weekly_progress(self, weeks: int = 4, today=None) -> list:
+        """Per ISO week sums of reps, calories and duration and mean form score"""
+        df = self.history(weeks * 7, today)
+        if df.empty:
+            return []
+        weekly = df.groupby('iso_week', sort=True).agg(
+            reps=('reps', 'sum'),
+            calories=('calories', 'sum'),
+            avg_score=('avg_score', 'mean'),
+            duration_sec=('duration_sec', 'sum'),
+        ).reset_index().rename(columns={'iso_week': 'week'})
+        return weekly.to_dict('records')
+
+    def daily_counts(self, days: int = None) -> pd.DataFrame:
+        """Workouts per day as a (date, workouts) frame"""
+        df = self.history(days)
+        return df.groupby('date', sort=True).size().reset_index(name='workouts')
+
+    def exercise_counts(self, days: int = None) -> pd.Series:
+        counts = self.history(days)['exercise'].value_counts()
+        return counts[counts > 0]
+
+    def range_metrics(self, days: int) -> dict:
+        """Workouts, calories and mean form score over the last ``days`` days"""
+        df = self.history(days)
+        return {
+            "workouts": len(df),
+            "calories": df['calories'].sum(),
+            "avg_score": df['avg_score'].mean(),
+        }
+
+    def export_frame(self) -> pd.DataFrame:
+        """The history with only the logged columns, for exports"""
+        df = self.frame
+        return df[[column for column in LOG_COLUMNS if column in df.columns]]
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(log_path: str = LOG_PATH) -> AnalyticsEngine:
+    """Process-wide engine for a log path, shared by the dashboard and utils"""
+    key = os.path.abspath(log_path)
+    engine = _engines.get(key)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.setdefault(key, AnalyticsEngine(log_path))
+    return engine
+
+
+# ---------- Streaming Aggregation ----------
+class StatsAccumulator:
+    """Mergeable partial aggregate of session rows.
+
+    Holds only sums, non-null counts, per-exercise counts and the set of active days,
+    so memory is bounded by the number of distinct exercises and days, not rows.
+    ``result`` returns the same dict as ``AnalyticsEngine.stats``.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.sums = dict.fromkeys(NUMERIC_COLUMNS, 0)
+        self.counts = dict.fromkeys(NUMERIC_COLUMNS, 0)
+        self.exercises = Counter()
+        self.days = set()
+
+    def add_frame(self, chunk: pd.DataFrame):
+        """Fold one chunk of raw log rows into the aggregate"""
+        if chunk.empty:
+            return self
+        self.rows += len(chunk)
+        for column in NUMERIC_COLUMNS:
+            values = pd.to_numeric(chunk[column], errors='coerce')
+            self.sums[column] += values.sum()
+            self.counts[column] += int(values.count())
+        self.exercises.update(chunk['exercise'].dropna().astype(str).value_counts().to_dict())
+        days = pd.to_datetime(chunk['timestamp'], format='ISO8601').dt.normalize().dropna().unique()
+        self.days.update(days.tolist())
+        return self
+
+    def merge(self, other: "StatsAccumulator"):
+        self.rows += other.rows
+        for column in NUMERIC_COLUMNS:
+            self.sums[column] += other.sums[column]
+            self.counts[column] += other.counts[column]
+        self.exercises.update(other.exercises)
+        self.days.update(other.days)
+        return self
+
+    def favourite_exercise(self) -> str:
+        if not self.exercises:
+            return "None"
+        # Same tie-break as Series.mode(): the smallest value among the most frequent
+        top = max(self.exercises.values())
+        return min(name for name, count in self.exercises.items() if count == top)
+
+    def result(self) -> dict:
+        if self.rows == 0:
+            return {}
+
+        def mean(column):
+            count = self.counts[column]
+            return self.sums[column] / count if count else float("nan")
+
+        return {
+            "total_workouts": self.rows,
+            "total_reps": self.sums["reps"],
+            "total_calories": self.sums["calories"],
+            "avg_form_score": mean("avg_score"),
+            "total_duration": self.sums["duration_sec"],
+            "favorite_exercise": self.favourite_exercise(),
+            "workout_frequency": len(self.days),
+            "avg_workout_duration": mean("duration_sec"),
+        }
+
+
+def iter_log_chunks(log_path: str = LOG_PATH, chunk_rows: int = STREAM_CHUNK_ROWS, start=None, end=None):
+    """Read the session history (segments, then the active log) in fixed-size chunks of raw rows"""
+    from log_store import iter_history_chunks
+    yield from iter_history_chunks(log_path, chunk_rows, start, end,
+                                   dtype={"user": "string", "exercise": "string"})
+
+
+def iter_row_chunks(rows, chunk_rows: int = STREAM_CHUNK_ROWS):
+    """Batch an iterator of row dicts (e.g. from a session store) into frames"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_rows:
+            yield pd.DataFrame.from_records(batch, columns=LOG_COLUMNS)
+            batch = []
+    if batch:
+        yield pd.DataFrame.from_records(batch, columns=LOG_COLUMNS)
+
+
+def stream_workout_stats(source=LOG_PATH, chunk_rows: int = STREAM_CHUNK_ROWS) -> dict:
+    """Summary statistics computed chunk by chunk.
+
+    ``source`` is a log path, or an iterable of row dicts or DataFrame chunks.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        chunks = iter_log_chunks(source, chunk_rows)
+    else:
+        source = iter(source)
+        first = next(source, None)
+        if first is None:
+            return {}
+        if isinstance(first, pd.DataFrame):
+            chunks = _chain([first], source)
+        else:
+            chunks = iter_row_chunks(_chain([first], source), chunk_rows)
+
+    accumulator = StatsAccumulator()
+    for chunk in chunks:
+        accumulator.add_frame(chunk)
+    return accumulator.result()
+
+
+def _chain(head, tail):
+    yield from head
+    yield from tail
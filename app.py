@@ -1,16 +1,25 @@
 import os
 import json
-from datetime import datetime, timedelta
 import streamlit as st
 import pandas as pd
 import subprocess
 import sys
-import plotly.express as px
-# from streamlit_autorefresh import st_autorefresh
+from analytics import get_engine
+from log_store import history_bytes
+from utils import atomic_write_json
+# Section-specific modules (plotly, tutorials, frame bus, reports, leaderboard)
+# are imported inside the section that uses them
 
 # Constants
 LOG_PATH = "logs/sessions.csv"
 REC_DIR = "recordings"
+LIVE_VIEW_INTERVAL = 0.2  # seconds between live view refreshes
+LIVE_STATUS_INTERVAL = 1.0  # seconds between live status polls
+# Station this dashboard drives; scopes the workout's frame bus and status channel
+STATION = os.environ.get("FITMATE_STATION") or None
+LEADERBOARD_SIZE = 10
+REPORT_POLL_INTERVAL = 1.0  # seconds between report status polls
+HALF_CHART_WIDTH = 600  # pixels; dashboard charts sit in two columns of the wide layout
 USER_DATA_PATH = "user_data.json"
 ACHIEVEMENTS_PATH = "achievements.json"
 
@@ -70,9 +79,23 @@ if 'workout_started' not in st.session_state:
     st.session_state.workout_started = False
 if 'voice_enabled' not in st.session_state:
     st.session_state.voice_enabled = True
+if 'workout_process' not in st.session_state:
+    st.session_state.workout_process = None
 
 # Utility functions
+def file_version(path):
+    """Cheap fingerprint of a file; part of every cache key so outside writers invalidate it"""
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
 def load_user_data():
+    return _load_user_data(file_version(USER_DATA_PATH))
+
+@st.cache_data(show_spinner=False)
+def _load_user_data(version):
     if os.path.exists(USER_DATA_PATH):
         try:
             with open(USER_DATA_PATH, 'r', encoding='utf-8') as f:
@@ -96,10 +119,14 @@ def load_user_data():
     }
 
 def save_user_data(data):
-    with open(USER_DATA_PATH, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    atomic_write_json(USER_DATA_PATH, data)
+    _load_user_data.clear()
 
 def load_achievements():
+    return _load_achievements(file_version(ACHIEVEMENTS_PATH))
+
+@st.cache_data(show_spinner=False)
+def _load_achievements(version):
     if os.path.exists(ACHIEVEMENTS_PATH):
         try:
             with open(ACHIEVEMENTS_PATH, 'r', encoding='utf-8') as f:
@@ -162,25 +189,120 @@ def generate_ai_workout_plan(user_data):
 
 def get_workout_stats():
     """Get workout statistics for dashboard"""
-    if not os.path.exists(LOG_PATH):
-        return pd.DataFrame()
-    
     try:
-        df = pd.read_csv(LOG_PATH, encoding='utf-8')
-        if df.empty:
-            return df
-        
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df['date'] = df['timestamp'].dt.date
-        return df
+        return get_engine(LOG_PATH).frame
     except Exception as e:
         print(f"Error reading workout stats: {e}")
         return pd.DataFrame()
 
-# Load data
-user_data = load_user_data()
-achievements = load_achievements()
-workout_stats = get_workout_stats()
+@st.fragment(run_every=LIVE_VIEW_INTERVAL)
+def show_live_view():
+    """Show the newest annotated frame from the running workout"""
+    from frame_bus import FRAME_BUS_NAME, FrameBusReader, channel_name
+    reader = st.session_state.get('frame_bus_reader')
+    if reader is not None and reader.closed:
+        reader.close()
+        reader = st.session_state.frame_bus_reader = None
+    if reader is None:
+        try:
+            reader = FrameBusReader(channel_name(FRAME_BUS_NAME, STATION))
+        except (FileNotFoundError, ValueError):
+            st.caption("Waiting for the workout camera...")
+            return
+    st.session_state.frame_bus_reader = reader
+
+    latest = reader.latest(only_new=False)
+    if latest is None:
+        st.caption("Waiting for the workout camera...")
+        return
+    _, _, frame = latest
+    st.image(frame, channels="BGR", use_container_width=True)
+
+def close_live_status():
+    """Detach from the status channel; the next poll attaches to whatever segment exists then"""
+    reader = st.session_state.get('status_reader')
+    if reader is not None:
+        reader.close()
+    st.session_state.status_reader = None
+
+def read_live_status(pid=None):
+    """Poll the running workout's status record from shared memory.
+
+    With ``pid``, only a record published by that process counts: a segment left
+    over from the previous workout is dropped and attached to again later.
+    """
+    from frame_bus import channel_name
+    from status_channel import STATUS_CHANNEL_NAME, StatusReader
+    reader = st.session_state.get('status_reader')
+    if reader is None:
+        try:
+            reader = StatusReader(channel_name(STATUS_CHANNEL_NAME, STATION))
+        except FileNotFoundError:
+            return None
+        st.session_state.status_reader = reader
+    status = reader.read()
+    if status is None or status['age'] > 10 or (pid is not None and status['pid'] != pid):
+        # The workout process exited or restarted; attach again on the next poll
+        close_live_status()
+        return None
+    return status
+
+@st.fragment(run_every=LIVE_STATUS_INTERVAL)
+def show_live_status():
+    """Show live reps, set, form score and cues from the running workout"""
+    from status_channel import STATE_FINISHED
+    process = st.session_state.workout_process
+    status = read_live_status(process.pid if process is not None else None)
+    if (status and status['state'] == STATE_FINISHED) or (process is not None and process.poll() is not None):
+        close_live_status()
+        st.session_state.workout_process = None
+        st.session_state.workout_started = False
+        st.session_state.current_exercise = None
+        st.rerun(scope="app")
+    if status is None:
+        st.caption("Waiting for the workout to start...")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Set", f"{status['set']}/{status['target_sets']}")
+    col2.metric("Reps", f"{status['reps']}/{status['target_reps']}")
+    col3.metric("Form Score", f"{status['form_score']:.0f}%")
+    col4.metric("FPS", f"{status['fps']:.0f}")
+    if status['target_reps']:
+        st.progress(min(status['reps'] / status['target_reps'], 1.0))
+    if status['state_name'] == "resting":
+        st.warning(f"⏱️ Rest: {status['rest_remaining']:.0f}s remaining")
+    elif status['cue']:
+        st.write(f"🗣️ {status['cue']}")
+
+def show_report(kind, label):
+    """Report button; the file is built in the background and offered once ready"""
+    from reports import get_report_worker, DONE, FAILED
+    worker = get_report_worker(LOG_PATH)
+    job = worker.request(kind) if st.button(label, key=f"report_{kind}") else worker.latest(kind)
+    if job is None:
+        return
+    if job.status == DONE:
+        st.download_button(
+            label=f"Download {job.file_name}",
+            data=job.read(),
+            file_name=job.file_name,
+            mime=job.mime,
+            key=f"download_{kind}"
+        )
+    elif job.status == FAILED:
+        st.error(f"Could not build the report: {job.error}")
+    else:
+        wait_for_report(kind)
+
+@st.fragment(run_every=REPORT_POLL_INTERVAL)
+def wait_for_report(kind):
+    """Poll a report being built and rerun the page once it is ready"""
+    from reports import get_report_worker, DONE, FAILED
+    job = get_report_worker(LOG_PATH).latest(kind)
+    if job is None or job.status in (DONE, FAILED):
+        st.rerun(scope="app")
+    st.caption("⏳ Building in the background...")
 
 # Main header
 st.markdown("""
@@ -190,8 +312,13 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Sidebar
-with st.sidebar:
+# ---------- Sections ----------
+# Each section and the sidebar is a fragment: interacting with one reruns only that
+# fragment, and only the section on screen is built.
+@st.fragment
+def show_sidebar():
+    """Profile, navigation and plan widgets; reruns on its own unless navigating"""
+    user_data = load_user_data()
     st.header("👤 Your Profile")
     
     # Profile editing
@@ -257,13 +384,11 @@ with st.sidebar:
         st.write(f"**Target:** {plan['calories_target']} calories")
         st.write(f"**Duration:** ~{plan['estimated_duration']:.0f} minutes")
 
-# Main content area
-# Initialize current section if not set
-if 'current_section' not in st.session_state:
-    st.session_state.current_section = "home"
-
-# Section Navigation Logic
-if st.session_state.current_section == "home":
+@st.fragment
+def show_home_section():
+    """Welcome page"""
+    user_data = load_user_data()
+    achievements = load_achievements()
     # Home Section (default) - Welcome and Overview
     st.header("🏠 Welcome to AI Fitness Trainer")
     
@@ -304,7 +429,10 @@ if st.session_state.current_section == "home":
                 """, unsafe_allow_html=True)
                 st.caption(achievement['description'])
 
-elif st.session_state.current_section == "workout":
+@st.fragment
+def show_workout_section():
+    """Exercise picker, tutorial and live workout view"""
+    user_data = load_user_data()
     # Workout Section
     st.header("🏋️ Start Your Workout")
     
@@ -338,23 +466,42 @@ elif st.session_state.current_section == "workout":
         with st.expander("View Exercise Tutorial", expanded=False):
             show_tutorial(selected_exercise)
         
+        kiosk_mode = st.checkbox("Show the workout here only (no desktop window)", key="kiosk_mode")
+        
         if st.button("🚀 Start Workout", type="primary", key="start_workout"):
             st.session_state.current_exercise = selected_exercise
             st.session_state.current_section = "workout"
             st.session_state.workout_started = True
+            # Never show the previous workout's final status for this one
+            close_live_status()
             st.success(f"Starting {exercise_options[selected_exercise]} workout!")
             
             # Start the main exercise application
             try:
-                subprocess.Popen([sys.executable, "main.py", selected_exercise])
-                st.info("Exercise window opened! Switch to it to start your workout.")
+                command = [sys.executable, "main.py", selected_exercise]
+                if kiosk_mode:
+                    command.append("--headless")
+                if STATION:
+                    command += ["--station", STATION]
+                st.session_state.workout_process = subprocess.Popen(command)
+                if kiosk_mode:
+                    st.info("Workout started! Follow along in the live view below.")
+                else:
+                    st.info("Exercise window opened! Switch to it to start your workout.")
             except Exception as e:
                 st.error(f"Error starting workout: {e}")
         
         # Workout status
         if st.session_state.workout_started and st.session_state.current_exercise:
             st.info(f"🎯 Currently doing: {exercise_options[st.session_state.current_exercise]}")
+            show_live_status()
+            show_live_view()
             if st.button("⏹️ End Workout"):
+                process = st.session_state.workout_process
+                if process is not None and process.poll() is None:
+                    process.terminate()
+                close_live_status()
+                st.session_state.workout_process = None
                 st.session_state.workout_started = False
                 st.session_state.current_exercise = None
                 st.success("Workout ended!")
@@ -369,7 +516,13 @@ elif st.session_state.current_section == "workout":
         st.metric("Streak", f"{user_data['streak']} days")
         st.metric("Total Workouts", user_data['total_workouts'])
 
-elif st.session_state.current_section == "dashboard":
+@st.fragment
+def show_dashboard_section():
+    """Performance charts and weekly goals"""
+    import plotly.express as px
+    from downsample import downsample_timeseries, top_categories
+    analytics = get_engine(LOG_PATH)
+    workout_stats = get_workout_stats()
     # Performance Dashboard
     st.header("📊 Performance Dashboard")
     
@@ -379,31 +532,24 @@ elif st.session_state.current_section == "dashboard":
         with col1:
             date_range = st.selectbox("Time Period", ["7 days", "30 days", "90 days", "All time"])
         
-        # Filter data based on selection
-        if date_range != "All time":
-            days = int(date_range.split()[0])
-            cutoff_date = datetime.now().date() - timedelta(days=days)
-            filtered_stats = workout_stats[workout_stats['date'] >= cutoff_date]
-        else:
-            filtered_stats = workout_stats
+        # Range selection; every query below runs against the shared analytics engine
+        days = None if date_range == "All time" else int(date_range.split()[0])
+        totals = analytics.totals(days)
         
         # Metrics row
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            total_workouts = len(filtered_stats)
-            st.metric("Total Workouts", total_workouts)
+            st.metric("Total Workouts", totals['total_workouts'])
         
         with col2:
-            total_reps = filtered_stats['reps'].sum() if 'reps' in filtered_stats.columns else 0
-            st.metric("Total Reps", f"{total_reps:,}")
+            st.metric("Total Reps", f"{totals['total_reps']:,}")
         
         with col3:
-            total_calories = filtered_stats['calories'].sum() if 'calories' in filtered_stats.columns else 0
-            st.metric("Calories Burned", f"{total_calories:,}")
+            st.metric("Calories Burned", f"{totals['total_calories']:,}")
         
         with col4:
-            avg_score = filtered_stats['avg_score'].mean() if 'avg_score' in filtered_stats.columns else 0
+            avg_score = totals['avg_form_score'] if pd.notna(totals['avg_form_score']) else 0
             st.metric("Avg Form Score", f"{avg_score:.1f}%")
         
         # Charts
@@ -411,16 +557,17 @@ elif st.session_state.current_section == "dashboard":
         
         with col1:
             st.subheader("📈 Workout Frequency")
-            if 'date' in filtered_stats.columns:
-                daily_workouts = filtered_stats.groupby('date').size().reset_index(name='workouts')
-                fig = px.line(daily_workouts, x='date', y='workouts', 
-                             title="Workouts per Day")
+            daily_workouts = analytics.daily_counts(days)
+            if not daily_workouts.empty:
+                workouts_series, bucket = downsample_timeseries(daily_workouts, 'date', 'workouts', HALF_CHART_WIDTH)
+                fig = px.line(workouts_series, x='date', y='workouts', 
+                             title=f"Workouts per {bucket}")
                 st.plotly_chart(fig, use_container_width=True)
         
         with col2:
             st.subheader("🔥 Exercise Distribution")
-            if 'exercise' in filtered_stats.columns:
-                exercise_counts = filtered_stats['exercise'].value_counts()
+            exercise_counts = top_categories(analytics.exercise_counts(days))
+            if not exercise_counts.empty:
                 fig = px.pie(values=exercise_counts.values, names=exercise_counts.index,
                             title="Most Popular Exercises")
                 st.plotly_chart(fig, use_container_width=True)
@@ -429,11 +576,12 @@ elif st.session_state.current_section == "dashboard":
         st.subheader("🎯 Progress Tracking")
         
         # Weekly goals
+        last_week = analytics.range_metrics(7)
         col1, col2, col3 = st.columns(3)
         
         with col1:
             weekly_goal = 5  # workouts per week
-            weekly_actual = len(filtered_stats[filtered_stats['date'] >= (datetime.now().date() - timedelta(days=7))])
+            weekly_actual = last_week['workouts']
             weekly_progress = min(weekly_actual / weekly_goal, 1.0)
             
             st.write("**Weekly Goal: 5 workouts**")
@@ -446,7 +594,7 @@ elif st.session_state.current_section == "dashboard":
         
         with col2:
             calorie_goal = 2000  # calories per week
-            weekly_calories = filtered_stats[filtered_stats['date'] >= (datetime.now().date() - timedelta(days=7))]['calories'].sum()
+            weekly_calories = last_week['calories']
             calorie_progress = min(weekly_calories / calorie_goal, 1.0)
             
             st.write("**Weekly Goal: 2000 calories**")
@@ -459,7 +607,7 @@ elif st.session_state.current_section == "dashboard":
         
         with col3:
             form_goal = 90  # average form score
-            weekly_avg_score = filtered_stats[filtered_stats['date'] >= (datetime.now().date() - timedelta(days=7))]['avg_score'].mean()
+            weekly_avg_score = last_week['avg_score'] if pd.notna(last_week['avg_score']) else 0
             form_progress = min(weekly_avg_score / form_goal, 1.0)
             
             st.write("**Weekly Goal: 90% form score**")
@@ -470,10 +618,54 @@ elif st.session_state.current_section == "dashboard":
             """, unsafe_allow_html=True)
             st.write(f"{weekly_avg_score:.1f}% average form score")
 
+        show_session_timeline()
+
     else:
         st.info("📝 No workout data yet. Start your first workout to see your progress!")
 
-elif st.session_state.current_section == "gamification":
+
+def show_session_timeline():
+    """Form score band, one joint angle and rep marks through a recent session, from its saved timeline"""
+    import plotly.graph_objects as go
+    from timeline import FORM_SERIES, list_timelines, load_timeline
+    st.subheader("⏱️ Session Timeline")
+    paths = list_timelines()
+    if not paths:
+        st.info("Timelines appear here after your next workout.")
+        return
+    sessions = {path: load_timeline(path) for path in paths}
+    path = st.selectbox("Session", paths, format_func=lambda p: (
+        f"{sessions[p].get('timestamp', '')[:16].replace('T', ' ')} · {sessions[p].get('exercise', '?')} · "
+        f"{sessions[p].get('reps', 0)} reps"))
+    data = sessions[path]
+    width = data["bucket_seconds"]
+    seconds = [i * width for i in range(data["buckets"])]
+    form = data["series"][FORM_SERIES]
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=seconds, y=form["max"], line=dict(width=0), showlegend=False, hoverinfo="skip"))
+    fig.add_trace(go.Scatter(x=seconds, y=form["min"], fill="tonexty", line=dict(width=0),
+                             fillcolor="rgba(102, 126, 234, 0.25)", name="Form score range"))
+    fig.add_trace(go.Scatter(x=seconds, y=form["mean"], line=dict(color="#667eea"), name="Form score"))
+    angle_names = [name for name in data["series"] if name != FORM_SERIES]
+    if angle_names:
+        angle = st.radio("Joint angle", angle_names, horizontal=True)
+        fig.add_trace(go.Scatter(x=seconds, y=data["series"][angle]["mean"], yaxis="y2",
+                                 line=dict(color="#f5a623", dash="dot"), name=f"{angle} angle"))
+    rep_times = [second for second, reps in zip(seconds, data["rep_events"]) if reps]
+    fig.add_trace(go.Scatter(x=rep_times, y=[0] * len(rep_times), mode="markers", name="Reps",
+                             marker=dict(symbol="triangle-up", size=9, color="#2ecc71")))
+    fig.update_layout(xaxis_title=f"Seconds ({width:g}s buckets)", yaxis=dict(title="Form score", range=[0, 105]),
+                      yaxis2=dict(title="Angle (°)", overlaying="y", side="right", showgrid=False),
+                      legend=dict(orientation="h"), margin=dict(t=30))
+    st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def show_gamification_section():
+    """Level, streak, leaderboard and achievements"""
+    from leaderboard import get_leaderboard, OVERALL_BOARD, week_board
+    user_data = load_user_data()
+    achievements = load_achievements()
     # Gamification Section
     st.header("🎮 Gamification & Motivation")
     
@@ -522,6 +714,32 @@ elif st.session_state.current_section == "gamification":
         else:
             st.success("🎉 You've reached the maximum streak milestone!")
     
+    # Leaderboard, read from the persisted index only
+    st.subheader("🏅 Leaderboard")
+    leaderboard = get_leaderboard()
+    scopes = {"Overall": OVERALL_BOARD, "This week": week_board()}
+    for name in leaderboard.board_names("exercise:"):
+        scopes[name.split(":", 1)[1].title()] = name
+    scope = st.selectbox("Ranking", list(scopes), key="leaderboard_scope")
+    board = leaderboard.board(scopes[scope])
+
+    if len(board) == 0:
+        st.info("No rankings yet. Finish a workout to get on the board!")
+    else:
+        lcol1, lcol2 = st.columns(2)
+        with lcol1:
+            st.write(f"**Top {LEADERBOARD_SIZE}**")
+            st.dataframe(pd.DataFrame(board.top(LEADERBOARD_SIZE), columns=["Rank", "Member", "Points"]),
+                         hide_index=True, use_container_width=True)
+        with lcol2:
+            rank = board.rank(user_data['username'])
+            if rank is None:
+                st.write("You are not on this board yet.")
+            else:
+                st.metric("Your Rank", f"#{rank} of {len(board)}")
+                st.dataframe(pd.DataFrame(board.around(user_data['username']), columns=["Rank", "Member", "Points"]),
+                             hide_index=True, use_container_width=True)
+
     # Achievements display
     st.subheader("🏆 Your Achievements")
     
@@ -541,7 +759,9 @@ elif st.session_state.current_section == "gamification":
             </div>
             """, unsafe_allow_html=True)
 
-elif st.session_state.current_section == "voice":
+@st.fragment
+def show_voice_section():
+    """Voice commands and settings"""
     # Voice Interaction Section
     st.header("🎧 Voice Interaction & Settings")
     
@@ -586,7 +806,10 @@ elif st.session_state.current_section == "voice":
     - **Practice commands** to get familiar
     """)
 
-elif st.session_state.current_section == "export":
+@st.fragment
+def show_export_section():
+    """Data export and reports"""
+    workout_stats = get_workout_stats()
     # Export and Reports Section
     st.header("📋 Export & Reports")
     
@@ -595,28 +818,18 @@ elif st.session_state.current_section == "export":
     with col1:
         st.subheader("📊 Export Data")
         
-        if st.button("📥 Download Workout History (CSV)"):
-            if not workout_stats.empty:
-                try:
-                    csv = workout_stats.to_csv(index=False, encoding='utf-8')
-                    st.download_button(
-                        label="Download CSV",
-                        data=csv,
-                        file_name=f"workout_history_{datetime.now().strftime('%Y%m%d')}.csv",
-                        mime="text/csv"
-                    )
-                except Exception as e:
-                    st.error(f"Error exporting CSV: {e}")
-            else:
-                st.warning("No workout data to export")
-        
-        if st.button("📄 Generate PDF Report"):
-            st.info("PDF report generation feature coming soon!")
+        if workout_stats.empty:
+            st.warning("No workout data to export")
+        else:
+            show_report("csv", "📥 Download Workout History (CSV)")
+            show_report("pdf", "📄 Generate PDF Report")
         
         # Additional export options
         st.subheader("📈 Data Analytics")
-        if st.button("📊 Generate Progress Report"):
-            st.info("Progress report generation coming soon!")
+        if workout_stats.empty:
+            st.info("Complete a workout to generate a progress report")
+        else:
+            show_report("progress", "📊 Generate Progress Report")
         
         if st.button("🎯 Export Goals & Achievements"):
             st.info("Goals export feature coming soon!")
@@ -645,11 +858,30 @@ elif st.session_state.current_section == "export":
     st.subheader("📊 Export Summary")
     if not workout_stats.empty:
         st.write(f"**Total workouts available for export:** {len(workout_stats)}")
-        st.write(f"**Date range:** {workout_stats['timestamp'].min()[:10]} to {workout_stats['timestamp'].max()[:10]}")
-        st.write(f"**Data size:** {len(workout_stats.to_csv())} characters")
+        st.write(f"**Date range:** {workout_stats['timestamp'].min():%Y-%m-%d} to {workout_stats['timestamp'].max():%Y-%m-%d}")
+        st.write(f"**Data size:** {history_bytes(LOG_PATH) / 1024:,.1f} KB")
     else:
         st.info("No workout data available for export yet. Start working out to generate data!")
 
+SECTIONS = {
+    "home": show_home_section,
+    "workout": show_workout_section,
+    "dashboard": show_dashboard_section,
+    "gamification": show_gamification_section,
+    "voice": show_voice_section,
+    "export": show_export_section,
+}
+
+with st.sidebar:
+    show_sidebar()
+
+# Main content area
+# Initialize current section if not set
+if 'current_section' not in st.session_state:
+    st.session_state.current_section = "home"
+
+SECTIONS[st.session_state.current_section]()
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -658,7 +890,3 @@ st.markdown("""
     <p>Powered by OpenCV, MediaPipe, and Streamlit</p>
 </div>
 """, unsafe_allow_html=True)
-
-# Auto-refresh for real-time updates
-# if st.session_state.workout_started:
-#     st_autorefresh(interval=5000, key="workout_refresh")
\ No newline at end of file
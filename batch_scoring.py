@@ -0,0 +1,278 @@
+import numpy as np
+
+# Smoothing and confidence cut-off come from scoring so the two scorers cannot drift apart
+from scoring import (EXERCISE_ANGLES, LANDMARKS, MIN_CONFIDENCE, SIDE_ANGLES, SIDE_SWITCH_MARGIN,
+                     SMOOTHING_RECENT_WEIGHT, SMOOTHING_WINDOW)
+from utils import IDEAL_ANGLES
+
+GREEN, ORANGE, RED = (0, 255, 0), (255, 165, 0), (0, 0, 255)
+BURPEE_STATES = ["stand", "squat", "plank", "squat_up"]
+# Angle reps are counted on and its (down, up) hysteresis thresholds
+REP_THRESHOLDS = {
+    "squat": ("knee", 90, 160),
+    "pushup": ("elbow", 80, 160),
+    "curl": ("elbow", 60, 150),
+    "lunge": ("knee", 90, 150),
+}
+
+# Form checks in the order ExerciseScorer applies them: (condition, feedback, color, score).
+# Conditions read {"angle", "back"} arrays (NaN where not visible); a score is a
+# constant or an (IDEAL_ANGLES exercise, angle name, value key) to grade against.
+_missing = "Adjusting pose detection..."
+_no_back = "Cannot see your back clearly"
+FORM_RULES = {
+    "squat": [
+        (lambda v: np.isnan(v["angle"]), _missing, ORANGE, 50),
+        (lambda v: (v["angle"] < 50) | (v["angle"] > 180), "Knee angle incorrect!", RED, ("squat", "bottom_knee", "angle")),
+        (lambda v: np.isnan(v["back"]), _no_back, ORANGE, 70),
+        (lambda v: v["back"] < 145, "Straighten your back!", RED, ("squat", "back", "back")),
+        (None, "Perfect squat form!", GREEN, 100),
+    ],
+    "pushup": [
+        (lambda v: np.isnan(v["angle"]), _missing, ORANGE, 50),
+        (lambda v: v["angle"] < 60, "Too low on push-up!", RED, ("pushup", "down_elbow", "angle")),
+        (lambda v: v["angle"] > 180, "Don't lock elbows!", RED, ("pushup", "up_elbow", "angle")),
+        (lambda v: np.isnan(v["back"]), _no_back, ORANGE, 70),
+        (None, "Perfect push-up form!", GREEN, 100),
+    ],
+    "curl": [
+        (lambda v: np.isnan(v["angle"]), _missing, ORANGE, 50),
+        (lambda v: v["angle"] > 160, "Fully extended arm!", RED, ("curl", "down_elbow", "angle")),
+        (lambda v: v["angle"] < 40, "Excellent curl!", GREEN, 100),
+        (None, "Keep curling!", GREEN, ("curl", "up_elbow", "angle")),
+    ],
+    "lunge": [
+        (lambda v: np.isnan(v["angle"]), _missing, ORANGE, 50),
+        (lambda v: (v["angle"] < 60) | (v["angle"] > 170), "Incorrect lunge form!", RED, ("lunge", "bottom_knee", "angle")),
+        (lambda v: np.isnan(v["back"]), _no_back, ORANGE, 70),
+        (None, "Nice lunge form!", GREEN, 100),
+    ],
+    "plank": [
+        (lambda v: np.isnan(v["back"]), _no_back, ORANGE, 70),
+        (lambda v: (v["back"] < 145) | (v["back"] > 165), "Keep your back straight!", RED, ("plank", "back", "back")),
+        (None, "Hold steady!", GREEN, 100),
+    ],
+    "burpee": [
+        (lambda v: np.isnan(v["angle"]), _missing, ORANGE, 50),
+    ] + [
+        (lambda v, code=code: v["state"] == code, f"Burpee state: {state}", GREEN, 100)
+        for code, state in enumerate(BURPEE_STATES)
+    ],
+}
+
+
+def form_scores(exercise: str, angle_name: str, angles: np.ndarray) -> np.ndarray:
+    """Vectorized utils.form_score"""
+    if exercise not in IDEAL_ANGLES or angle_name not in IDEAL_ANGLES[exercise]:
+        return np.full(len(angles), 100)
+    target = IDEAL_ANGLES[exercise][angle_name]["target"]
+    tolerance = IDEAL_ANGLES[exercise][angle_name]["tolerance"]
+    diff = np.abs(np.nan_to_num(angles) - float(target))
+    return np.select([diff <= tolerance, diff <= tolerance * 2, diff <= tolerance * 3], [100, 80, 60],
+                     np.maximum(0, 100 - (diff * 2).astype(np.int64)))
+
+
+class _ExerciseGroup:
+    """State for the sessions of one exercise, one row per session.
+
+    Angle slots are the plan's angles for each side they can be read from
+    ("l_knee" and "r_knee" for a side-neutral "knee"), each with its own smoothing buffer.
+    """
+
+    def __init__(self, exercise: str, indices: np.ndarray, best_side: bool):
+        self.exercise = exercise
+        self.indices = indices
+        names = EXERCISE_ANGLES[exercise]
+        self.sided = [name for name in names if name[:2] not in ("l_", "r_")]
+        self.fixed = [name for name in names if name[:2] in ("l_", "r_")]
+        self.best_side = best_side and bool(self.sided)
+        self.slots = [f"{side}_{name}" for name in self.sided for side in ("l", "r")] + self.fixed
+        self.triples = np.array([[LANDMARKS[slot[:2] + part] for part in SIDE_ANGLES[slot[2:]]]
+                                 for slot in self.slots])
+        self.side_landmarks = [sorted({index for slot, triple in zip(self.slots, self.triples)
+                                       if slot.startswith(prefix) and slot[2:] in self.sided for index in triple})
+                               for prefix in ("l_", "r_")]
+        self.rules = FORM_RULES[exercise]
+        self.messages = [(message, color) for _, message, color, _ in self.rules]
+
+        count, slots = len(indices), len(self.slots)
+        self.right_side = np.zeros(count, dtype=bool)
+        self.buffer_angle = np.zeros((count, slots, SMOOTHING_WINDOW))
+        self.buffer_confidence = np.zeros((count, slots, SMOOTHING_WINDOW))
+        self.filled = np.zeros((count, slots), dtype=np.int64)
+        self.direction = np.zeros(count, dtype=np.int8)
+        self.state = np.zeros(count, dtype=np.int8)
+
+    def reset(self, rows):
+        self.right_side[rows] = False
+        self.buffer_angle[rows] = 0.0
+        self.buffer_confidence[rows] = 0.0
+        self.filled[rows] = 0
+        self.direction[rows] = 0
+        self.state[rows] = 0
+
+    def _raw_angles(self, landmarks: np.ndarray, width: np.ndarray, height: np.ndarray) -> tuple:
+        """Unsmoothed angle per slot and mean confidence; NaN where a landmark is below MIN_CONFIDENCE"""
+        points = landmarks[:, self.triples].astype(np.float64)  # (G, S, 3, 4)
+        scale = np.stack([width, height, width], axis=-1)[:, None, None, :]
+        xyz = points[..., :3] * scale
+        visibility = points[..., 3]
+        ba = xyz[:, :, 0] - xyz[:, :, 1]
+        bc = xyz[:, :, 2] - xyz[:, :, 1]
+        dot = ba[..., 0] * bc[..., 0] + ba[..., 1] * bc[..., 1] + ba[..., 2] * bc[..., 2]
+        magnitude = (np.sqrt(ba[..., 0] ** 2 + ba[..., 1] ** 2 + ba[..., 2] ** 2)
+                     * np.sqrt(bc[..., 0] ** 2 + bc[..., 1] ** 2 + bc[..., 2] ** 2))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            angle = np.degrees(np.arccos(np.clip(dot / magnitude, -1.0, 1.0)))
+        confidence = (visibility[..., 0] + visibility[..., 1] + visibility[..., 2]) / 3
+        angle[(visibility.min(axis=-1) < MIN_CONFIDENCE) | ~np.isfinite(angle)] = np.nan
+        return angle, confidence
+
+    def _choose_side(self, landmarks: np.ndarray):
+        if not self.best_side:
+            return
+        left, right = (landmarks[:, indices, 3].astype(np.float64).mean(axis=1) for indices in self.side_landmarks)
+        current = np.where(self.right_side, right, left)
+        other = np.where(self.right_side, left, right)
+        self.right_side ^= other > current + SIDE_SWITCH_MARGIN
+
+    def _smooth(self, angle: np.ndarray, confidence: np.ndarray, update: np.ndarray) -> np.ndarray:
+        """Push this frame's angles into the buffers marked in ``update`` and return the smoothed values"""
+        rows, slots = np.nonzero(update)
+        self.buffer_angle[rows, slots, :-1] = self.buffer_angle[rows, slots, 1:]
+        self.buffer_angle[rows, slots, -1] = angle[rows, slots]
+        self.buffer_confidence[rows, slots, :-1] = self.buffer_confidence[rows, slots, 1:]
+        self.buffer_confidence[rows, slots, -1] = confidence[rows, slots]
+        filled = np.minimum(self.filled[rows, slots] + 1, SMOOTHING_WINDOW)
+        self.filled[rows, slots] = filled
+
+        # Oldest sample has recency weight 1, the newest SMOOTHING_RECENT_WEIGHT
+        rank = np.arange(SMOOTHING_WINDOW) - (SMOOTHING_WINDOW - filled)[:, None]
+        span = np.maximum(filled - 1, 1)[:, None]
+        recency = np.where(rank >= 0, 1 + (rank / span) * (SMOOTHING_RECENT_WEIGHT - 1), 0.0)
+        weights = recency * self.buffer_confidence[rows, slots]
+        values = self.buffer_angle[rows, slots]
+        smoothed_rows = np.where(filled == 1, values[:, -1], (values * weights).sum(axis=1) / weights.sum(axis=1))
+        smoothed = np.full(angle.shape, np.nan)
+        smoothed[rows, slots] = smoothed_rows
+        return smoothed
+
+    def step(self, landmarks: np.ndarray, width: np.ndarray, height: np.ndarray) -> dict:
+        self._choose_side(landmarks)
+        angle, confidence = self._raw_angles(landmarks, width, height)
+        # Only the chosen side of a side-neutral angle is read (and smoothed)
+        active = np.ones(angle.shape, dtype=bool)
+        for i, name in enumerate(self.sided):
+            active[:, 2 * i] = ~self.right_side
+            active[:, 2 * i + 1] = self.right_side
+        smoothed = self._smooth(angle, confidence, active & ~np.isnan(angle))
+
+        angles = {}
+        for i, name in enumerate(self.sided):
+            angles[name] = np.where(self.right_side, smoothed[:, 2 * i + 1], smoothed[:, 2 * i])
+        for offset, name in enumerate(self.fixed):
+            angles[name] = smoothed[:, 2 * len(self.sided) + offset]
+        return angles
+
+
+class BatchScorer:
+    """ExerciseScorer for K sessions at once, with every session's state held in parallel arrays.
+
+    ``step`` takes a (K, 33, 4) landmark batch and advances all sessions by one frame:
+    angles, smoothing, hysteresis rep counting, the burpee state machine and form
+    scores are computed per exercise group with NumPy, not per session. Results stay on
+    the instance (``counter``, ``form_score``, ``rep_angle``, ``feedback_code``) and
+    match ExerciseScorer frame for frame.
+    """
+
+    def __init__(self, exercises: list, best_side: bool = False):
+        self.exercises = list(exercises)
+        self.count = len(self.exercises)
+        unknown = sorted(set(self.exercises) - set(FORM_RULES))
+        if unknown:
+            raise ValueError(f"Unknown exercise: {', '.join(unknown)}")
+        names = np.array(self.exercises)
+        self.groups = [_ExerciseGroup(exercise, np.flatnonzero(names == exercise), best_side)
+                       for exercise in sorted(set(self.exercises))]
+        self._group_of = np.zeros(self.count, dtype=np.int64)
+        self._row_of = np.zeros(self.count, dtype=np.int64)
+        for g, group in enumerate(self.groups):
+            self._group_of[group.indices] = g
+            self._row_of[group.indices] = np.arange(len(group.indices))
+        self.counter = np.zeros(self.count, dtype=np.int64)
+        self.form_score = np.full(self.count, 100, dtype=np.int64)
+        self.feedback_code = np.zeros(self.count, dtype=np.int64)
+        self.rep_angle = np.full(self.count, np.nan)
+
+    def __len__(self):
+        return self.count
+
+    def reset(self, sessions):
+        """Start fresh sessions in the given slots (same exercise)"""
+        sessions = np.atleast_1d(sessions)
+        for session in sessions:
+            self.groups[self._group_of[session]].reset(self._row_of[session])
+        self.counter[sessions] = 0
+        self.form_score[sessions] = 100
+        self.feedback_code[sessions] = 0
+        self.rep_angle[sessions] = np.nan
+
+    def feedback(self, session: int) -> tuple:
+        """(message, color) of a session's last frame"""
+        return self.groups[self._group_of[session]].messages[self.feedback_code[session]]
+
+    def step(self, landmarks, width=1280, height=720) -> np.ndarray:
+        """Advance every session by one frame. Returns a (K,) bool array of sessions that completed a rep."""
+        landmarks = np.asarray(landmarks)
+        width = np.broadcast_to(np.asarray(width, dtype=np.float64), (self.count,))
+        height = np.broadcast_to(np.asarray(height, dtype=np.float64), (self.count,))
+        completed = np.zeros(self.count, dtype=bool)
+        for group in self.groups:
+            indices = group.indices
+            angles = group.step(landmarks[indices], width[indices], height[indices])
+            back = angles.get("back", np.full(len(indices), np.nan))
+            counted = np.zeros(len(indices), dtype=bool)
+
+            if group.exercise in REP_THRESHOLDS:
+                name, down, up = REP_THRESHOLDS[group.exercise]
+                angle = angles[name]
+                reached_down = (group.direction == 0) & (angle < down)
+                counted = (group.direction == 1) & (angle > up)
+                group.direction[reached_down] = 1
+                group.direction[counted] = 0
+            elif group.exercise == "burpee":
+                angle = np.minimum(angles["l_knee"], angles["r_knee"])  # NaN if either is missing
+                visible = ~np.isnan(angle) & ~np.isnan(back)
+                state = group.state
+                to_squat = visible & (state == 0) & (angle < 100)
+                to_plank = visible & (state == 1) & (back < 140)
+                to_squat_up = visible & (state == 2) & (back > 160) & (angle < 100)
+                counted = visible & (state == 3) & (angle > 170)
+                state[to_squat] = 1
+                state[to_plank] = 2
+                state[to_squat_up] = 3
+                state[counted] = 0
+            else:
+                angle = np.full(len(indices), np.nan)
+
+            values = {"angle": angle, "back": back, "state": group.state}
+            conditions = [rule[0](values) if rule[0] is not None else np.ones(len(indices), dtype=bool)
+                          for rule in group.rules]
+            code = np.select(conditions, np.arange(len(conditions)), default=len(conditions) - 1)
+            score = np.zeros(len(indices), dtype=np.int64)
+            for i, (_, _, _, rule_score) in enumerate(group.rules):
+                selected = code == i
+                if not selected.any():
+                    continue
+                if isinstance(rule_score, tuple):
+                    ideal_exercise, ideal_name, key = rule_score
+                    score[selected] = form_scores(ideal_exercise, ideal_name, values[key][selected])
+                else:
+                    score[selected] = rule_score
+
+            self.counter[indices] += counted
+            self.feedback_code[indices] = code
+            self.form_score[indices] = score
+            self.rep_angle[indices] = angle
+            completed[indices] = counted
+        return completed
@@ -0,0 +1,239 @@
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+
+from quality import QUALITY_LEVELS
+from utils import atomic_write_json
+
+CAMERA_PROFILE_PATH = "camera_profiles.json"
+# Pixel formats tried per resolution; None keeps the driver's default
+FOURCC_CANDIDATES = ["MJPG", "YUYV", None]
+REQUEST_FPS = 30
+PROBE_FRAMES = 45
+WARMUP_FRAMES = 10
+# A mode qualifies for a resolution when it delivers this share of the session's target FPS
+MIN_FPS_SHARE = 0.9
+# Driver timestamps further off than this are treated as a different clock and ignored
+MAX_PLAUSIBLE_AGE_MS = 1000.0
+STALL_FRAMES = 3
+
+
+# ---------- Probing ----------
+def device_key(source) -> str:
+    """Cache key for a capture source: index plus the device name where the OS reports one"""
+    if isinstance(source, int):
+        try:
+            with open(f"/sys/class/video4linux/video{source}/name", 'r', encoding='utf-8') as f:
+                return f"video{source}:{f.read().strip()}"
+        except OSError:
+            return f"video{source}"
+    return str(source)
+
+
+def _fourcc_text(code: float) -> str:
+    code = int(code)
+    text = "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+    return text if text.isprintable() and text.strip() else ""
+
+
+def configure(cap, fourcc, width: int, height: int, fps: float = REQUEST_FPS, buffer_size: int = 1) -> bool:
+    """Request a capture mode. Format goes first: many drivers only offer a size in some formats.
+
+    Returns whether the driver accepted the buffer size (not every backend has one).
+    """
+    import cv2
+    if fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+    return bool(buffer_size and cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size))
+
+
+def probe_mode(source, fourcc, width: int, height: int, fps: float = REQUEST_FPS, frames: int = PROBE_FRAMES) -> dict:
+    """Open ``source`` in one mode and measure what it actually delivers.
+
+    Frame age comes from the driver's buffer timestamps when they share our monotonic
+    clock (V4L2 does). Otherwise it is estimated from buffering: after stalling for a
+    few frame intervals, reads that return at once were already queued, so
+    age ~ (queued + 0.5) frame intervals. ``latency_ms`` adds the read/decode time.
+    """
+    import cv2
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        return None
+    try:
+        buffer_applied = configure(cap, fourcc, width, height, fps)
+        for _ in range(WARMUP_FRAMES):
+            cap.read()
+        stamps, reads, ages = [], [], []
+        for _ in range(frames):
+            started = time.monotonic()
+            ok, _ = cap.read()
+            now = time.monotonic()
+            if not ok:
+                continue
+            stamps.append(now)
+            reads.append(now - started)
+            driver_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            if driver_ms > 0:
+                ages.append(now * 1000.0 - driver_ms)
+        if len(stamps) < 2:
+            return None
+        delivered_fps = (len(stamps) - 1) / (stamps[-1] - stamps[0])
+        interval = 1.0 / delivered_fps
+
+        time.sleep(STALL_FRAMES * interval)
+        queued = 0
+        for _ in range(STALL_FRAMES + 5):
+            started = time.monotonic()
+            cap.read()
+            if time.monotonic() - started > 0.3 * interval:
+                break
+            queued += 1
+
+        ages = [age for age in ages if 0.0 <= age <= MAX_PLAUSIBLE_AGE_MS]
+        if len(ages) >= frames // 2:
+            frame_age_ms, age_source = statistics.median(ages), "timestamp"
+        else:
+            frame_age_ms, age_source = (queued + 0.5) * interval * 1000.0, "buffering"
+        read_ms = statistics.median(reads) * 1000.0
+        return {
+            "fourcc": fourcc,
+            "actual_fourcc": _fourcc_text(cap.get(cv2.CAP_PROP_FOURCC)),
+            "width": width,
+            "height": height,
+            "actual_width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "actual_height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "requested_fps": fps,
+            "delivered_fps": round(delivered_fps, 2),
+            "buffer_size": 1 if buffer_applied else None,
+            "queued_frames": queued,
+            "frame_age_ms": round(frame_age_ms, 1),
+            "age_source": age_source,
+            "read_ms": round(read_ms, 2),
+            "latency_ms": round(frame_age_ms + read_ms, 1),
+        }
+    finally:
+        cap.release()
+
+
+def capture_resolutions() -> list:
+    """Distinct capture sizes the quality controller can ask for, smallest first"""
+    return sorted({(width, height) for width, height, _, _ in QUALITY_LEVELS})
+
+
+def probe_camera(source=0, target_fps: float = 24.0, fourccs=FOURCC_CANDIDATES, frames: int = PROBE_FRAMES) -> dict:
+    """Probe every format at every quality-level resolution and pick the lowest-latency mode for each"""
+    modes = []
+    for width, height in capture_resolutions():
+        for fourcc in fourccs:
+            mode = probe_mode(source, fourcc, width, height, REQUEST_FPS, frames)
+            if mode is not None:
+                modes.append(mode)
+                print(f"  {fourcc or 'default':>7} {width}x{height}: {mode['delivered_fps']:5.1f} FPS, "
+                      f"frame age {mode['frame_age_ms']:6.1f} ms ({mode['age_source']}), read {mode['read_ms']:5.1f} ms")
+    return {"device": device_key(source), "probed_at": datetime.now().isoformat(), "target_fps": target_fps,
+            "modes": modes, "choices": choose_modes(modes, target_fps)}
+
+
+def choose_modes(modes: list, target_fps: float) -> dict:
+    """Per "WxH": the mode with the lowest latency among those that really deliver that size at the target FPS"""
+    choices = {}
+    for mode in modes:
+        if (mode["actual_width"], mode["actual_height"]) != (mode["width"], mode["height"]):
+            continue
+        if mode["delivered_fps"] < MIN_FPS_SHARE * target_fps:
+            continue
+        key = f"{mode['width']}x{mode['height']}"
+        if key not in choices or mode["latency_ms"] < choices[key]["latency_ms"]:
+            choices[key] = mode
+    return {key: {"fourcc": mode["fourcc"], "fps": mode["requested_fps"], "buffer_size": mode["buffer_size"],
+                  "latency_ms": mode["latency_ms"], "delivered_fps": mode["delivered_fps"]}
+            for key, mode in choices.items()}
+
+
+# ---------- Cache ----------
+def load_profiles(path: str = CAMERA_PROFILE_PATH) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def camera_profile(source=0, target_fps: float = 24.0, reprobe: bool = False, path: str = CAMERA_PROFILE_PATH) -> dict:
+    """Cached probe result for ``source``; probes (a few seconds per mode) on first use or when asked"""
+    key = device_key(source)
+    profiles = load_profiles(path)
+    profile = profiles.get(key)
+    if profile is not None and not reprobe:
+        # Measurements do not depend on the target; only the choice does
+        return {**profile, "target_fps": target_fps, "choices": choose_modes(profile["modes"], target_fps)}
+    print(f"Probing camera {key} for the lowest-latency capture modes...")
+    profile = probe_camera(source, target_fps)
+    if profile["modes"]:
+        profiles[key] = profile
+        atomic_write_json(path, profiles)
+    return profile
+
+
+# ---------- Applying ----------
+def apply_mode(cap, profile: dict, width: int, height: int):
+    """Switch ``cap`` to ``width`` x ``height`` in the profile's chosen format, FPS and buffer depth"""
+    choice = (profile or {}).get("choices", {}).get(f"{width}x{height}")
+    if choice is None:
+        configure(cap, None, width, height, fps=None, buffer_size=1)
+    else:
+        configure(cap, choice["fourcc"], width, height, choice["fps"], choice["buffer_size"])
+
+
+def open_camera(source, profile: dict, width: int, height: int):
+    import cv2
+    cap = cv2.VideoCapture(source)
+    apply_mode(cap, profile, width, height)
+    return cap
+
+
+def max_quality_level(profile: dict):
+    """Highest quality level whose resolution the camera delivers at the target FPS (None = no limit known)"""
+    choices = (profile or {}).get("choices")
+    if not choices:
+        return None
+    usable = [level for level, (width, height, _, _) in enumerate(QUALITY_LEVELS) if f"{width}x{height}" in choices]
+    return max(usable) if usable else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Probe camera capture modes and cache the lowest-latency configuration")
+    sub = parser.add_subparsers(dest="command", required=True)
+    probe_parser = sub.add_parser("probe", help="Measure every mode and update the cache")
+    probe_parser.add_argument("--source", default="0", help="Camera index or stream URL")
+    probe_parser.add_argument("--target-fps", type=float, default=24.0)
+    probe_parser.add_argument("--frames", type=int, default=PROBE_FRAMES, help="Frames measured per mode")
+    sub.add_parser("show", help="Print the cached profiles")
+    cli_args = parser.parse_args()
+
+    if cli_args.command == "probe":
+        source = int(cli_args.source) if cli_args.source.isdigit() else cli_args.source
+        result = probe_camera(source, cli_args.target_fps, frames=cli_args.frames)
+        if result["modes"]:
+            cached = load_profiles()
+            cached[result["device"]] = result
+            atomic_write_json(CAMERA_PROFILE_PATH, cached)
+        else:
+            print("No capture modes could be opened")
+    else:
+        result = load_profiles()
+        if not result:
+            print(f"No camera profiles in {CAMERA_PROFILE_PATH}")
+    for device, profile in ([(result["device"], result)] if cli_args.command == "probe" else result.items()):
+        print(f"{device} (probed {profile['probed_at'][:16]}, target {profile['target_fps']:g} FPS)")
+        for size, choice in sorted(profile["choices"].items(), key=lambda item: [int(v) for v in item[0].split("x")]):
+            print(f"  {size:>9}: {choice['fourcc'] or 'default':>7}, buffer {choice['buffer_size'] or 'driver'}, "
+                  f"{choice['delivered_fps']:.1f} FPS, ~{choice['latency_ms']:.0f} ms")
+        if not profile["choices"]:
+            print("  no mode reached the target FPS; capture stays at driver defaults")
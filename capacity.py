@@ -0,0 +1,285 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+# Environment variables the BLAS/OpenMP runtimes behind NumPy read when they load
+BLAS_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+DEFAULT_FPS = 24.0
+DEFAULT_SECONDS = 10.0
+# A session is sustained when every session keeps this share of the target FPS and p99 fits in a frame
+SUSTAINED_FPS_SHARE = 0.95
+# Stand-in for pose inference when MediaPipe is not used: a 3-layer dense pass over a 256x768 input
+SYNTHETIC_LAYERS = (768, 512, 512, 256)
+CAPTURE_SHAPE = (720, 1280, 3)
+
+
+# ---------- Thread Budget ----------
+def parse_cpus(text: str) -> list:
+    """CPU list like "0-3,6" -> [0, 1, 2, 3, 6]"""
+    cpus = []
+    for part in filter(None, (part.strip() for part in text.split(","))):
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+class ThreadBudget:
+    """How many threads one workout session may use, and optionally which CPUs.
+
+    - ``opencv_threads``: ``cv2.setNumThreads`` (colour conversion, resizing, drawing)
+    - ``blas_threads``: the OpenMP/BLAS pool behind NumPy; only takes effect when set
+      before NumPy is first imported, so call ``apply_env`` at the top of the process
+    - ``inference_threads``: MediaPipe's Python API has no thread setting and sizes its
+      pools from the machine, so this is applied as CPU affinity: the session is pinned
+      to that many CPUs (slot ``slot`` of the allowed set) unless ``cpus`` is given
+    - ``cpus``: explicit CPU affinity for the whole session
+
+    None leaves a library at its default.
+    """
+
+    def __init__(self, opencv_threads: int = None, blas_threads: int = None, inference_threads: int = None,
+                 cpus: list = None, slot: int = 0):
+        self.opencv_threads = opencv_threads
+        self.blas_threads = blas_threads
+        self.inference_threads = inference_threads
+        self.cpus = list(cpus) if cpus else None
+        self.slot = slot
+
+    @staticmethod
+    def add_arguments(parser):
+        group = parser.add_argument_group("thread budget")
+        group.add_argument("--opencv-threads", type=int, default=None, help="OpenCV worker threads")
+        group.add_argument("--blas-threads", type=int, default=None, help="NumPy BLAS/OpenMP threads")
+        group.add_argument("--inference-threads", type=int, default=None,
+                           help="CPUs pose inference may use (applied as CPU affinity)")
+        group.add_argument("--cpus", default=None, help="Pin the session to these CPUs, e.g. 0-3 or 0,2")
+        group.add_argument("--cpu-slot", type=int, default=0,
+                           help="Which block of --inference-threads CPUs to use when several sessions share a host")
+
+    @classmethod
+    def from_args(cls, args) -> "ThreadBudget":
+        return cls(args.opencv_threads, args.blas_threads, args.inference_threads,
+                   parse_cpus(args.cpus) if args.cpus else None, args.cpu_slot)
+
+    @classmethod
+    def from_argv(cls, argv: list = None) -> "ThreadBudget":
+        """Read just the budget options, before the process imports NumPy or OpenCV"""
+        parser = argparse.ArgumentParser(add_help=False)
+        cls.add_arguments(parser)
+        known, _ = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+        return cls.from_args(known)
+
+    @classmethod
+    def parse(cls, text: str) -> "ThreadBudget":
+        """Benchmark config "opencv/blas/inference", "-" for default (e.g. "1/1/2"); "default" for none"""
+        if text == "default":
+            return cls()
+        values = [None if value in ("", "-") else int(value) for value in text.split("/")]
+        return cls(*(values + [None] * 3)[:3])
+
+    def label(self) -> str:
+        if not any((self.opencv_threads, self.blas_threads, self.inference_threads, self.cpus)):
+            return "default"
+        return "/".join("-" if value is None else str(value)
+                        for value in (self.opencv_threads, self.blas_threads, self.inference_threads))
+
+    def to_dict(self) -> dict:
+        return {"opencv_threads": self.opencv_threads, "blas_threads": self.blas_threads,
+                "inference_threads": self.inference_threads, "cpus": self.cpus, "slot": self.slot}
+
+    def apply_env(self):
+        """Set the BLAS thread variables; must run before NumPy is imported to take effect"""
+        if self.blas_threads:
+            if "numpy" in sys.modules:
+                print("Thread budget: NumPy is already loaded, --blas-threads applies to child processes only")
+            for name in BLAS_ENV:
+                os.environ[name] = str(self.blas_threads)
+
+    def affinity(self) -> list:
+        """CPUs this session should be pinned to, or None to leave it unpinned"""
+        if self.cpus:
+            return self.cpus
+        if not self.inference_threads or not hasattr(os, "sched_getaffinity"):
+            return None
+        allowed = sorted(os.sched_getaffinity(0))
+        start = self.slot * self.inference_threads
+        return [allowed[(start + i) % len(allowed)] for i in range(min(self.inference_threads, len(allowed)))]
+
+    def apply(self):
+        """Apply the OpenCV thread count and CPU affinity to this process"""
+        if self.opencv_threads is not None:
+            try:
+                import cv2
+                cv2.setNumThreads(self.opencv_threads)
+            except ImportError:
+                pass
+        cpus = self.affinity()
+        if cpus:
+            if hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(0, cpus)
+            else:
+                print("Thread budget: CPU affinity is not supported on this platform")
+        return self
+
+
+def available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# ---------- Benchmark ----------
+def _percentile(values: list, share: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def _workload(kind: str):
+    """Per-frame stand-in for capture conversion and pose inference"""
+    import numpy as np
+    if kind == "none":
+        return lambda: None
+    frame = np.random.default_rng(0).integers(0, 255, CAPTURE_SHAPE, dtype=np.uint8)
+    try:
+        import cv2
+    except ImportError:
+        cv2 = None
+    if kind == "mediapipe":
+        if cv2 is None:
+            raise ImportError("The mediapipe workload needs OpenCV")
+        import mediapipe as mp
+        pose = mp.solutions.pose.Pose(model_complexity=1)
+        return lambda: pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+    rng = np.random.default_rng(1)
+    weights = [rng.standard_normal((rows, cols)).astype(np.float32) / np.sqrt(rows)
+               for rows, cols in zip(SYNTHETIC_LAYERS, SYNTHETIC_LAYERS[1:])]
+    sample_rows = np.linspace(0, CAPTURE_SHAPE[0] - 1, 256).astype(np.intp)
+    sample_cols = np.linspace(0, CAPTURE_SHAPE[1] - 1, 256).astype(np.intp)
+
+    def infer():
+        if cv2 is not None:
+            small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), (256, 256))
+        else:
+            small = frame[sample_rows[:, None], sample_cols]
+        x = small.reshape(256, SYNTHETIC_LAYERS[0]).astype(np.float32) / 255.0
+        for weight in weights:
+            x = np.maximum(x @ weight, 0.0)
+        return x
+    return infer
+
+
+def _run_session(task: dict) -> dict:
+    """One benchmark session: the workload plus scoring, paced to ``fps`` like a camera"""
+    budget = ThreadBudget(**task["budget"])
+    budget.apply_env()
+    budget.apply()
+    from scoring import ExerciseScorer, Landmark
+    from synthetic import generate
+
+    exercise = task["exercise"]
+    frames, _ = generate(exercise, reps=6, seed=task["budget"]["slot"])
+    landmarks = [[Landmark(*row) for row in frame.tolist()] for frame in frames]
+    infer = _workload(task["workload"])
+    scorer = ExerciseScorer(exercise)
+    infer()
+
+    interval = 1.0 / task["fps"]
+    time.sleep(max(0.0, task["start_at"] - time.time()))
+    started = time.perf_counter()
+    deadline = started + task["seconds"]
+    next_frame = started
+    latencies = []
+    while True:
+        frame_start = time.perf_counter()
+        if frame_start >= deadline:
+            break
+        infer()
+        scorer.update(landmarks[len(latencies) % len(landmarks)], 1280, 720)
+        latencies.append(time.perf_counter() - frame_start)
+        next_frame += interval
+        delay = next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Behind: a camera drops the missed frames rather than queueing them
+            next_frame = time.perf_counter()
+    return {"fps": len(latencies) / (time.perf_counter() - started), "latencies": latencies}
+
+
+def measure_capacity(budget: ThreadBudget, sessions: int, fps: float = DEFAULT_FPS, seconds: float = DEFAULT_SECONDS,
+                     workload: str = "synthetic", exercise: str = "squat") -> dict:
+    """Run ``sessions`` concurrent session processes under ``budget`` and summarise FPS and latency"""
+    start_at = time.time() + 2.0 + 0.2 * sessions
+    tasks = []
+    for slot in range(sessions):
+        session_budget = ThreadBudget(**{**budget.to_dict(), "slot": slot})
+        tasks.append({"budget": session_budget.to_dict(), "exercise": exercise, "workload": workload,
+                      "fps": fps, "seconds": seconds, "start_at": start_at})
+    # Spawned, so each session applies its BLAS budget before importing NumPy
+    with ProcessPoolExecutor(max_workers=sessions, mp_context=get_context("spawn")) as pool:
+        results = list(pool.map(_run_session, tasks))
+    latencies = [latency for result in results for latency in result["latencies"]]
+    session_fps = [result["fps"] for result in results]
+    p99 = _percentile(latencies, 0.99)
+    return {
+        "config": budget.label(),
+        "sessions": sessions,
+        "mean_fps": sum(session_fps) / len(session_fps),
+        "min_fps": min(session_fps),
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p99_ms": p99 * 1000,
+        "sustained": min(session_fps) >= SUSTAINED_FPS_SHARE * fps and p99 <= 1.0 / fps,
+    }
+
+
+def plan_capacity(budgets: list, session_counts: list, **kwargs) -> dict:
+    """Sweep every budget over the session counts; capacity is the largest sustained count"""
+    rows = []
+    capacity = {}
+    for budget in budgets:
+        for sessions in sorted(session_counts):
+            row = measure_capacity(budget, sessions, **kwargs)
+            rows.append(row)
+            print(f"{row['config']:>9} {sessions:>4} sessions: {row['mean_fps']:6.1f} FPS mean, "
+                  f"{row['min_fps']:6.1f} min, p50 {row['p50_ms']:6.1f} ms, p99 {row['p99_ms']:6.1f} ms"
+                  f"  {'sustained' if row['sustained'] else 'over capacity'}")
+            if row["sustained"]:
+                capacity[budget.label()] = sessions
+            else:
+                break
+    cpus = available_cpus()
+    return {"cpus": cpus, "rows": rows,
+            "capacity": {label: {"sessions": count, "sessions_per_core": count / cpus} for label, count in capacity.items()}}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure how many workout sessions this host sustains per thread budget")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8], help="Concurrent session counts to try")
+    parser.add_argument("--configs", nargs="+", default=["default", "1/1/1"],
+                        help='Thread budgets as "opencv/blas/inference" ("-" keeps a default), or "default"')
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS, help="Frame rate each session must hold")
+    parser.add_argument("--seconds", type=float, default=DEFAULT_SECONDS, help="Measured seconds per run")
+    parser.add_argument("--workload", choices=["synthetic", "mediapipe", "none"], default="synthetic",
+                        help="Per-frame inference: a NumPy stand-in, real MediaPipe Pose, or scoring only")
+    parser.add_argument("--exercise", default="squat")
+    parser.add_argument("--out", default=None, help="Write the results as JSON")
+    cli_args = parser.parse_args()
+
+    plan = plan_capacity([ThreadBudget.parse(text) for text in cli_args.configs], cli_args.sessions,
+                         fps=cli_args.fps, seconds=cli_args.seconds, workload=cli_args.workload,
+                         exercise=cli_args.exercise)
+    print(f"\n{plan['cpus']} CPUs available")
+    for label, entry in plan["capacity"].items():
+        print(f"{label:>9}: {entry['sessions']} sessions sustained ({entry['sessions_per_core']:.2f} per core)")
+    for budget in cli_args.configs:
+        if ThreadBudget.parse(budget).label() not in plan["capacity"]:
+            print(f"{ThreadBudget.parse(budget).label():>9}: not sustained even at {min(cli_args.sessions)} sessions")
+    if cli_args.out:
+        from utils import atomic_write_json
+        atomic_write_json(cli_args.out, plan)
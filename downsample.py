@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# Roughly one plotted point per this many pixels is as much as a line chart can show
+PIXELS_PER_POINT = 4
+MIN_POINTS = 30
+MAX_POINTS = 1000
+# Bucket sizes tried in order, coarsest last: (pandas period, axis label)
+BUCKETS = [("D", "Day"), ("W", "Week"), ("M", "Month")]
+PIE_SLICES = 8
+
+
+def point_budget(width_px: int, pixels_per_point: int = PIXELS_PER_POINT) -> int:
+    """Number of points worth sending for a chart ``width_px`` wide"""
+    return int(min(MAX_POINTS, max(MIN_POINTS, width_px // pixels_per_point)))
+
+
+def lttb(x, y, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of ``threshold`` points that keep the shape.
+
+    The first and last points are always kept; every bucket in between keeps the
+    point forming the largest triangle with the previous pick and the next bucket's mean.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start, next_stop = stop, edges[i + 2] if i + 2 < len(edges) else n
+        mean_x = x[next_start:next_stop].mean()
+        mean_y = y[next_start:next_stop].mean()
+        areas = np.abs((x[previous] - mean_x) * (y[start:stop] - y[previous])
+                       - (x[previous] - x[start:stop]) * (mean_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        keep[i + 1] = previous
+    return keep
+
+
+def choose_bucket(start, end, budget: int) -> tuple:
+    """Finest of day/week/month that covers ``start``..``end`` in about ``budget`` points"""
+    span_days = max(1, (pd.Timestamp(end) - pd.Timestamp(start)).days + 1)
+    for (period, label), days_per_bucket in zip(BUCKETS, (1, 7, 30.4)):
+        if span_days / days_per_bucket <= budget:
+            return period, label
+    return BUCKETS[-1]
+
+
+def downsample_timeseries(df: pd.DataFrame, x: str, y: str, width_px: int) -> tuple:
+    """Bucket a (date, value) series by day/week/month, then LTTB it down to the point budget.
+
+    Values are summed per bucket. Returns (frame, bucket label).
+    """
+    budget = point_budget(width_px)
+    if df.empty:
+        return df, BUCKETS[0][1]
+    period, label = choose_bucket(df[x].min(), df[x].max(), budget)
+    if period != "D":
+        starts = df[x].dt.to_period(period).dt.start_time
+        df = df.groupby(starts, sort=True)[y].sum().rename_axis(x).reset_index()
+    if len(df) > budget:
+        df = df.iloc[lttb(df[x].astype("int64"), df[y], budget)].reset_index(drop=True)
+    return df, label
+
+
+def top_categories(counts: pd.Series, limit: int = PIE_SLICES, other: str = "Other") -> pd.Series:
+    """Largest ``limit`` - 1 categories with the rest summed into one ``other`` slice"""
+    if len(counts) <= limit:
+        return counts
+    counts = counts.sort_values(ascending=False)
+    head = counts.iloc[:limit - 1]
+    return pd.concat([head, pd.Series({other: counts.iloc[limit - 1:].sum()})])
@@ -0,0 +1,295 @@
+import argparse
+import os
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# ---------- Layout ----------
+# The segment starts with a fixed int64 header, followed by one int64 metadata row per slot
+# and the frame slots themselves. Every slot is sized for the largest frame the producer
+# will publish; the actual height and width are stored in the slot metadata.
+FRAME_BUS_NAME = "fitmate_frames"
+FRAME_BUS_MAGIC = 0x46424653  # "FBFS"
+FRAME_BUS_VERSION = 1
+
+HEADER_FIELDS = ["magic", "version", "slots", "max_height", "max_width", "channels",
+                 "latest_seq", "latest_slot", "closed", "producer_pid"]
+SLOT_FIELDS = ["seq", "height", "width", "timestamp_ns"]
+_H = {name: i for i, name in enumerate(HEADER_FIELDS)}
+_S = {name: i for i, name in enumerate(SLOT_FIELDS)}
+_HEADER_BYTES = 128
+_SLOT_META_BYTES = len(SLOT_FIELDS) * 8
+
+
+def _frames_offset(slots: int) -> int:
+    meta_end = _HEADER_BYTES + slots * _SLOT_META_BYTES
+    return (meta_end + 63) // 64 * 64
+
+
+def attach_shared_memory(name: str):
+    """Attach to an existing segment without handing its lifetime to this process"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers attached segments with the resource tracker,
+        # which would unlink the producer's segment when this process exits
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+def channel_name(base: str, station: str = None) -> str:
+    """Segment name for one station's channel, so stations on one host never share a segment"""
+    if not station:
+        return base
+    return f"{base}_{re.sub(r'[^A-Za-z0-9_]', '_', station)[:64]}"
+
+
+def pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def create_segment(name: str, size: int, owner_pid) -> shared_memory.SharedMemory:
+    """Create a named segment, replacing one left behind by a process that is no longer running.
+
+    ``owner_pid(shm)`` reads the owner's pid from an existing segment. If that process
+    is still alive the segment is left alone and FileExistsError is raised.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        stale = attach_shared_memory(name)
+        try:
+            pid = owner_pid(stale)
+        except (struct.error, ValueError):
+            pid = 0
+        if pid_alive(pid):
+            stale.close()
+            raise FileExistsError(f"Shared memory segment '{name}' is in use by process {pid}")
+        # Left behind by a session that did not shut down cleanly
+        stale.close()
+        stale.unlink()
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+
+
+def _producer_pid(shm) -> int:
+    return struct.unpack_from("<q", shm.buf, _H["producer_pid"] * 8)[0]
+
+
+class _FrameBusViews:
+    """Zero-copy NumPy views over a frame bus segment"""
+
+    def __init__(self, shm, slots: int, max_height: int, max_width: int, channels: int):
+        self.shm = shm
+        self.header = np.ndarray((len(HEADER_FIELDS),), dtype=np.int64, buffer=shm.buf)
+        self.meta = np.ndarray((slots, len(SLOT_FIELDS)), dtype=np.int64,
+                               buffer=shm.buf, offset=_HEADER_BYTES)
+        self.frames = np.ndarray((slots, max_height, max_width, channels), dtype=np.uint8,
+                                 buffer=shm.buf, offset=_frames_offset(slots))
+
+    def release(self):
+        # Views must be dropped before the segment can be closed
+        self.header = self.meta = self.frames = None
+
+
+# ---------- Producer ----------
+class FrameBusWriter:
+    """Publishes annotated frames into a shared-memory ring buffer.
+
+    ``publish`` never waits for readers: it copies the frame into the next slot and
+    advances the sequence number. Readers that fall behind simply see a newer frame.
+    """
+
+    def __init__(self, name: str = FRAME_BUS_NAME, slots: int = 4,
+                 max_height: int = 720, max_width: int = 1280, channels: int = 3):
+        size = _frames_offset(slots) + slots * max_height * max_width * channels
+        self.shm = create_segment(name, size, _producer_pid)
+
+        self.name = name
+        self.slots = slots
+        self._views = _FrameBusViews(self.shm, slots, max_height, max_width, channels)
+        header = self._views.header
+        header[:] = 0
+        header[_H["magic"]] = FRAME_BUS_MAGIC
+        header[_H["version"]] = FRAME_BUS_VERSION
+        header[_H["slots"]] = slots
+        header[_H["max_height"]] = max_height
+        header[_H["max_width"]] = max_width
+        header[_H["channels"]] = channels
+        header[_H["latest_slot"]] = -1
+        header[_H["producer_pid"]] = os.getpid()
+        self._views.meta[:] = 0
+        self.seq = 0
+
+    def publish(self, frame) -> bool:
+        """Copy a frame into the ring. Frames larger than the slot size are dropped."""
+        views = self._views
+        height, width = frame.shape[:2]
+        if height > views.frames.shape[1] or width > views.frames.shape[2]:
+            return False
+
+        self.seq += 1
+        slot = self.seq % self.slots
+        meta = views.meta[slot]
+        # A negative sequence marks the slot as being written (seqlock)
+        meta[_S["seq"]] = -self.seq
+        views.frames[slot, :height, :width] = frame
+        meta[_S["height"]] = height
+        meta[_S["width"]] = width
+        meta[_S["timestamp_ns"]] = time.time_ns()
+        meta[_S["seq"]] = self.seq
+        views.header[_H["latest_slot"]] = slot
+        views.header[_H["latest_seq"]] = self.seq
+        return True
+
+    def close(self):
+        if self._views is None:
+            return
+        self._views.header[_H["closed"]] = 1
+        self._views.release()
+        self._views = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# ---------- Consumer ----------
+class FrameBusReader:
+    """Reads the most recent frame published on a frame bus"""
+
+    def __init__(self, name: str = FRAME_BUS_NAME):
+        self.shm = attach_shared_memory(name)
+        header = np.ndarray((len(HEADER_FIELDS),), dtype=np.int64, buffer=self.shm.buf)
+        if header[_H["magic"]] != FRAME_BUS_MAGIC or header[_H["version"]] != FRAME_BUS_VERSION:
+            del header
+            self.shm.close()
+            raise ValueError(f"Shared memory segment '{name}' is not a frame bus")
+        self._views = _FrameBusViews(self.shm, int(header[_H["slots"]]), int(header[_H["max_height"]]),
+                                     int(header[_H["max_width"]]), int(header[_H["channels"]]))
+        self.last_seq = 0
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._views.header[_H["closed"]])
+
+    @property
+    def producer_pid(self) -> int:
+        return int(self._views.header[_H["producer_pid"]])
+
+    def latest(self, only_new: bool = True, retries: int = 3):
+        """Return (seq, timestamp_sec, frame) for the newest frame, or None.
+
+        The frame is a private copy; the slot may be overwritten as soon as this returns.
+        """
+        views = self._views
+        for _ in range(retries):
+            slot = int(views.header[_H["latest_slot"]])
+            if slot < 0:
+                return None
+            meta = views.meta[slot]
+            seq = int(meta[_S["seq"]])
+            if seq <= 0:
+                continue
+            if only_new and seq <= self.last_seq:
+                return None
+            height, width = int(meta[_S["height"]]), int(meta[_S["width"]])
+            timestamp_ns = int(meta[_S["timestamp_ns"]])
+            frame = views.frames[slot, :height, :width].copy()
+            if int(meta[_S["seq"]]) == seq:
+                self.last_seq = seq
+                return seq, timestamp_ns / 1e9, frame
+        return None
+
+    def close(self):
+        if self._views is None:
+            return
+        self._views.release()
+        self._views = None
+        self.shm.close()
+
+
+# ---------- MJPEG Endpoint ----------
+def serve_mjpeg(name: str = FRAME_BUS_NAME, host: str = "127.0.0.1", port: int = 8765,
+                max_fps: float = 10.0, quality: int = 75):
+    """Serve the frame bus as a multipart MJPEG stream at http://host:port/"""
+    import cv2
+
+    frame_interval = 1.0 / max_fps
+
+    class MJPEGHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            try:
+                reader = FrameBusReader(name)
+            except (FileNotFoundError, ValueError):
+                self.send_error(503, "No workout is streaming")
+                return
+
+            self.send_response(200)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+            self.end_headers()
+            try:
+                while not reader.closed:
+                    started = time.time()
+                    latest = reader.latest()
+                    if latest is not None:
+                        ok, jpeg = cv2.imencode(".jpg", latest[2], [cv2.IMWRITE_JPEG_QUALITY, quality])
+                        if ok:
+                            self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                            self.wfile.write(f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                            self.wfile.write(jpeg.tobytes())
+                            self.wfile.write(b"\r\n")
+                    time.sleep(max(0.0, frame_interval - (time.time() - started)))
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                reader.close()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MJPEGHandler)
+    server.daemon_threads = True
+    print(f"Streaming workout view at http://{host}:{port}/")
+    return server
+
+
+def start_mjpeg_server(**kwargs):
+    """Start the MJPEG endpoint on a daemon thread and return the server"""
+    server = serve_mjpeg(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream the workout view over MJPEG")
+    parser.add_argument("--name", default=FRAME_BUS_NAME)
+    parser.add_argument("--station", default=None, help="Station whose frame bus to stream")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-fps", type=float, default=10.0)
+    cli_args = parser.parse_args()
+    mjpeg_server = serve_mjpeg(channel_name(cli_args.name, cli_args.station), cli_args.host, cli_args.port, cli_args.max_fps)
+    try:
+        mjpeg_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,319 @@
+import argparse
+import json
+import struct
+import time
+
+import numpy as np
+
+LANDMARK_DIR = "recordings/landmarks"
+MAGIC = b"LMKF"
+VERSION = 1
+FLAG_FLOAT16 = 1
+FLAG_DELTA = 2
+LANDMARK_COUNT = 33
+CHANNELS = 4  # x, y, z, visibility
+DEFAULT_KEYFRAME_INTERVAL = 30
+# Delta frames store int8 multiples of DELTA_STEP << shift (about 0.3 px at 1280 wide
+# for shift 0); a record uses the smallest shift that fits its largest change
+DELTA_STEP = 1.0 / 4096
+DELTA_LIMIT = 127
+MAX_SHIFT = 15
+
+# Stream header: magic, version, flags, keyframe interval, landmarks, channels, fps
+FILE_HEADER = struct.Struct("<4sBBHHBxf")
+# Every record starts with the frame sequence number, the record kind and the delta shift
+RECORD_HEADER = struct.Struct("<IBB2x")
+KIND_KEY = 0
+KIND_DELTA = 1
+
+
+class LandmarkFormat:
+    """Layout of a landmark stream: value precision and keyframe interval (1 = no deltas).
+
+    Key records hold every value as float32 or float16; delta records hold int8
+    steps (scaled by a per-record shift) from the last keyframe's reconstruction. Each kind has a fixed size, and
+    with a fixed keyframe interval a stream is a run of identical blocks.
+    """
+
+    def __init__(self, float16: bool = False, keyframe_interval: int = 1):
+        if not 1 <= keyframe_interval <= 0xFFFF:
+            raise ValueError(f"Keyframe interval out of range: {keyframe_interval}")
+        self.float16 = float16
+        self.keyframe_interval = keyframe_interval
+        self.value_dtype = np.dtype("<f2" if float16 else "<f4")
+        shape = (LANDMARK_COUNT, CHANNELS)
+        header = [("seq", "<u4"), ("kind", "u1"), ("shift", "u1"), ("pad", "V2")]
+        self.key_dtype = np.dtype(header + [("values", self.value_dtype, shape)])
+        self.delta_dtype = np.dtype(header + [("values", "i1", shape)])
+
+    @property
+    def delta(self) -> bool:
+        return self.keyframe_interval > 1
+
+    @property
+    def flags(self) -> int:
+        return (FLAG_FLOAT16 if self.float16 else 0) | (FLAG_DELTA if self.delta else 0)
+
+    def to_dict(self) -> dict:
+        return {"float16": self.float16, "keyframe_interval": self.keyframe_interval}
+
+    def block_dtype(self, frames: int = None) -> np.dtype:
+        """A keyframe followed by ``frames - 1`` delta records (a full interval by default)"""
+        frames = frames or self.keyframe_interval
+        fields = [("key", self.key_dtype)]
+        if frames > 1:
+            fields.append(("deltas", self.delta_dtype, (frames - 1,)))
+        return np.dtype(fields)
+
+    def header(self, fps: float = 30.0) -> bytes:
+        return FILE_HEADER.pack(MAGIC, VERSION, self.flags, self.keyframe_interval, LANDMARK_COUNT, CHANNELS, fps)
+
+    @classmethod
+    def from_header(cls, data) -> tuple:
+        """(format, fps) from the first FILE_HEADER.size bytes of a stream"""
+        magic, version, flags, interval, landmarks, channels, fps = FILE_HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a landmark stream")
+        if version != VERSION or (landmarks, channels) != (LANDMARK_COUNT, CHANNELS):
+            raise ValueError(f"Unsupported landmark stream version {version} ({landmarks}x{channels})")
+        return cls(bool(flags & FLAG_FLOAT16), interval if flags & FLAG_DELTA else 1), fps
+
+
+def landmarks_to_array(landmarks) -> np.ndarray:
+    """(33, 4) float32 from MediaPipe landmark objects"""
+    return np.array([(landmark.x, landmark.y, landmark.z, landmark.visibility) for landmark in landmarks],
+                    dtype=np.float32)
+
+
+def _delta(frame: np.ndarray, key: np.ndarray, steps: np.ndarray) -> tuple:
+    """(shift, int8 values) moving ``steps`` (DELTA_STEP units from ``key``) towards ``frame``; updates ``steps``"""
+    change = np.rint((frame - key) / np.float32(DELTA_STEP)).astype(np.int64) - steps
+    largest = int(np.abs(change).max())
+    shift = 0
+    while largest > DELTA_LIMIT << shift and shift < MAX_SHIFT:
+        shift += 1
+    values = np.clip(np.rint(change / (1 << shift)), -DELTA_LIMIT, DELTA_LIMIT).astype(np.int8)
+    steps += values.astype(np.int32) << shift
+    return shift, values
+
+
+def _apply_delta(values: np.ndarray, shift) -> np.ndarray:
+    return values.astype(np.int32) << np.asarray(shift, dtype=np.int32)
+
+
+# ---------- Streaming ----------
+class LandmarkEncoder:
+    """Encodes frames one record at a time (for transports and live recorders).
+
+    Deltas are taken against what the decoder will reconstruct, not the true previous
+    frame, so quantization error does not build up between keyframes.
+    """
+
+    def __init__(self, fmt: LandmarkFormat):
+        self.format = fmt
+        self._since_key = 0
+        self._key = None
+        self._steps = None
+
+    def encode(self, seq: int, frame) -> bytes:
+        fmt = self.format
+        frame = np.asarray(frame, dtype=np.float32)
+        if self._since_key % fmt.keyframe_interval == 0:
+            record = np.zeros((), dtype=fmt.key_dtype)
+            record["kind"] = KIND_KEY
+            record["values"] = frame
+            self._key = record["values"].astype(np.float32)
+            self._steps = np.zeros((LANDMARK_COUNT, CHANNELS), dtype=np.int32)
+            self._since_key = 0
+        else:
+            record = np.zeros((), dtype=fmt.delta_dtype)
+            record["kind"] = KIND_DELTA
+            record["shift"], record["values"] = _delta(frame, self._key, self._steps)
+        record["seq"] = seq
+        self._since_key += 1
+        return record.tobytes()
+
+
+class LandmarkDecoder:
+    """Decodes records from LandmarkEncoder. Keyframes come back as read-only views of the record."""
+
+    def __init__(self, fmt: LandmarkFormat):
+        self.format = fmt
+        self._key = None
+        self._steps = None
+
+    def decode(self, record) -> tuple:
+        """(sequence number, (33, 4) array)"""
+        fmt = self.format
+        if len(record) < RECORD_HEADER.size:
+            raise ValueError(f"Record of {len(record)} bytes is shorter than its header")
+        seq, kind, shift = RECORD_HEADER.unpack_from(record)
+        if kind == KIND_KEY:
+            if len(record) != fmt.key_dtype.itemsize:
+                raise ValueError(f"Key record of {len(record)} bytes")
+            values = np.frombuffer(record, dtype=fmt.key_dtype)[0]["values"]
+            self._key = values.astype(np.float32)
+            self._steps = np.zeros((LANDMARK_COUNT, CHANNELS), dtype=np.int32)
+            return seq, values
+        if kind != KIND_DELTA or len(record) != fmt.delta_dtype.itemsize:
+            raise ValueError(f"Unexpected record (kind {kind}, {len(record)} bytes)")
+        if self._key is None:
+            raise ValueError("Delta record before any keyframe")
+        self._steps += _apply_delta(np.frombuffer(record, dtype=fmt.delta_dtype)[0]["values"], shift)
+        return seq, self._key + self._steps.astype(np.float32) * np.float32(DELTA_STEP)
+
+
+# ---------- Whole Streams ----------
+def encode_frames(frames, fmt: LandmarkFormat, fps: float = 30.0, start_seq: int = 0) -> bytes:
+    """Header plus one record per frame; the same bytes LandmarkEncoder produces frame by frame"""
+    frames = np.asarray(frames, dtype=np.float32)
+    interval = fmt.keyframe_interval
+    parts = [fmt.header(fps)]
+    for start in range(0, len(frames), interval):
+        chunk = frames[start:start + interval]
+        block = np.zeros((), dtype=fmt.block_dtype(len(chunk)))
+        block["key"]["seq"] = start_seq + start
+        block["key"]["kind"] = KIND_KEY
+        block["key"]["values"] = chunk[0]
+        if len(chunk) > 1:
+            key = block["key"]["values"].astype(np.float32)
+            deltas = block["deltas"]
+            deltas["seq"] = start_seq + start + np.arange(1, len(chunk))
+            deltas["kind"] = KIND_DELTA
+            steps = np.zeros((LANDMARK_COUNT, CHANNELS), dtype=np.int32)
+            for i, frame in enumerate(chunk[1:]):
+                deltas["shift"][i], deltas["values"][i] = _delta(frame, key, steps)
+        parts.append(block.tobytes())
+    return b"".join(parts)
+
+
+def decode_frames(data) -> tuple:
+    """(frames, sequence numbers, format, fps) for a whole stream in one pass.
+
+    Without deltas ``frames`` is a zero-copy view of ``data`` (float16 or float32);
+    with deltas each block is rebuilt from its keyframe with one cumulative sum.
+    """
+    fmt, fps = LandmarkFormat.from_header(data)
+    body = memoryview(data)[FILE_HEADER.size:]
+    full_dtype = fmt.block_dtype()
+    blocks = len(body) // full_dtype.itemsize
+    remainder = len(body) - blocks * full_dtype.itemsize
+    tail_frames = 0
+    if remainder:
+        tail_frames = 1 + (remainder - fmt.key_dtype.itemsize) // fmt.delta_dtype.itemsize
+        if remainder != fmt.block_dtype(tail_frames).itemsize:
+            raise ValueError("Truncated landmark stream")
+    if not fmt.delta:
+        records = np.frombuffer(body, dtype=fmt.key_dtype)
+        return records["values"], records["seq"], fmt, fps
+
+    frames, seqs = [], []
+    for dtype, count, offset in ((full_dtype, blocks, 0), (fmt.block_dtype(tail_frames), 1 if tail_frames else 0,
+                                                         blocks * full_dtype.itemsize)):
+        if not count:
+            continue
+        block = np.frombuffer(body, dtype=dtype, count=count, offset=offset)
+        key = block["key"]["values"].astype(np.float32)[:, None]
+        seqs.append(block["key"]["seq"][:, None])
+        if "deltas" in dtype.names:
+            deltas = block["deltas"]
+            steps = np.cumsum(_apply_delta(deltas["values"], deltas["shift"][..., None, None]), axis=1)
+            key = np.concatenate([key, key + steps.astype(np.float32) * np.float32(DELTA_STEP)], axis=1)
+            seqs[-1] = np.concatenate([seqs[-1], deltas["seq"]], axis=1)
+        frames.append(key.reshape(-1, LANDMARK_COUNT, CHANNELS))
+        seqs[-1] = seqs[-1].reshape(-1)
+    if not frames:
+        return np.zeros((0, LANDMARK_COUNT, CHANNELS), dtype=np.float32), np.zeros(0, dtype=np.uint32), fmt, fps
+    return np.concatenate(frames), np.concatenate(seqs), fmt, fps
+
+
+class LandmarkWriter:
+    """Appends frames to a landmark file as they arrive"""
+
+    def __init__(self, path: str, fmt: LandmarkFormat = None, fps: float = 30.0):
+        self.format = fmt or LandmarkFormat(float16=True, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL)
+        self.encoder = LandmarkEncoder(self.format)
+        self.path = path
+        self.frames = 0
+        self._file = open(path, 'wb')
+        self._file.write(self.format.header(fps))
+
+    def write(self, seq: int, frame):
+        self._file.write(self.encoder.encode(seq, frame))
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_landmarks(path: str) -> tuple:
+    """(frames, sequence numbers, format, fps) of a landmark file, memory-mapped"""
+    return decode_frames(np.memmap(path, dtype=np.uint8, mode='r'))
+
+
+# ---------- Benchmark ----------
+def benchmark(frames, repeat: int = 3) -> list:
+    """Bytes per frame, decode time per frame and mean/worst error for each layout vs float64 JSON"""
+    frames = np.asarray(frames, dtype=np.float32)
+    results = []
+    baseline = [json.dumps(frame.astype(np.float64).tolist()) for frame in frames]
+
+    def timed(decode):
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            decoded = decode()
+            best = min(best, time.perf_counter() - started)
+        return best, decoded
+
+    seconds, decoded = timed(lambda: np.array([json.loads(text) for text in baseline], dtype=np.float32))
+    results.append({"format": "json float64", "bytes_per_frame": sum(map(len, baseline)) / len(frames),
+                    "decode_us_per_frame": 1e6 * seconds / len(frames),
+                    "mean_error": float(np.abs(decoded - frames).mean()),
+                    "max_error": float(np.abs(decoded - frames).max())})
+    for name, fmt in (("float32", LandmarkFormat()),
+                      ("float16", LandmarkFormat(float16=True)),
+                      (f"float16 + delta/{DEFAULT_KEYFRAME_INTERVAL}",
+                       LandmarkFormat(float16=True, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL))):
+        data = encode_frames(frames, fmt)
+        seconds, (decoded, _, _, _) = timed(lambda: decode_frames(data))
+        results.append({"format": name, "bytes_per_frame": (len(data) - FILE_HEADER.size) / len(frames),
+                        "decode_us_per_frame": 1e6 * seconds / len(frames),
+                        "mean_error": float(np.abs(decoded.astype(np.float32) - frames).mean()),
+                        "max_error": float(np.abs(decoded.astype(np.float32) - frames).max())})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Binary landmark format tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bench_parser = commands.add_parser("bench", help="Size and decode speed against float64 JSON")
+    bench_parser.add_argument("--frames", type=int, default=3000)
+    convert_parser = commands.add_parser("convert", help="Convert a (frames, 33, 4) .npy array to a landmark file")
+    convert_parser.add_argument("npy")
+    convert_parser.add_argument("out")
+    convert_parser.add_argument("--float32", action="store_true", help="Keep full float32 precision")
+    convert_parser.add_argument("--keyframe-interval", type=int, default=DEFAULT_KEYFRAME_INTERVAL)
+    convert_parser.add_argument("--fps", type=float, default=30.0)
+    cli_args = parser.parse_args()
+
+    if cli_args.command == "bench":
+        from synthetic import generate
+        frames, _ = generate("squat", reps=cli_args.frames // 75 + 1)
+        frames = frames[:cli_args.frames]
+        print(f"{'format':<22}{'bytes/frame':>12}{'decode us/frame':>17}{'mean error':>12}{'max error':>11}")
+        for result in benchmark(frames):
+            print(f"{result['format']:<22}{result['bytes_per_frame']:>12.0f}"
+                  f"{result['decode_us_per_frame']:>17.2f}{result['mean_error']:>12.6f}{result['max_error']:>11.5f}")
+    else:
+        fmt = LandmarkFormat(float16=not cli_args.float32, keyframe_interval=cli_args.keyframe_interval)
+        data = encode_frames(np.load(cli_args.npy), fmt, cli_args.fps)
+        with open(cli_args.out, 'wb') as f:
+            f.write(data)
+        print(f"Wrote {len(data):,} bytes to {cli_args.out}")
@@ -0,0 +1,247 @@
+import json
+import os
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime
+
+from utils import atomic_write_json, log_lock
+
+LEADERBOARD_PATH = "user_data/leaderboard.json"
+OVERALL_BOARD = "overall"
+# Weekly boards older than this many weeks are dropped on update
+KEEP_WEEKS = 12
+# Journalled updates folded back into the leaderboard file at once
+COMPACT_EVERY = 200
+
+
+def exercise_board(exercise: str) -> str:
+    return f"exercise:{exercise}"
+
+
+def week_board(timestamp=None) -> str:
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    year, week, _ = (timestamp or datetime.now()).isocalendar()
+    return f"week:{year}-W{week:02d}"
+
+
+# ---------- Board ----------
+class Board:
+    """One ranking. Scores by user, plus the same entries kept sorted by (-score, user).
+
+    Rank lookups and the start of a top-k or window query are a binary search;
+    reading k entries from there is O(k). Ties are broken by username.
+    """
+
+    def __init__(self, entries=None):
+        self.scores = {}
+        for user, score in entries or ():
+            self.scores[user] = score
+        self._keys = sorted((-score, user) for user, score in self.scores.items())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, user):
+        return user in self.scores
+
+    def set(self, user: str, score):
+        old = self.scores.get(user)
+        if old is not None:
+            if old == score:
+                return
+            del self._keys[bisect_left(self._keys, (-old, user))]
+        self.scores[user] = score
+        insort(self._keys, (-score, user))
+
+    def add(self, user: str, points):
+        self.set(user, self.scores.get(user, 0) + points)
+
+    def rank(self, user: str):
+        """1-based position of a user, or None if they are not on this board"""
+        score = self.scores.get(user)
+        if score is None:
+            return None
+        return bisect_left(self._keys, (-score, user)) + 1
+
+    def top(self, k: int = 10) -> list:
+        """[(rank, user, score)] for the first ``k`` places"""
+        return self._slice(0, k)
+
+    def around(self, user: str, radius: int = 2) -> list:
+        """[(rank, user, score)] for the places within ``radius`` of a user's rank"""
+        rank = self.rank(user)
+        if rank is None:
+            return []
+        return self._slice(max(0, rank - 1 - radius), rank + radius)
+
+    def entries(self) -> list:
+        return [[user, -negative] for negative, user in self._keys]
+
+    def _slice(self, start: int, stop: int) -> list:
+        return [(start + offset + 1, user, -negative)
+                for offset, (negative, user) in enumerate(self._keys[start:stop])]
+
+
+# ---------- Leaderboard ----------
+class Leaderboard:
+    """Overall, per-exercise and per-week rankings persisted next to the profile store.
+
+    The file holds every board already in rank order, so rendering a leaderboard
+    never opens individual profile files. Workouts do not rewrite it: each update is
+    one line appended to a journal beside it (``leaderboard.updates.jsonl``), which
+    readers replay incrementally and which is folded back into the file every
+    ``COMPACT_EVERY`` updates. Writers hold the file's ``log_lock`` exclusively,
+    readers shared, so concurrent stations never lose each other's updates.
+    """
+
+    def __init__(self, path: str = LEADERBOARD_PATH):
+        self.path = path
+        self.journal_path = os.path.splitext(path)[0] + ".updates.jsonl"
+        self.boards = {}
+        self.version = None
+        self.journal_offset = 0
+        self.journal_entries = 0
+        self._lock = threading.Lock()
+
+    def _snapshot_version(self):
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def refresh(self) -> bool:
+        """Pick up changes on disk. Returns True when data was (re)loaded."""
+        with log_lock(self.path, shared=True):
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> bool:
+        try:
+            journal_size = os.path.getsize(self.journal_path)
+        except OSError:
+            journal_size = 0
+        version = self._snapshot_version()
+        reload = version != self.version or journal_size < self.journal_offset
+        if not reload and journal_size == self.journal_offset:
+            return False
+        with self._lock:
+            if reload:
+                boards = {}
+                if version is not None:
+                    try:
+                        with open(self.path, 'r', encoding='utf-8') as f:
+                            data = json.load(f)
+                        boards = {name: Board(entries) for name, entries in data.get("boards", {}).items()}
+                    except Exception as e:
+                        print(f"Error loading leaderboard: {e}")
+                self.boards = boards
+                self.version = version
+                self.journal_offset = 0
+                self.journal_entries = 0
+            self._replay_journal()
+        return True
+
+    def _replay_journal(self):
+        """Apply journal lines past ``journal_offset`` (a torn last line waits for the next refresh)"""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(self.journal_offset)
+                data = f.read()
+        except OSError:
+            return
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Skipping bad leaderboard update: {e}")
+            self.journal_entries += 1
+        self.journal_offset += len(complete)
+
+    def save(self):
+        """Write every board to the file and empty the journal"""
+        with log_lock(self.path):
+            self._save_locked()
+
+    def _save_locked(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = {
+            "version": 1,
+            "updated_at": datetime.now().isoformat(),
+            "boards": {name: board.entries() for name, board in sorted(self.boards.items())},
+        }
+        atomic_write_json(self.path, data)
+        # The file now contains every journalled update
+        open(self.journal_path, 'w').close()
+        self.version = self._snapshot_version()
+        self.journal_offset = 0
+        self.journal_entries = 0
+
+    def board(self, name: str = OVERALL_BOARD) -> Board:
+        self.refresh()
+        return self.boards.get(name) or Board()
+
+    def board_names(self, prefix: str = "") -> list:
+        self.refresh()
+        return sorted(name for name in self.boards if name.startswith(prefix))
+
+    def record(self, user: str, total_points, points_earned=0, exercise: str = None, timestamp=None):
+        """Apply one points update: the user's new total and what this workout earned"""
+        self._apply(self._update(user, total_points, points_earned, exercise, timestamp))
+
+    def commit(self, user: str, total_points, points_earned=0, exercise: str = None, timestamp=None):
+        """Record one update durably: journal it under the lock, compacting when the journal is long"""
+        update = self._update(user, total_points, points_earned, exercise, timestamp)
+        with log_lock(self.path):
+            self._refresh_locked()
+            os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+            line = (json.dumps(update) + "\n").encode("utf-8")
+            with open(self.journal_path, 'ab') as f:
+                f.write(line)
+            with self._lock:
+                self._apply(update)
+                self.journal_offset += len(line)
+                self.journal_entries += 1
+            if self.journal_entries >= COMPACT_EVERY:
+                self._save_locked()
+
+    @staticmethod
+    def _update(user, total_points, points_earned, exercise, timestamp) -> dict:
+        return {"user": user, "total": total_points, "earned": points_earned,
+                "week": week_board(timestamp), "exercise": exercise}
+
+    def _apply(self, update: dict):
+        user = update["user"]
+        self.boards.setdefault(OVERALL_BOARD, Board()).set(user, update["total"])
+        scopes = [update["week"]]
+        if update.get("exercise"):
+            scopes.append(exercise_board(update["exercise"]))
+        for name in scopes:
+            self.boards.setdefault(name, Board()).add(user, update["earned"])
+        self.prune_weeks()
+
+    def prune_weeks(self):
+        """Drop weekly boards older than the newest ``KEEP_WEEKS``"""
+        weeks = sorted(name for name in self.boards if name.startswith("week:"))
+        for name in weeks[:-KEEP_WEEKS]:
+            del self.boards[name]
+
+
+def record_points(user: str, total_points, points_earned=0, exercise: str = None, timestamp=None,
+                  path: str = LEADERBOARD_PATH):
+    """Apply one points update to the shared leaderboard (one journal line, not a rewrite)"""
+    board = get_leaderboard(path)
+    board.commit(user, total_points, points_earned, exercise, timestamp)
+    return board
+
+
+_leaderboards = {}
+
+
+def get_leaderboard(path: str = LEADERBOARD_PATH) -> Leaderboard:
+    """Process-wide leaderboard for a path; reloads itself when the file changes"""
+    key = os.path.abspath(path)
+    if key not in _leaderboards:
+        _leaderboards[key] = Leaderboard(path)
+    return _leaderboards[key]
@@ -0,0 +1,493 @@
+import argparse
+import atexit
+import csv
+import glob
+import io
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+import pandas as pd
+
+from analytics import LOG_COLUMNS, LOG_PATH, STREAM_CHUNK_ROWS
+from utils import atomic_write_json, log_lock
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# A commit waits this long for more rows before its write and fsync
+GROUP_COMMIT_WINDOW = 0.002
+MAX_BATCH_ROWS = 1024
+APPEND_TIMEOUT = 10.0
+# Rows whose timestamp cannot be parsed keep their own segment, included in every range
+UNDATED_SEGMENT = "undated"
+
+
+# ---------- Layout ----------
+def segment_dir(log_path: str = LOG_PATH) -> str:
+    """Directory holding the rotated monthly segments of a log (logs/sessions.csv -> logs/sessions/)"""
+    return os.path.splitext(log_path)[0]
+
+
+def manifest_path(log_path: str = LOG_PATH) -> str:
+    return os.path.join(segment_dir(log_path), MANIFEST_NAME)
+
+
+def backup_shards(log_path: str = LOG_PATH) -> list:
+    """Stray ``<log>_backup_<ts>.csv`` files left by failed appends"""
+    stem, ext = os.path.splitext(log_path)
+    return sorted(glob.glob(f"{glob.escape(stem)}_backup_*{ext}"))
+
+
+def load_manifest(log_path: str = LOG_PATH) -> dict:
+    try:
+        with open(manifest_path(log_path), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": MANIFEST_VERSION, "segments": {}}
+    manifest.setdefault("segments", {})
+    return manifest
+
+
+def segments_for_range(manifest: dict, start=None, end=None) -> list:
+    """Names of the segments whose rows can fall in [start, end], oldest first"""
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    names = []
+    for name, entry in sorted(manifest["segments"].items()):
+        if entry.get("start") is not None:
+            if start is not None and pd.Timestamp(entry["end"]) < start:
+                continue
+            if end is not None and pd.Timestamp(entry["start"]) > end:
+                continue
+        names.append(name)
+    return names
+
+
+def history_bytes(log_path: str = LOG_PATH) -> int:
+    """On-disk size of the whole history: segments plus the active log"""
+    paths = [log_path] + glob.glob(os.path.join(glob.escape(segment_dir(log_path)), "*.csv"))
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+
+# ---------- Reading ----------
+class _Snapshot(io.RawIOBase):
+    """Read-only view of an open file limited to the size it had when opened.
+
+    Appends landing after the snapshot (possibly half-written) are never seen,
+    and an open segment survives being replaced by a later compaction.
+    """
+
+    def __init__(self, f):
+        self._file = f
+        self._remaining = os.fstat(f.fileno()).st_size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._file.read(min(len(buffer), self._remaining))
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def open_history(log_path: str = LOG_PATH, start=None, end=None) -> list:
+    """Open the segments covering [start, end] and the active log as one consistent snapshot.
+
+    Files are opened under the shared log lock, so a concurrent compaction is seen
+    either entirely or not at all. The caller closes the returned files.
+    """
+    files = []
+    with log_lock(log_path, shared=True):
+        manifest = load_manifest(log_path)
+        paths = [os.path.join(segment_dir(log_path), f"{name}.csv")
+                 for name in segments_for_range(manifest, start, end)]
+        paths.append(log_path)
+        for path in paths:
+            try:
+                files.append(_Snapshot(open(path, 'rb')))
+            except FileNotFoundError:
+                continue
+    return files
+
+
+def _read_csv(source, **kwargs):
+    try:
+        return pd.read_csv(io.BufferedReader(source), encoding='utf-8', **kwargs)
+    except pd.errors.EmptyDataError:
+        return None
+
+
+def _clip(df: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    if start is None and end is None:
+        return df
+    stamps = pd.to_datetime(df['timestamp'], format='ISO8601', errors='coerce')
+    keep = pd.Series(True, index=df.index)
+    if start is not None:
+        keep &= stamps >= pd.Timestamp(start)
+    if end is not None:
+        keep &= stamps <= pd.Timestamp(end)
+    return df[keep]
+
+
+def read_history(log_path: str = LOG_PATH, start=None, end=None, **read_kwargs) -> pd.DataFrame:
+    """Raw history rows in [start, end] (either bound may be None), reading only the segments that overlap"""
+    frames = []
+    for source in open_history(log_path, start, end):
+        with source:
+            df = _read_csv(source, **read_kwargs)
+        if df is not None:
+            frames.append(_clip(df, start, end))
+    if not frames:
+        return pd.DataFrame(columns=LOG_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def iter_history_chunks(log_path: str = LOG_PATH, chunk_rows: int = STREAM_CHUNK_ROWS, start=None, end=None, **read_kwargs):
+    """Chunks of raw history rows in [start, end], segment by segment, then the active log"""
+    for source in open_history(log_path, start, end):
+        with source:
+            chunks = _read_csv(source, chunksize=chunk_rows, **read_kwargs)
+            if chunks is None:
+                continue
+            with chunks:
+                for chunk in chunks:
+                    yield _clip(chunk, start, end)
+
+
+# ---------- Compaction ----------
+def _read_raw(path: str) -> pd.DataFrame:
+    """Rows as text exactly as written, so rewriting a segment never reformats values"""
+    try:
+        df = pd.read_csv(path, encoding='utf-8', dtype=str, keep_default_na=False)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return pd.DataFrame(columns=LOG_COLUMNS)
+    return df.reindex(columns=LOG_COLUMNS, fill_value="")
+
+
+def _write_csv_atomic(path: str, df: pd.DataFrame):
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            df.to_csv(f, index=False, columns=LOG_COLUMNS)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def compact(log_path: str = LOG_PATH, dry_run: bool = False) -> dict:
+    """Fold the active log and any backup shards into monthly segments.
+
+    Rows are deduplicated across the active log, the shards and the segments they
+    land in, and each segment is sorted by timestamp. Runs under the exclusive log
+    lock, so appends from a running workout wait for it rather than interleave.
+    Segments and the manifest are replaced atomically before the active log is reset
+    and the shards removed; a crash part-way leaves duplicates that the next run drops.
+    """
+    started = time.time()
+    directory = segment_dir(log_path)
+    with log_lock(log_path):
+        shards = backup_shards(log_path)
+        incoming = pd.concat([_read_raw(path) for path in [log_path] + shards], ignore_index=True)
+        stamps = pd.to_datetime(incoming['timestamp'], format='ISO8601', errors='coerce')
+        months = stamps.dt.strftime('%Y-%m').fillna(UNDATED_SEGMENT)
+
+        manifest = load_manifest(log_path)
+        report = {"incoming_rows": len(incoming), "shards": shards, "segments": {}, "duplicates": 0}
+        for name, rows in incoming.groupby(months, sort=True):
+            path = os.path.join(directory, f"{name}.csv")
+            merged = pd.concat([_read_raw(path), rows], ignore_index=True)
+            deduped = merged.drop_duplicates(ignore_index=True)
+            order = pd.to_datetime(deduped['timestamp'], format='ISO8601', errors='coerce').argsort(kind='stable')
+            deduped = deduped.iloc[order].reset_index(drop=True)
+            report["duplicates"] += len(merged) - len(deduped)
+            segment_stamps = pd.to_datetime(deduped['timestamp'], format='ISO8601', errors='coerce')
+            manifest["segments"][name] = {
+                "file": f"{name}.csv",
+                "start": None if name == UNDATED_SEGMENT else segment_stamps.min().isoformat(),
+                "end": None if name == UNDATED_SEGMENT else segment_stamps.max().isoformat(),
+                "rows": len(deduped),
+            }
+            report["segments"][name] = len(deduped)
+            if not dry_run:
+                os.makedirs(directory, exist_ok=True)
+                _write_csv_atomic(path, deduped)
+
+        if not dry_run and (len(incoming) or shards):
+            manifest["version"] = MANIFEST_VERSION
+            manifest["compacted_at"] = datetime.now().isoformat()
+            os.makedirs(directory, exist_ok=True)
+            atomic_write_json(manifest_path(log_path), manifest)
+            # A fresh header-only file replaces the active log; readers holding the old one keep their snapshot
+            _write_csv_atomic(log_path, pd.DataFrame(columns=LOG_COLUMNS))
+            for path in shards:
+                os.remove(path)
+
+    print(f"Compacted {report['incoming_rows']} rows from {log_path} and {len(shards)} backup shards into "
+          f"{len(report['segments'])} segments ({report['duplicates']} duplicates dropped) "
+          f"in {time.time() - started:.2f}s{' (dry run, nothing written)' if dry_run else ''}")
+    return report
+
+# ---------- Group Commit ----------
+def _trim_torn_tail(f):
+    """Drop a partial last line left by a crash mid-write (it was never acknowledged)"""
+    size = f.seek(0, os.SEEK_END)
+    if size == 0:
+        return
+    f.seek(max(0, size - 4096))
+    tail = f.read()
+    if tail.endswith(b"\n"):
+        return
+    cut = tail.rfind(b"\n")
+    f.truncate(size - len(tail) + cut + 1 if cut >= 0 else 0)
+    f.seek(0, os.SEEK_END)
+
+
+def _encode_rows(rows: list, header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=LOG_COLUMNS, extrasaction='ignore')
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+def commit_rows(rows: list, path: str = LOG_PATH) -> int:
+    """Append rows to the log as one write and make them durable. Returns the rows written.
+
+    The write happens under the exclusive log lock (so the header is written exactly
+    once and rows from other processes never interleave); the fsync happens after the
+    lock is released, so stations finishing together overlap their flushes instead of
+    queueing behind each other.
+    """
+    from metrics import REGISTRY
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with log_lock(path):
+        f = open(path, 'ab+')
+        try:
+            _trim_torn_tail(f)
+            f.write(_encode_rows(rows, header=f.tell() == 0))
+            f.flush()
+        except BaseException:
+            f.close()
+            raise
+    with f:
+        started = time.perf_counter()
+        os.fsync(f.fileno())
+        REGISTRY.histogram("log_fsync_seconds", "Session log fsync latency").observe(time.perf_counter() - started)
+    return len(rows)
+
+
+def write_backup_shard(rows: list, path: str = LOG_PATH) -> str:
+    """Write rows that could not reach the log to a ``_backup_`` shard for compaction to merge"""
+    stem, ext = os.path.splitext(path)
+    backup_path = f"{stem}_backup_{int(time.time())}_{os.getpid()}_{threading.get_ident()}{ext}"
+    with open(backup_path, 'wb') as f:
+        f.write(_encode_rows(rows, header=True))
+        f.flush()
+        os.fsync(f.fileno())
+    return backup_path
+
+
+class GroupCommitWriter:
+    """Serializes session rows for one log through a queue and commits them in batches.
+
+    ``submit`` returns a Future that resolves to True once the row is on disk (or to
+    the backup shard path if the log could not be written). Rows that arrive while a
+    commit is in flight ride along in the next one, so a burst of N finishing sessions
+    costs a handful of fsyncs rather than N.
+    """
+
+    def __init__(self, path: str = LOG_PATH, window: float = GROUP_COMMIT_WINDOW, max_batch: int = MAX_BATCH_ROWS):
+        self.path = path
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"log-writer:{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def submit(self, row: dict) -> Future:
+        future = Future()
+        self._queue.put((dict(row), future))
+        return future
+
+    def append(self, row: dict, timeout: float = APPEND_TIMEOUT):
+        """Submit a row and wait until it is durable"""
+        return self.submit(row).result(timeout)
+
+    def close(self):
+        """Commit everything queued and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self):
+        item = self._queue.get()
+        if item is None:
+            return None, True
+        batch = [item]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        from metrics import REGISTRY
+        batch_rows = REGISTRY.histogram("log_commit_batch_rows", "Session rows per group commit",
+                                        buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024))
+        rows_written = REGISTRY.counter("log_rows_written_total", "Session rows appended to the log")
+        errors = REGISTRY.counter("log_write_errors_total", "Failed session log appends")
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if not batch:
+                continue
+            rows = [row for row, _ in batch]
+            try:
+                commit_rows(rows, self.path)
+                outcome = True
+                rows_written.inc(len(rows))
+                batch_rows.observe(len(rows))
+            except Exception as e:
+                print(f"Error writing to log: {e}")
+                errors.inc(len(rows))
+                try:
+                    outcome = write_backup_shard(rows, self.path)
+                    print(f"Backup log created at: {outcome}")
+                except Exception as backup_e:
+                    print(f"Failed to create backup log: {backup_e}")
+                    for _, future in batch:
+                        future.set_exception(backup_e)
+                    continue
+            for _, future in batch:
+                future.set_result(outcome)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(path: str = LOG_PATH) -> GroupCommitWriter:
+    """Process-wide group-commit writer for a log path"""
+    key = os.path.abspath(path)
+    writer = _writers.get(key)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(key)
+            if writer is None:
+                writer = _writers[key] = GroupCommitWriter(path)
+    return writer
+
+
+@atexit.register
+def _close_writers():
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+# ---------- Benchmark ----------
+def _bench_station(args):
+    """One station process: ``threads`` sessions each appending ``rows`` rows and waiting for every ack"""
+    from utils import append_log
+    path, station, threads, rows, start_at = args
+    time.sleep(max(0.0, start_at - time.time()))
+
+    def session(thread):
+        for i in range(rows):
+            append_log({"timestamp": datetime.now().isoformat(), "user": f"station{station}_{thread}",
+                        "exercise": "squat", "reps": i, "avg_score": 80.0, "duration_sec": 30.0, "calories": 4.2}, path)
+
+    workers = [threading.Thread(target=session, args=(t,)) for t in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.time()
+
+
+def benchmark(stations: int = 8, threads: int = 1, rows: int = 200, path: str = None) -> dict:
+    """Rows/s with ``stations`` processes appending concurrently, then a check that every row landed once under one header"""
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    work_dir = None
+    if path is None:
+        work_dir = tempfile.mkdtemp(prefix="fitmate_log_bench_")
+        path = os.path.join(work_dir, "sessions.csv")
+    start_at = time.time() + 1.0
+    with ProcessPoolExecutor(max_workers=stations) as pool:
+        finished = list(pool.map(_bench_station, [(path, s, threads, rows, start_at) for s in range(stations)]))
+    elapsed = max(finished) - start_at
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    expected = stations * threads * rows
+    result = {
+        "stations": stations,
+        "threads": threads,
+        "rows": len(lines) - 1,
+        "expected_rows": expected,
+        "headers": sum(line.startswith("timestamp,") for line in lines),
+        "malformed": sum(line.count(",") != len(LOG_COLUMNS) - 1 for line in lines),
+        "rows_per_sec": expected / elapsed if elapsed > 0 else float("inf"),
+    }
+    if work_dir:
+        import shutil
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge backup shards and rotate the session log into monthly segments")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    compact_parser = sub.add_parser("compact", help="Fold the active log and backup shards into segments")
+    compact_parser.add_argument("--log", default=LOG_PATH)
+    compact_parser.add_argument("--dry-run", action="store_true", help="Report what would be written")
+
+    bench_parser = sub.add_parser("bench", help="Concurrent append throughput and integrity check")
+    bench_parser.add_argument("--stations", type=int, nargs="+", default=[1, 2, 4, 8], help="Process counts to try")
+    bench_parser.add_argument("--threads", type=int, default=1, help="Concurrent sessions per station process")
+    bench_parser.add_argument("--rows", type=int, default=200, help="Rows appended by each session")
+
+    show_parser = sub.add_parser("show", help="List segments from the manifest, optionally for a date range")
+    show_parser.add_argument("--log", default=LOG_PATH)
+    show_parser.add_argument("--start", default=None, help="ISO timestamp, inclusive")
+    show_parser.add_argument("--end", default=None, help="ISO timestamp, inclusive")
+    cli_args = parser.parse_args()
+
+    if cli_args.command == "compact":
+        compact(cli_args.log, cli_args.dry_run)
+    elif cli_args.command == "bench":
+        for count in cli_args.stations:
+            result = benchmark(count, cli_args.threads, cli_args.rows)
+            ok = (result["rows"] == result["expected_rows"] and result["headers"] == 1 and not result["malformed"])
+            print(f"{count:>3} stations x {cli_args.threads} sessions: {result['rows_per_sec']:>9,.0f} rows/s  "
+                  f"{result['rows']}/{result['expected_rows']} rows, {result['headers']} header, "
+                  f"{result['malformed']} malformed  {'ok' if ok else 'FAILED'}")
+    else:
+        manifest = load_manifest(cli_args.log)
+        for name in segments_for_range(manifest, cli_args.start, cli_args.end):
+            entry = manifest["segments"][name]
+            print(f"{entry['file']:>14}  {entry['rows']:>8} rows  {entry['start']} .. {entry['end']}")
+        shards = backup_shards(cli_args.log)
+        if shards:
+            print(f"{len(shards)} backup shards waiting for compaction")
@@ -1,4 +1,8 @@
-from utils import calculate_angle, calculate_angle_3d, smooth_angle, estimate_calories, form_score, append_log, ensure_dirs
+# Thread budget first: the BLAS pool behind NumPy is sized when NumPy is first imported
+from capacity import ThreadBudget
+thread_budget = ThreadBudget.from_argv()
+thread_budget.apply_env()
+from utils import estimate_calories, append_log, ensure_dirs, atomic_write_json
 import cv2
 import mediapipe as mp
 import pyttsx3
@@ -6,12 +10,50 @@ import json
 import time
 import os
 from datetime import datetime
-import sys
+import argparse
+import signal
+from quality import AdaptiveQualityController
+from frame_bus import FRAME_BUS_NAME, FrameBusWriter, channel_name, start_mjpeg_server
+from status_channel import STATUS_CHANNEL_NAME, StatusWriter, STATE_RUNNING, STATE_RESTING, STATE_FINISHED
+from metrics import REGISTRY, RotatingJSONExporter, start_metrics_server
+from profiling import ProfileCapture
+import uuid
+from achievement_engine import AchievementEngine
+from leaderboard import record_points
+from movement import RepComparator, load_references, save_reps
+from scoring import ExerciseScorer, REP_CUES, ScoreTracker
+from landmark_format import LANDMARK_DIR, LandmarkWriter, landmarks_to_array
+from timeline import ScoreTimeline, save_timeline
+from camera_setup import apply_mode, camera_profile, max_quality_level, open_camera
 
 # Initialize voice engine
 engine = pyttsx3.init()
 engine.setProperty('rate', 150)
 
+# Hot-path metrics
+speech_seconds = REGISTRY.histogram("speech_seconds", "Time the frame loop spent blocked on speech")
+speech_total = REGISTRY.counter("speech_utterances_total", "Utterances spoken")
+frame_seconds = REGISTRY.histogram("frame_seconds", "End-to-end frame latency")
+capture_seconds = REGISTRY.histogram("capture_seconds", "Camera read and flip")
+inference_seconds = REGISTRY.histogram("inference_seconds", "Pose inference")
+scoring_seconds = REGISTRY.histogram("scoring_seconds", "Angles, rep counting and form scoring")
+render_seconds = REGISTRY.histogram("render_seconds", "Overlay drawing, frame bus publish and display")
+frames_total = REGISTRY.counter("frames_total", "Frames processed")
+frames_inferred = REGISTRY.counter("frames_inferred_total", "Frames that ran pose inference")
+frames_dropped = REGISTRY.counter("frames_dropped_total", "Camera frames missed because the loop overran the capture interval (estimated)")
+fps_gauge = REGISTRY.gauge("fps", "Frames per second over the quality window")
+quality_level_gauge = REGISTRY.gauge("quality_level", "Current adaptive quality level")
+
+def speak(text):
+    """Say text through the voice engine, timing how long the frame loop is blocked"""
+    started = time.perf_counter()
+    engine.say(text)
+    engine.runAndWait()
+    speech_seconds.observe(time.perf_counter() - started)
+    speech_total.inc()
+
+achievement_engine = AchievementEngine()
+
 # Load user data
 def load_user_data():
     if os.path.exists("user_data.json"):
@@ -24,407 +66,259 @@ def load_user_data():
     return {"username": "Sahil", "weight_kg": 70, "points": 0, "streak": 0}
 
 def save_user_data(data):
-    with open("user_data.json", 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-def update_achievements(user_data, exercise_type, reps, form_score, calories):
-    """Update user achievements and points"""
-    achievements = []
-    points_earned = 0
-    
-    # First workout achievement
-    if user_data.get("total_workouts", 0) == 0:
-        achievements.append("first_workout")
-        points_earned += 50
-    
-    # Perfect form achievement
-    if form_score >= 95:
-        achievements.append("perfect_form")
-        points_earned += 150
-    
-    # Calorie burner achievement
-    if calories >= 500:
-        achievements.append("calorie_burner")
-        points_earned += 300
-    
-    # Update user data
-    user_data["points"] = user_data.get("points", 0) + points_earned
-    user_data["total_workouts"] = user_data.get("total_workouts", 0) + 1
-    user_data["last_workout"] = datetime.now().isoformat()
-    
-    # Update streak
-    last_workout = user_data.get("last_workout")
-    if last_workout:
-        last_date = datetime.fromisoformat(last_workout).date()
-        today = datetime.now().date()
-        if (today - last_date).days == 1:
-            user_data["streak"] = user_data.get("streak", 0) + 1
-        elif (today - last_date).days > 1:
-            user_data["streak"] = 0
-    
-    # Streak achievements
-    current_streak = user_data.get("streak", 0)
-    if current_streak >= 3 and "streak_3" not in user_data.get("achievements", []):
-        achievements.append("streak_3")
-        points_earned += 100
-    if current_streak >= 7 and "streak_7" not in user_data.get("achievements", []):
-        achievements.append("streak_7")
-        points_earned += 200
-    if current_streak >= 30 and "streak_30" not in user_data.get("achievements", []):
-        achievements.append("streak_30")
-        points_earned += 500
-    
-    # Add new achievements to user data
-    if "achievements" not in user_data:
-        user_data["achievements"] = []
-    user_data["achievements"].extend(achievements)
-    
-    return points_earned, achievements
-
-# Get exercise mode from command line argument
-mode = sys.argv[1] if len(sys.argv) > 1 else "squat"
-
-# Voice feedback variables
-last_feedback = ""
-feedback_cooldown = 0
+    atomic_write_json("user_data.json", data)
+
+def update_achievements(user_data, workout):
+    """Update user achievements, streak and points for a logged workout"""
+    return achievement_engine.record_workout(user_data, workout)
+
+# Command line arguments
+parser = argparse.ArgumentParser(description="AI Fitness Trainer workout session")
+parser.add_argument("mode", nargs="?", default="squat", help="Exercise to track")
+parser.add_argument("--target-fps", type=float, default=24.0, help="Frame rate the quality controller holds")
+parser.add_argument("--fixed-quality", action="store_true", help="Disable adaptive quality control")
+parser.add_argument("--headless", action="store_true", help="Do not open a desktop window (kiosk mode)")
+parser.add_argument("--no-frame-bus", action="store_true", help="Do not publish frames to the dashboard")
+parser.add_argument("--mjpeg-port", type=int, default=None, help="Also serve the annotated view as MJPEG on this port")
+parser.add_argument("--station", default=None,
+                    help="Station name: labels exported metrics and scopes the frame bus and status channel")
+parser.add_argument("--metrics-port", type=int, default=None, help="Serve metrics as text on this port")
+parser.add_argument("--metrics-interval", type=float, default=30.0, help="Seconds between JSON metric snapshots (0 disables)")
+parser.add_argument("--best-side", action="store_true",
+                    help="Score the body side the camera sees best instead of always the left")
+parser.add_argument("--profile", type=float, default=None, metavar="SECONDS",
+                    help="Profile the first SECONDS of the session (press 'p' in the window to profile later)")
+parser.add_argument("--record-landmarks", action="store_true",
+                    help="Record pose landmarks to recordings/landmarks/<session>.lmk for replay")
+parser.add_argument("--reprobe-camera", action="store_true", help="Measure the camera's capture modes again instead of using the cache")
+parser.add_argument("--no-camera-probe", action="store_true", help="Leave capture format and buffering at driver defaults")
+ThreadBudget.add_arguments(parser)
+args = parser.parse_args()
+mode = args.mode
+# OpenCV threads and CPU affinity (which also bounds MediaPipe's inference threads)
+thread_budget.apply()
+
+# Metric exports, labelled per station
+if args.station:
+    REGISTRY.labels["station"] = args.station
+REGISTRY.labels["exercise"] = mode
+metrics_server = start_metrics_server(port=args.metrics_port) if args.metrics_port else None
+metrics_exporter = None
+if args.metrics_interval > 0:
+    metrics_exporter = RotatingJSONExporter(f"logs/metrics/{REGISTRY.labels['station']}.jsonl",
+                                            interval=args.metrics_interval).start()
 
 # Exercise tracking variables
 counter = 0
-direction = 0
 start_time = time.time()
-form_scores = []
+session_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+# Running form-score averages and spoken-cue throttling
+tracker = ScoreTracker(recent=90, cooldown=30)  # ~3 seconds of scores at 30 FPS, 30-frame cue cooldown
 current_set = 1
 target_sets = 3
+reps_per_set = 12
 rest_timer = 0
 is_resting = False
-burpee_state = "stand"  # Initialize burpee state machine
 
-# Initialize angle history dictionary for temporal smoothing
-angle_history = {}
+# Each completed rep is compared against the exercise's reference movement
+references = load_references()
+rep_comparator = RepComparator(references[mode]) if mode in references else None
+rep_angles = []
+archived_reps = []
+rep_scores = []
+
+# Rep counter and form rules; computes only the landmarks and angles this exercise needs
+scorer = ExerciseScorer(mode, best_side=args.best_side)
+# Per-second form score, joint angle and rep summary kept for the dashboard; fixed size for any session length
+score_timeline = ScoreTimeline(scorer.plan.angle_names)
+
+# Optional landmark recording in the compact binary format (replayable with session_server.py)
+landmark_writer = None
+if args.record_landmarks:
+    os.makedirs(LANDMARK_DIR, exist_ok=True)
+    landmark_writer = LandmarkWriter(os.path.join(LANDMARK_DIR, f"{session_id}.lmk"), fps=args.target_fps)
+
+# Lowest-latency capture mode per resolution (probed once per camera, then cached)
+camera = None if args.no_camera_probe else camera_profile(0, args.target_fps, reprobe=args.reprobe_camera)
+
+# Adaptive quality: capture resolution, model complexity and inference stride
+quality = AdaptiveQualityController(target_fps=args.target_fps, enabled=not args.fixed_quality,
+                                    max_level=max_quality_level(camera))
+capture_width, capture_height, model_complexity, _ = quality.settings
+quality_level_gauge.set(quality.level)
 
 # MediaPipe setup
 mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
+
+def create_pose(complexity):
+    return mp_pose.Pose(
+        model_complexity=complexity,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+pose = create_pose(model_complexity)
 mp_draw = mp.solutions.drawing_utils
 
 
 # Initialize webcam
-cap = cv2.VideoCapture(0)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+cap = open_camera(0, camera, capture_width, capture_height)
+camera_interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0)
 
 # Create and configure the OpenCV window early for fast display and focus
 window_name = "AI Fitness Trainer - Pro"
-cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-cv2.setWindowProperty(window_name, cv2.WND_PROP_TOPMOST, 1)
+if not args.headless:
+    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+    cv2.setWindowProperty(window_name, cv2.WND_PROP_TOPMOST, 1)
+
+# Shared-memory frame bus for the dashboard and MJPEG viewers (created on the first frame)
+frame_bus = None
+# Shared-memory channels are per station, so several stations can run on one host
+station = args.station or os.environ.get("FITMATE_STATION")
+frame_bus_name = channel_name(FRAME_BUS_NAME, station)
+mjpeg_server = None
+if args.mjpeg_port and not args.no_frame_bus:
+    mjpeg_server = start_mjpeg_server(name=frame_bus_name, port=args.mjpeg_port)
 
 # Load user data
 user_data = load_user_data()
 
+# Live status for the dashboard, polled from shared memory
+try:
+    status = StatusWriter(channel_name(STATUS_CHANNEL_NAME, station), exercise=mode)
+except FileExistsError as e:
+    print(f"Another workout is already running on this station: {e}. Give each station its own --station.")
+    cap.release()
+    raise SystemExit(1)
+
+
+# Opt-in profiling; costs one attribute check per frame while idle
+profiler = ProfileCapture(mode, session_id, duration=args.profile or 10.0)
+if args.profile:
+    profiler.start()
 
 print(f"Starting {mode.upper()} workout for {user_data['username']}")
 print(f"Target: {target_sets} sets with rest periods")
 
+# Stop cleanly (and still log the session) when the dashboard ends a headless workout
+stop_requested = False
+
+def request_stop(signum, frame):
+    global stop_requested
+    stop_requested = True
+
+signal.signal(signal.SIGTERM, request_stop)
+signal.signal(signal.SIGINT, request_stop)
+
+# Per-frame display state, kept between frames when inference is skipped
+results = None
+feedback = ""
+color = (0, 255, 0)
+last_scored_time = time.time()
+title = f'{mode.upper()} WORKOUT'
+
 # Main exercise loop
-while True:
+while not stop_requested:
+    frame_start = time.time()
+    stage_start = time.perf_counter()
     success, frame = cap.read()
     if not success:
         break
 
     # Flip frame horizontally for mirror effect
     frame = cv2.flip(frame, 1)
+    stage_end = time.perf_counter()
+    capture_seconds.observe(stage_end - stage_start)
     
-    img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = pose.process(img_rgb)
+    # Run inference only on stride frames; skipped frames reuse the last landmarks
+    run_inference = quality.should_infer() or results is None
+    if run_inference:
+        stage_start = stage_end
+        img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        results = pose.process(img_rgb)
+        stage_end = time.perf_counter()
+        inference_seconds.observe(stage_end - stage_start)
+        frames_inferred.inc()
 
     if results.pose_landmarks:
         # Draw pose landmarks
         mp_draw.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
 
-        h, w, _ = frame.shape
-        lm = results.pose_landmarks.landmark
-
-        def get_point(i):
-            return [lm[i].x * w, lm[i].y * h]
+    if run_inference and results.pose_landmarks:
+        stage_start = time.perf_counter()
+        scored_time = time.time()
+        frame_interval = scored_time - last_scored_time
+        last_scored_time = scored_time
+        if landmark_writer is not None:
+            landmark_writer.write(int(frames_total.value), landmarks_to_array(results.pose_landmarks.landmark))
 
-        # Joint points with 3D coordinates and confidence scores
-        def get_point_3d(i):
-            return [lm[i].x * w, lm[i].y * h, lm[i].z * w]  # Scale z by width for proportional depth
-        
-        def get_confidence(i):
-            return lm[i].visibility  # MediaPipe provides visibility as confidence
-        
-        # Get 3D points
-        l_sh, r_sh = get_point_3d(11), get_point_3d(12)
-        l_el, r_el = get_point_3d(13), get_point_3d(14)
-        l_wr, r_wr = get_point_3d(15), get_point_3d(16)
-        l_hp, r_hp = get_point_3d(23), get_point_3d(24)
-        l_kn, r_kn = get_point_3d(25), get_point_3d(26)
-        l_an, r_an = get_point_3d(27), get_point_3d(28)
-        
-        # Get confidence scores
-        l_sh_conf, r_sh_conf = get_confidence(11), get_confidence(12)
-        l_el_conf, r_el_conf = get_confidence(13), get_confidence(14)
-        l_wr_conf, r_wr_conf = get_confidence(15), get_confidence(16)
-        l_hp_conf, r_hp_conf = get_confidence(23), get_confidence(24)
-        l_kn_conf, r_kn_conf = get_confidence(25), get_confidence(26)
-        l_an_conf, r_an_conf = get_confidence(27), get_confidence(28)
-        
-        # Calculate angles with confidence weighting
-        l_el_ang_result = calculate_angle_3d(l_sh, l_el, l_wr, [l_sh_conf, l_el_conf, l_wr_conf])
-        r_el_ang_result = calculate_angle_3d(r_sh, r_el, r_wr, [r_sh_conf, r_el_conf, r_wr_conf])
-        l_kn_ang_result = calculate_angle_3d(l_hp, l_kn, l_an, [l_hp_conf, l_kn_conf, l_an_conf])
-        r_kn_ang_result = calculate_angle_3d(r_hp, r_kn, r_an, [r_hp_conf, r_kn_conf, r_an_conf])
-        back_ang_result = calculate_angle_3d(l_sh, l_hp, l_kn, [l_sh_conf, l_hp_conf, l_kn_conf])
-        
-        # Process angle results (handle tuple returns with confidence)
-        def process_angle_result(result, angle_key):
-            if result is None:
-                return None
-            elif isinstance(result, tuple):
-                angle, conf = result
-                return smooth_angle(angle_key, angle, confidence=conf)
-            else:
-                return smooth_angle(angle_key, result)
-        
-        # Apply temporal smoothing
-        l_el_ang = process_angle_result(l_el_ang_result, 'l_elbow')
-        r_el_ang = process_angle_result(r_el_ang_result, 'r_elbow')
-        l_kn_ang = process_angle_result(l_kn_ang_result, 'l_knee')
-        r_kn_ang = process_angle_result(r_kn_ang_result, 'r_knee')
-        back_ang = process_angle_result(back_ang_result, 'back')
-
-        # Initialize feedback
-        feedback = ""
-        color = (0, 255, 0)
-        current_form_score = 100
-
-        # Exercise-specific logic
-        if mode == "squat":
-            angle = l_kn_ang
-            if angle is None:
-                feedback = "Adjusting pose detection..."
-                color = (255, 165, 0)  # Orange
-                current_form_score = 50
-            else:
-                # Improved rep counting with hysteresis for squats
-                if direction == 0 and angle < 90:
-                    direction = 1  # Down position reached
-                elif direction == 1 and angle > 160:
-                    counter += 1
-                    direction = 0  # Up position reached, rep counted
-                    if not is_resting:
-                        engine.say(f"Great! Rep {counter}")
-                        engine.runAndWait()
-
-                # Form checking
-                if angle < 50 or angle > 180:
-                    feedback = "Knee angle incorrect!"
-                    color = (0, 0, 255)
-                    current_form_score = form_score("squat", "bottom_knee", angle)
-                elif back_ang is None:
-                    feedback = "Cannot see your back clearly"
-                    color = (255, 165, 0)  # Orange
-                    current_form_score = 70
-                elif back_ang < 145:
-                    feedback = "Straighten your back!"
-                    color = (0, 0, 255)
-                    current_form_score = form_score("squat", "back", back_ang)
-                else:
-                    feedback = "Perfect squat form!"
-                    current_form_score = 100
-
-
-        elif mode == "pushup":
-            angle = l_el_ang
-            if angle is None:
-                feedback = "Adjusting pose detection..."
-                color = (255, 165, 0)  # Orange
-                current_form_score = 50
-            else:
-                # Improved rep counting with hysteresis
-                # Only count a rep when angle goes below 80 (down) and then above 160 (up)
-                if direction == 0 and angle < 80:
-                    direction = 1  # Down position reached
-                elif direction == 1 and angle > 160:
-                    counter += 1
-                    direction = 0  # Up position reached, rep counted
-                    if not is_resting:
-                        engine.say(f"Excellent! Rep {counter}")
-                        engine.runAndWait()
-
-                if angle < 60:
-                    feedback = "Too low on push-up!"
-                    color = (0, 0, 255)
-                    current_form_score = form_score("pushup", "down_elbow", angle)
-                elif angle > 180:
-                    feedback = "Don't lock elbows!"
-                    color = (0, 0, 255)
-                    current_form_score = form_score("pushup", "up_elbow", angle)
-                elif back_ang is None:
-                    feedback = "Cannot see your back clearly"
-                    color = (255, 165, 0)  # Orange
-                    current_form_score = 70
-                else:
-                    feedback = "Perfect push-up form!"
-                    current_form_score = 100
-
-        elif mode == "curl":
-            angle = l_el_ang
-            if angle is None:
-                feedback = "Adjusting pose detection..."
-                color = (255, 165, 0)  # Orange
-                current_form_score = 50
-            else:
-                # Improved rep counting with hysteresis for curls
-                if direction == 0 and angle < 60:
-                    direction = 1  # Curl up position reached
-                elif direction == 1 and angle > 150:
-                    counter += 1
-                    direction = 0  # Curl down position reached, rep counted
-                    if not is_resting:
-                        engine.say(f"Strong! Rep {counter}")
-                        engine.runAndWait()
-
-                if angle > 160:
-                    feedback = "Fully extended arm!"
-                    color = (0, 0, 255)
-                    current_form_score = form_score("curl", "down_elbow", angle)
-                elif angle < 40:
-                    feedback = "Excellent curl!"
-                    current_form_score = 100
-                else:
-                    feedback = "Keep curling!"
-                    current_form_score = form_score("curl", "up_elbow", angle)
-
-        elif mode == "lunge":
-            angle = l_kn_ang
-            if angle is None:
-                feedback = "Adjusting pose detection..."
-                color = (255, 165, 0)  # Orange
-                current_form_score = 50
-            else:
-                # Improved rep counting with hysteresis for lunges
-                if direction == 0 and angle < 90:
-                    direction = 1  # Down position reached
-                elif direction == 1 and angle > 150:
-                    counter += 1
-                    direction = 0  # Up position reached, rep counted
-                    if not is_resting:
-                        engine.say(f"Powerful! Rep {counter}")
-                        engine.runAndWait()
-
-                if angle < 60 or angle > 170:
-                    feedback = "Incorrect lunge form!"
-                    color = (0, 0, 255)
-                    current_form_score = form_score("lunge", "bottom_knee", angle)
-                elif back_ang is None:
-                    feedback = "Cannot see your back clearly"
-                    color = (255, 165, 0)  # Orange
-                    current_form_score = 70
-                else:
-                    feedback = "Nice lunge form!"
-                    current_form_score = 100
-
-        elif mode == "plank":
-            feedback = "Hold steady!"
-            if back_ang is None:
-                feedback = "Cannot see your back clearly"
-                color = (255, 165, 0)  # Orange
-                current_form_score = 70
-            elif back_ang < 145 or back_ang > 165:
-                feedback = "Keep your back straight!"
-                color = (0, 0, 255)
-                current_form_score = form_score("plank", "back", back_ang)
-            else:
-                current_form_score = 100
-                
-        elif mode == "burpee":
-            # Burpee has multiple stages: stand > squat > plank > squat > jump
-            if l_kn_ang is None or r_kn_ang is None:
-                knee_angle = None
-                feedback = "Adjusting pose detection..."
-                color = (255, 165, 0)  # Orange
-                current_form_score = 50
-            else:
-                knee_angle = min(l_kn_ang, r_kn_ang)
-                
-                # State machine for burpee
-                if knee_angle is not None and back_ang is not None:
-                    if burpee_state == "stand" and knee_angle < 100:
-                        burpee_state = "squat"
-                    elif burpee_state == "squat" and back_ang < 140:  # Transitioned to plank
-                        burpee_state = "plank"
-                    elif burpee_state == "plank" and back_ang > 160 and knee_angle < 100:  # Back to squat
-                        burpee_state = "squat_up"
-                    elif burpee_state == "squat_up" and knee_angle > 170:  # Standing/jumping
-                        burpee_state = "stand"
-                        counter += 1
-                        if not is_resting:
-                            engine.say(f"Burpee {counter} complete!")
-                            engine.runAndWait()
-                
-                feedback = f"Burpee state: {burpee_state}"
-                current_form_score = 100  # Simplified scoring for burpees
-
-        # Add form score to tracking
-        form_scores.append(current_form_score)
-
-        # Voice feedback with cooldown
-        if feedback != last_feedback and "Perfect" not in feedback and feedback != "" and feedback_cooldown <= 0:
-            if len(feedback) > 0:
-                engine.say(feedback)
-                engine.runAndWait()
-                last_feedback = feedback
-                feedback_cooldown = 30  # frames cooldown
-        elif "Perfect" in feedback:
-            last_feedback = feedback
-
-        # Decrease cooldown
-        if feedback_cooldown > 0:
-            feedback_cooldown -= 1
+        # Rep counting, form checks and feedback for this exercise
+        h, w, _ = frame.shape
+        rep_completed = scorer.update(results.pose_landmarks.landmark, w, h)
+        counter = scorer.counter
+        feedback, color, current_form_score = scorer.feedback, scorer.color, scorer.form_score
+        if rep_completed and not is_resting:
+            speak(REP_CUES[mode].format(counter))
+        score_timeline.add(scored_time - start_time, current_form_score, scorer.plan.angles)
+        if rep_completed:
+            score_timeline.rep(scored_time - start_time)
+
+        # Compare the rep in progress against the reference; score it once counted
+        if rep_comparator is not None:
+            rep_angle = scorer.rep_angle
+            if rep_angle is not None:
+                rep_comparator.push(rep_angle)
+                rep_angles.append(round(rep_angle, 1))
+            if rep_completed:
+                rep_score = rep_comparator.finish()
+                if rep_score is not None:
+                    rep_scores.append(rep_score)
+                    archived_reps.append(rep_angles)
+                rep_angles = []
+
+        # Form score tracking and voice feedback with cooldown
+        tracker.add(current_form_score)
+        cue = tracker.cue(feedback)
+        if cue:
+            speak(cue)
 
         # Set completion logic
-        if counter >= 12:  # Assuming 12 reps per set
+        if counter >= reps_per_set:
             if current_set < target_sets:
                 current_set += 1
-                counter = 0
+                counter = scorer.counter = 0
                 is_resting = True
                 rest_timer = 60  # 60 seconds rest
-                engine.say(f"Set {current_set - 1} complete! Take a {rest_timer} second rest.")
-                engine.runAndWait()
+                speak(f"Set {current_set - 1} complete! Take a {rest_timer} second rest.")
             else:
                 # Workout complete
-                engine.say("Congratulations! Workout complete!")
-                engine.runAndWait()
+                speak("Congratulations! Workout complete!")
                 break
 
-        # Rest timer logic
+        # Rest timer logic (wall clock, the frame rate varies with quality level)
         if is_resting:
-            rest_timer -= 1/30  # Assuming 30 FPS
+            rest_timer -= frame_interval
             if rest_timer <= 0:
                 is_resting = False
-                engine.say(f"Rest complete! Start set {current_set}")
-                engine.runAndWait()
+                speak(f"Rest complete! Start set {current_set}")
+
+        scoring_seconds.observe(time.perf_counter() - stage_start)
 
     # Display information on frame
+    stage_start = time.perf_counter()
     # Header info
-    cv2.putText(frame, f'{mode.upper()} WORKOUT', (30, 50),
+    cv2.putText(frame, title, (30, 50),
                 cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
     
     # Set and rep info
     cv2.putText(frame, f'Set: {current_set}/{target_sets}', (30, 100),
                 cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-    cv2.putText(frame, f'Reps: {counter}/12', (30, 140),
+    cv2.putText(frame, f'Reps: {counter}/{reps_per_set}', (30, 140),
                 cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
     
     # Form score
-    if form_scores:
-        avg_score = sum(form_scores) / len(form_scores)
-        cv2.putText(frame, f'Form Score: {avg_score:.1f}%', (30, 180),
+    if tracker.frames:
+        cv2.putText(frame, f'Form Score: {tracker.average:.1f}%', (30, 180),
                     cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
     
     # Feedback
@@ -432,13 +326,18 @@ while True:
         cv2.putText(frame, feedback, (30, 220),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
     
+    # Match against the reference movement for the last rep
+    if rep_scores:
+        cv2.putText(frame, f'Rep Match: {rep_scores[-1]}%', (30, 390),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+
     # Rest timer
     if is_resting:
         cv2.putText(frame, f'REST: {int(rest_timer)}s', (30, 260),
                     cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
     
     # Progress bar
-    progress = counter / 12.0
+    progress = counter / float(reps_per_set)
     bar_width = 400
     bar_height = 20
     bar_x, bar_y = 30, 300
@@ -447,27 +346,86 @@ while True:
     cv2.putText(frame, f'Progress: {progress*100:.0f}%', (bar_x, bar_y + bar_height + 25),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
 
+    # Publish the annotated frame; never waits on viewers
+    if not args.no_frame_bus:
+        if frame_bus is None:
+            frame_h, frame_w = frame.shape[:2]
+            try:
+                frame_bus = FrameBusWriter(frame_bus_name, max_height=max(frame_h, 720), max_width=max(frame_w, 1280))
+            except FileExistsError as e:
+                print(f"Frame bus disabled: {e} (give each station its own --station)")
+                args.no_frame_bus = True
+        if frame_bus is not None:
+            frame_bus.publish(frame)
+
     # Display frame
-    cv2.imshow(window_name, frame)
-    
-    # Check for quit
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+    if not args.headless:
+        cv2.imshow(window_name, frame)
+        
+        # Check for quit, 'p' starts a profiling window
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            break
+        if key == ord('p'):
+            profiler.start()
+    render_seconds.observe(time.perf_counter() - stage_start)
+
+    # Publish live status
+    status.publish(STATE_RESTING if is_resting else STATE_RUNNING,
+                   reps=counter, target_reps=reps_per_set,
+                   current_set=current_set, target_sets=target_sets,
+                   form_score=tracker.recent_average,
+                   fps=quality.window_fps(), rest_remaining=rest_timer if is_resting else 0.0,
+                   cue=feedback)
+
+    if profiler.active:
+        profiler.tick()
+
+    # Frame metrics
+    frame_latency = time.time() - frame_start
+    frame_seconds.observe(frame_latency)
+    frames_total.inc()
+    if frame_latency > camera_interval:
+        frames_dropped.inc(int(frame_latency / camera_interval))
+    fps_gauge.set(quality.window_fps())
+
+    # Adapt quality to the measured end-to-end frame latency
+    new_level = quality.record(frame_latency)
+    if new_level is not None:
+        new_width, new_height, new_complexity, _ = quality.settings
+        if (new_width, new_height) != (capture_width, capture_height):
+            apply_mode(cap, camera, new_width, new_height)
+            capture_width, capture_height = new_width, new_height
+        if new_complexity != model_complexity:
+            pose.close()
+            pose = create_pose(new_complexity)
+            model_complexity = new_complexity
+            results = None
+        quality_level_gauge.set(new_level)
 
 # Cleanup
+profiler.stop()
 cap.release()
-cv2.destroyAllWindows()
+pose.close()
+if frame_bus is not None:
+    frame_bus.close()
+if landmark_writer is not None:
+    landmark_writer.close()
+if mjpeg_server is not None:
+    mjpeg_server.shutdown()
+if metrics_exporter is not None:
+    metrics_exporter.stop()
+if metrics_server is not None:
+    metrics_server.shutdown()
+if not args.headless:
+    cv2.destroyAllWindows()
 
 # Calculate workout statistics
 workout_duration = time.time() - start_time
-total_reps = (current_set - 1) * 12 + counter
-avg_form_score = sum(form_scores) / len(form_scores) if form_scores else 0
+total_reps = (current_set - 1) * reps_per_set + counter
+avg_form_score = tracker.average
 calories_burned = estimate_calories(mode, workout_duration, user_data.get('weight_kg', 70))
 
-# Update user data and achievements
-points_earned, new_achievements = update_achievements(user_data, mode, total_reps, avg_form_score, calories_burned)
-save_user_data(user_data)
-
 # Log workout session
 session_data = {
     "timestamp": datetime.now().isoformat(),
@@ -479,6 +437,22 @@ session_data = {
     "calories": round(calories_burned, 1)
 }
 append_log(session_data)
+save_reps(session_id, mode, archived_reps)
+save_timeline(session_id, score_timeline, {key: session_data[key] for key in ("timestamp", "user", "exercise", "reps", "avg_score")})
+
+# Update user data and achievements
+points_earned, new_achievements = update_achievements(user_data, session_data)
+save_user_data(user_data)
+try:
+    record_points(user_data["username"], user_data["points"], points_earned, mode, session_data["timestamp"])
+except Exception as e:
+    print(f"Error updating leaderboard: {e}")
+
+# Let the dashboard know the session is over
+status.publish(STATE_FINISHED, reps=counter, target_reps=reps_per_set,
+               current_set=current_set, target_sets=target_sets,
+               form_score=avg_form_score, cue="Workout complete!")
+status.close()
 
 # Final summary
 print(f"\n{'='*50}")
@@ -489,6 +463,8 @@ print(f"Sets completed: {current_set - 1}")
 print(f"Total reps: {total_reps}")
 print(f"Duration: {workout_duration:.1f} seconds")
 print(f"Average form score: {avg_form_score:.1f}%")
+if rep_scores:
+    print(f"Reference match: {sum(rep_scores) / len(rep_scores):.0f}% average over {len(rep_scores)} reps")
 print(f"Calories burned: {calories_burned:.1f}")
 print(f"Points earned: {points_earned}")
 print(f"Total points: {user_data['points']}")
@@ -0,0 +1,257 @@
+import bisect
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------- Instruments ----------
+# Latency buckets in seconds, tuned for a 15-60 FPS frame loop
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.010, 0.015, 0.020, 0.025, 0.033, 0.040, 0.050,
+                   0.066, 0.080, 0.100, 0.150, 0.200, 0.300, 0.500, 1.0, 2.5, 5.0)
+
+
+class Counter:
+    """Monotonically increasing count"""
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def snapshot(self) -> dict:
+        return {"type": "counter", "value": self.value}
+
+
+class Gauge:
+    """Value that can go up and down"""
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def snapshot(self) -> dict:
+        return {"type": "gauge", "value": self.value}
+
+
+class Histogram:
+    """Fixed-bucket histogram. ``observe`` is a bisect and two additions."""
+
+    def __init__(self, name: str, help: str = "", buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # One extra slot for observations above the largest bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self):
+        """Context manager that observes the elapsed wall time of its block"""
+        return _Timer(self)
+
+    def quantile(self, q: float, counts: list = None) -> float:
+        """Estimate a quantile by linear interpolation inside the matching bucket"""
+        counts = self.counts if counts is None else counts
+        total = sum(counts)
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        counts = list(self.counts)
+        return {
+            "type": "histogram",
+            "buckets": list(self.buckets),
+            "counts": counts,
+            "sum": self.sum,
+            "count": self.count,
+            "p50": self.quantile(0.50, counts),
+            "p90": self.quantile(0.90, counts),
+            "p99": self.quantile(0.99, counts),
+        }
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+# ---------- Registry ----------
+class MetricsRegistry:
+    """Named instruments plus labels (such as the station) attached to every export"""
+
+    def __init__(self, labels: dict = None):
+        self.labels = dict(labels or {})
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, **kwargs)
+        return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get_or_create(Counter, name, help=help)
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, help=help)
+
+    def histogram(self, name: str, help: str = "", buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help=help, buckets=buckets)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "labels": dict(self.labels),
+            "metrics": {metric.name: metric.snapshot() for metric in metrics},
+        }
+
+    def to_text(self) -> str:
+        """Render a snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        label_text = ",".join(f'{key}="{value}"' for key, value in sorted(snapshot["labels"].items()))
+        lines = []
+        with self._lock:
+            helps = {name: metric.help for name, metric in self._metrics.items()}
+
+        def series(name, value, extra=""):
+            labels = ",".join(part for part in (label_text, extra) if part)
+            return f"{name}{{{labels}}} {value}" if labels else f"{name} {value}"
+
+        for name, data in sorted(snapshot["metrics"].items()):
+            if helps.get(name):
+                lines.append(f"# HELP {name} {helps[name]}")
+            lines.append(f"# TYPE {name} {data['type']}")
+            if data["type"] == "histogram":
+                cumulative = 0
+                for upper, bucket_count in zip(data["buckets"], data["counts"]):
+                    cumulative += bucket_count
+                    lines.append(series(f"{name}_bucket", cumulative, f'le="{upper}"'))
+                lines.append(series(f"{name}_bucket", data["count"], 'le="+Inf"'))
+                lines.append(series(f"{name}_sum", data["sum"]))
+                lines.append(series(f"{name}_count", data["count"]))
+                for q in ("p50", "p90", "p99"):
+                    lines.append(series(f"{name}_{q}", data[q]))
+            else:
+                lines.append(series(name, data["value"]))
+        return "\n".join(lines) + "\n"
+
+
+def default_station() -> str:
+    return os.environ.get("FITMATE_STATION") or socket.gethostname()
+
+
+# Process-wide registry used by the frame loop, speech and the log writer
+REGISTRY = MetricsRegistry({"station": default_station()})
+
+
+# ---------- Exporters ----------
+def start_metrics_server(registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = 9108):
+    """Serve the registry as text at http://host:port/metrics on a daemon thread"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.to_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics available at http://{host}:{port}/metrics")
+    return server
+
+
+class RotatingJSONExporter:
+    """Appends a JSON snapshot line every ``interval`` seconds from a background thread.
+
+    The file is rotated to ``path.1`` ... ``path.N`` once it grows past ``max_bytes``.
+    """
+
+    def __init__(self, path: str, registry: MetricsRegistry = REGISTRY, interval: float = 30.0,
+                 max_bytes: int = 5 * 1024 * 1024, backups: int = 5):
+        self.path = path
+        self.registry = registry
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread and write a final snapshot"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=self.interval)
+        self.export()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def export(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.registry.snapshot()) + "\n")
+        except Exception as e:
+            print(f"Error exporting metrics: {e}")
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
@@ -0,0 +1,276 @@
+import argparse
+import glob
+import itertools
+import json
+import math
+from bisect import bisect_left
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils import IDEAL_ANGLES
+
+REFERENCE_PATH = "reference_movements.json"
+REP_ARCHIVE_DIR = "logs/reps"
+REFERENCE_SAMPLES = 48
+# Columns of the reference either side of the best match evaluated per live sample
+DTW_WINDOW = 6
+# Weight of the newest sample in the smoothed angle used to estimate rep phase
+PHASE_SMOOTHING = 0.6
+# Mean angle error (degrees) along the warping path that scores 0
+REP_TOLERANCE_DEG = 25.0
+
+# Angle each exercise counts reps on, and its (start, turn) points from IDEAL_ANGLES
+REFERENCE_ANGLES = {
+    "squat": ("l_knee", ("squat", "top_knee"), ("squat", "bottom_knee")),
+    "pushup": ("l_elbow", ("pushup", "up_elbow"), ("pushup", "down_elbow")),
+    "curl": ("l_elbow", ("curl", "down_elbow"), ("curl", "up_elbow")),
+    "lunge": ("l_knee", ("lunge", "top_knee"), ("lunge", "bottom_knee")),
+    "burpee": ("knee", ("squat", "top_knee"), ("squat", "bottom_knee")),
+}
+
+
+# ---------- Reference Library ----------
+def default_reference(exercise: str, samples: int = REFERENCE_SAMPLES) -> np.ndarray:
+    """Smooth start -> turn -> start trajectory built from the exercise's ideal angles"""
+    _, start_key, turn_key = REFERENCE_ANGLES[exercise]
+    start = IDEAL_ANGLES[start_key[0]][start_key[1]]["target"]
+    turn = IDEAL_ANGLES[turn_key[0]][turn_key[1]]["target"]
+    phase = (1 - np.cos(np.linspace(0, 2 * np.pi, samples))) / 2
+    return (start + (turn - start) * phase).astype(np.float32)
+
+
+def resample(values, samples: int = REFERENCE_SAMPLES) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float32)
+    if len(values) == samples:
+        return values
+    return np.interp(np.linspace(0, len(values) - 1, samples), np.arange(len(values)), values).astype(np.float32)
+
+
+def load_references(path: str = REFERENCE_PATH) -> dict:
+    """{exercise: float32 angle array}; built-in defaults for exercises not in the file"""
+    references = {exercise: default_reference(exercise) for exercise in REFERENCE_ANGLES}
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            for exercise, entry in stored.items():
+                references[exercise] = np.asarray(entry["angles"], dtype=np.float32)
+        except Exception as e:
+            print(f"Error loading reference movements: {e}")
+    return references
+
+
+def save_reference(exercise: str, angles, path: str = REFERENCE_PATH):
+    """Store a rep as the exercise's reference, resampled and rounded to whole degrees"""
+    stored = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+    stored[exercise] = {
+        "angle": REFERENCE_ANGLES.get(exercise, ("angle",))[0],
+        "angles": [int(round(float(value))) for value in resample(angles)],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(stored, f, separators=(",", ":"))
+
+
+# ---------- Comparison ----------
+class RepComparator:
+    """Windowed dynamic time warping of a live rep against a reference, one sample at a time.
+
+    Each ``push`` fills one DTW row, but only the reference columns within ``window``
+    of where the rep should be, so a sample costs O(window) whatever the rep length.
+    Two rows are allocated once and reused; cells outside a row's band stay at inf.
+    The expected column is where the reference reaches the live angle: on its way to
+    the turning point, and after the turn on its way back (scaled to how deep the rep
+    went). Between the bottom of the rep and the point the turn is confirmed, the
+    column advances one per sample from where the bottom matched.
+    ``finish`` returns a 0-100 score from the mean angle error along the warping path.
+    """
+
+    def __init__(self, reference, window: int = DTW_WINDOW, tolerance: float = REP_TOLERANCE_DEG):
+        self.reference = [float(value) for value in reference]
+        self.window = window
+        self.tolerance = tolerance
+        start = self.reference[0]
+        self._turn_index = max(range(len(self.reference)), key=lambda j: abs(self.reference[j] - start))
+        self._direction = 1.0 if self.reference[self._turn_index] >= start else -1.0
+        self._amplitude = max(abs(self.reference[self._turn_index] - start), 1.0)
+        # Reference depth made monotone on each side of the turn, for value lookups
+        depths = [self._direction * (value - start) for value in self.reference]
+        self._rising = list(itertools.accumulate(depths[:self._turn_index + 1], max))
+        self._falling = [-depth for depth in itertools.accumulate(depths[self._turn_index:], min)]
+        size = len(self.reference)
+        self._cost, self._steps = [math.inf] * size, [0] * size
+        self._spare_cost, self._spare_steps = [math.inf] * size, [0] * size
+        self._band = self._spare_band = (0, -1)
+        self.reset()
+
+    def reset(self):
+        self._clear(self._cost, self._steps, self._band)
+        self._clear(self._spare_cost, self._spare_steps, self._spare_band)
+        self._band = self._spare_band = (0, -1)
+        self._center = 0
+        self._depth = None
+        self._deepest = 0.0
+        self._deepest_raw = 0.0
+        self._since_deepest = 0
+        self._turned = False
+        self._last_angle = None
+        self.samples = 0
+
+    def _expected_column(self, angle: float) -> int:
+        """Reference column matching the rep's phase"""
+        raw = self._direction * (angle - self.reference[0])
+        # The turn is detected on a lightly smoothed angle so jitter does not look like one
+        depth = raw if self._depth is None else self._depth + PHASE_SMOOTHING * (raw - self._depth)
+        self._depth = depth
+        if not self._turned:
+            self._deepest = max(self._deepest, depth)
+            # Turned once the angle comes back a quarter of the way from its extreme,
+            # and by more than jitter
+            back = self._deepest - depth
+            if self._deepest > 0.3 * self._amplitude and back > max(0.25 * self._deepest, 0.15 * self._amplitude):
+                self._turned = True
+        # The column itself follows the unsmoothed angle
+        if not self._turned:
+            if raw >= self._deepest_raw:
+                self._deepest_raw, self._since_deepest = raw, 0
+                return min(bisect_left(self._rising, raw), self._turn_index)
+            self._since_deepest += 1
+            bottom = min(bisect_left(self._rising, self._deepest_raw), self._turn_index)
+            return min(bottom + self._since_deepest, len(self.reference) - 1)
+        target = raw * self._amplitude / max(self._deepest_raw, 1e-6)
+        return min(self._turn_index + bisect_left(self._falling, -target), len(self.reference) - 1)
+
+    def push(self, angle):
+        """Add one live sample (None, e.g. a low-confidence frame, is skipped)"""
+        if angle is None:
+            return
+        reference = self.reference
+        previous_cost, previous_steps = self._cost, self._steps
+        size = len(reference)
+        # The rep only moves forward through the reference
+        center = max(self._expected_column(angle), self._center)
+        self._center = center
+        previous_low, previous_high = self._band
+        # Keep the band overlapping the previous row so the path stays connected
+        low = max(0, min(center - self.window, previous_high))
+        high = max(previous_low, min(size - 1, center + self.window))
+        if self.samples == 0:
+            low = 0
+        # Reuse the row from two samples back, clearing only the band it used
+        cost, steps = self._spare_cost, self._spare_steps
+        self._clear(cost, steps, self._spare_band)
+        for j in range(low, high + 1):
+            distance = abs(angle - reference[j])
+            if self.samples == 0:
+                # First row: the path starts at column 0 and can only move right
+                cell, length = (0.0, 0) if j == 0 else (cost[j - 1], steps[j - 1])
+            else:
+                # Candidates: down (repeat column), diagonal, right (same row)
+                cell, length = previous_cost[j], previous_steps[j]
+                if j > 0 and previous_cost[j - 1] < cell:
+                    cell, length = previous_cost[j - 1], previous_steps[j - 1]
+                if j > 0 and cost[j - 1] < cell:
+                    cell, length = cost[j - 1], steps[j - 1]
+            cost[j], steps[j] = cell + distance, length + 1
+        self._spare_cost, self._spare_steps, self._spare_band = previous_cost, previous_steps, self._band
+        self._cost, self._steps = cost, steps
+        self._band = (low, high)
+        self._last_angle = angle
+        self.samples += 1
+
+    @staticmethod
+    def _clear(cost: list, steps: list, band: tuple):
+        for j in range(band[0], band[1] + 1):
+            cost[j] = math.inf
+            steps[j] = 0
+
+    def mean_error(self) -> float:
+        """Mean angle error along the best warping path over the whole reference.
+
+        If the rep stopped before reaching the end of the reference, the path is
+        completed by matching the remaining columns against the last sample.
+        """
+        if self.samples == 0:
+            return math.inf
+        reference = self.reference
+        last = len(reference) - 1
+        reached = max(j for j in range(self._band[0], self._band[1] + 1) if self._steps[j])
+        remaining = sum(abs(self._last_angle - reference[j]) for j in range(reached + 1, last + 1))
+        return (self._cost[reached] + remaining) / (self._steps[reached] + last - reached)
+
+    def finish(self):
+        """Score the rep (0-100, None if no samples were pushed) and start the next one"""
+        if self.samples == 0:
+            return None
+        error = self.mean_error()
+        self.reset()
+        return int(round(max(0.0, 100.0 * (1.0 - error / self.tolerance))))
+
+
+def compare_rep(reference, angles, window: int = DTW_WINDOW) -> int:
+    comparator = RepComparator(reference, window)
+    for angle in angles:
+        comparator.push(float(angle))
+    return comparator.finish()
+
+
+# ---------- Rep Archive ----------
+def save_reps(session_id: str, exercise: str, reps: list, out_dir: str = REP_ARCHIVE_DIR):
+    """Archive a session's rep trajectories as float32 arrays in one .npz file"""
+    if not reps:
+        return None
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{session_id}.npz")
+    np.savez_compressed(path, exercise=np.array(exercise),
+                        **{f"rep_{i:03d}": np.asarray(rep, dtype=np.float32) for i, rep in enumerate(reps)})
+    return path
+
+
+def load_reps(path: str) -> tuple:
+    with np.load(path) as archive:
+        exercise = str(archive["exercise"])
+        reps = [archive[key] for key in sorted(archive.files) if key.startswith("rep_")]
+    return exercise, reps
+
+
+def score_archive(task: tuple) -> dict:
+    """Worker: score every rep in one archive file against its exercise reference"""
+    path, reference_path = task
+    exercise, reps = load_reps(path)
+    reference = load_references(reference_path).get(exercise)
+    scores = [compare_rep(reference, rep) for rep in reps] if reference is not None else []
+    return {"path": path, "exercise": exercise, "scores": scores}
+
+
+def batch_score(paths: list, reference_path: str = REFERENCE_PATH, workers: int = None) -> list:
+    """Score archived reps in a process pool, one archive per task"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(score_archive, [(path, reference_path) for path in paths]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reference movements and rep comparison")
+    commands = parser.add_subparsers(dest="command", required=True)
+    score_parser = commands.add_parser("score", help="Score archived reps against the references")
+    score_parser.add_argument("paths", nargs="*", help=f"Rep archives (default: {REP_ARCHIVE_DIR}/*.npz)")
+    score_parser.add_argument("--workers", type=int, default=None)
+    record_parser = commands.add_parser("record", help="Use an archived rep as an exercise's reference")
+    record_parser.add_argument("path")
+    record_parser.add_argument("--rep", type=int, default=0)
+    cli_args = parser.parse_args()
+
+    if cli_args.command == "score":
+        paths = cli_args.paths or sorted(glob.glob(os.path.join(REP_ARCHIVE_DIR, "*.npz")))
+        for result in batch_score(paths, workers=cli_args.workers):
+            scores = result["scores"]
+            mean = sum(scores) / len(scores) if scores else 0
+            print(f"{result['path']}: {result['exercise']}, {len(scores)} reps, mean match {mean:.0f}% {scores}")
+    else:
+        exercise, reps = load_reps(cli_args.path)
+        save_reference(exercise, reps[cli_args.rep])
+        print(f"Saved rep {cli_args.rep} of {cli_args.path} as the {exercise} reference")
@@ -0,0 +1,99 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from datetime import datetime
+
+PROFILE_DIR = "logs/profiles"
+
+
+class ProfileCapture:
+    """Bounded cProfile + tracemalloc capture of the running frame loop.
+
+    Nothing is hooked until ``start`` is called, so the only cost while idle is the
+    ``active`` check in the loop. After ``duration`` seconds the capture stops itself
+    and writes a ``.prof`` file, a readable stats summary and a top-allocations report.
+    """
+
+    def __init__(self, exercise: str, session_id: str, duration: float = 10.0,
+                 out_dir: str = PROFILE_DIR, top_allocations: int = 25):
+        self.exercise = exercise
+        self.session_id = session_id
+        self.duration = duration
+        self.out_dir = out_dir
+        self.top_allocations = top_allocations
+        self.active = False
+        self._profiler = None
+        self._started = 0.0
+        self._frames = 0
+
+    def start(self):
+        if self.active:
+            return
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start(10)
+        self._baseline = tracemalloc.take_snapshot()
+        self._profiler = cProfile.Profile()
+        self._started = time.time()
+        self._frames = 0
+        self.active = True
+        self._profiler.enable()
+        print(f"Profiling for {self.duration:g} seconds...")
+
+    def tick(self):
+        """Call once per frame while active; stops the capture when the window is over"""
+        self._frames += 1
+        if time.time() - self._started >= self.duration:
+            return self.stop()
+        return None
+
+    def stop(self):
+        """Stop the capture and write the reports. Returns the path of the .prof file."""
+        if not self.active:
+            return None
+        self._profiler.disable()
+        self.active = False
+        elapsed = time.time() - self._started
+        snapshot = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(self.out_dir, f"profile_{self.exercise}_{self.session_id}_{stamp}")
+        try:
+            self._profiler.dump_stats(base + ".prof")
+            self._write_stats(base + "_stats.txt", elapsed)
+            self._write_allocations(base + "_alloc.txt", snapshot, elapsed)
+            print(f"Profile written to {base}.prof")
+        except Exception as e:
+            print(f"Error writing profile: {e}")
+        self._profiler = None
+        self._baseline = None
+        return base + ".prof"
+
+    def _header(self, elapsed: float) -> str:
+        fps = self._frames / elapsed if elapsed > 0 else 0.0
+        return (f"exercise: {self.exercise}\nsession: {self.session_id}\n"
+                f"window: {elapsed:.1f}s, {self._frames} frames ({fps:.1f} FPS)\n\n")
+
+    def _write_stats(self, path: str, elapsed: float):
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=stream)
+        stats.sort_stats("cumulative").print_stats(40)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self._header(elapsed))
+            f.write(stream.getvalue())
+
+    def _write_allocations(self, path: str, snapshot, elapsed: float):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self._header(elapsed))
+            f.write(f"Top {self.top_allocations} allocation sites by size (live at end of window)\n")
+            for stat in snapshot.statistics("lineno")[:self.top_allocations]:
+                f.write(f"{stat}\n")
+            f.write(f"\nTop {self.top_allocations} growth during the window\n")
+            for stat in snapshot.compare_to(self._baseline, "lineno")[:self.top_allocations]:
+                f.write(f"{stat}\n")
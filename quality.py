@@ -0,0 +1,133 @@
+import csv
+import os
+import time
+from collections import deque
+from datetime import datetime
+
+# ---------- Quality Levels ----------
+# Ordered from cheapest to best. Each level is (width, height, model_complexity, inference_stride).
+QUALITY_LEVELS = [
+    (640, 360, 0, 3),
+    (640, 360, 0, 2),
+    (640, 360, 0, 1),
+    (960, 540, 0, 1),
+    (1280, 720, 0, 1),
+    (1280, 720, 1, 1),
+]
+
+QUALITY_LOG_PATH = "logs/quality_changes.csv"
+
+
+def describe_level(level: int) -> str:
+    """Human readable description of a quality level"""
+    width, height, complexity, stride = QUALITY_LEVELS[level]
+    return f"{width}x{height}, complexity {complexity}, stride {stride}"
+
+
+class AdaptiveQualityController:
+    """Steps capture resolution, model complexity and inference stride to hold a target FPS.
+
+    Frame latencies are measured over a sliding window. The controller degrades when the
+    window's FPS falls below ``target_fps * (1 - degrade_margin)`` and only upgrades when
+    it exceeds ``target_fps * (1 + upgrade_margin)``. Each change clears the window and
+    starts a cooldown; an upgrade that has to be rolled back doubles the hold time before
+    that level is tried again, so a station hovering at the edge does not oscillate.
+    ``max_level`` caps upgrades, e.g. at the best resolution the camera delivers at the target FPS.
+    """
+
+    def __init__(self, target_fps: float = 24.0, window_size: int = 45, start_level: int = None,
+                 degrade_margin: float = 0.10, upgrade_margin: float = 0.30,
+                 cooldown_sec: float = 2.0, upgrade_hold_sec: float = 5.0,
+                 log_path: str = QUALITY_LOG_PATH, enabled: bool = True, max_level: int = None):
+        self.target_fps = target_fps
+        self.window = deque(maxlen=window_size)
+        self.max_level = len(QUALITY_LEVELS) - 1 if max_level is None else max_level
+        self.level = self.max_level if start_level is None else min(start_level, self.max_level)
+        self.degrade_margin = degrade_margin
+        self.upgrade_margin = upgrade_margin
+        self.cooldown_sec = cooldown_sec
+        self.upgrade_hold_sec = upgrade_hold_sec
+        self.log_path = log_path
+        self.enabled = enabled
+        self.last_change = time.time()
+        self.frame_index = 0
+        # Extra hold time per level, doubled each time an upgrade into it is rolled back
+        self._hold = {}
+        self._last_upgrade_from = None
+
+    @property
+    def settings(self) -> tuple:
+        """(width, height, model_complexity, inference_stride) for the current level"""
+        return QUALITY_LEVELS[self.level]
+
+    def should_infer(self) -> bool:
+        """Whether pose inference should run on the current frame"""
+        return self.frame_index % self.settings[3] == 0
+
+    def window_fps(self) -> float:
+        if not self.window:
+            return 0.0
+        mean_latency = sum(self.window) / len(self.window)
+        return 1.0 / mean_latency if mean_latency > 0 else 0.0
+
+    def record(self, latency_sec: float):
+        """Record the end-to-end latency of one frame.
+
+        Returns the new level when the controller changes quality, otherwise None.
+        """
+        self.frame_index += 1
+        self.window.append(latency_sec)
+        if not self.enabled or len(self.window) < self.window.maxlen:
+            return None
+
+        now = time.time()
+        if now - self.last_change < self.cooldown_sec:
+            return None
+
+        fps = self.window_fps()
+        if fps < self.target_fps * (1 - self.degrade_margin) and self.level > 0:
+            if self._last_upgrade_from == self.level - 1:
+                # The upgrade did not hold, back off before trying this level again
+                self._hold[self.level] = self._hold.get(self.level, self.upgrade_hold_sec) * 2
+            self._last_upgrade_from = None
+            return self._change(self.level - 1, fps, "degrade", now)
+
+        if fps > self.target_fps * (1 + self.upgrade_margin) and self.level < self.max_level:
+            hold = self._hold.get(self.level + 1, self.upgrade_hold_sec)
+            if now - self.last_change >= hold:
+                self._last_upgrade_from = self.level
+                return self._change(self.level + 1, fps, "upgrade", now)
+        elif self._last_upgrade_from is not None and now - self.last_change >= self.upgrade_hold_sec:
+            # The upgraded level held steady; forget the back-off for it
+            self._hold.pop(self.level, None)
+            self._last_upgrade_from = None
+        return None
+
+    def _change(self, new_level: int, fps: float, reason: str, now: float) -> int:
+        old_level = self.level
+        self.level = new_level
+        self.last_change = now
+        self.window.clear()
+        self._log_change(old_level, new_level, fps, reason)
+        return new_level
+
+    def _log_change(self, old_level: int, new_level: int, fps: float, reason: str):
+        print(f"Quality {reason}: {describe_level(old_level)} -> {describe_level(new_level)} "
+              f"(measured {fps:.1f} FPS, target {self.target_fps:.1f})")
+        if not self.log_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            file_exists = os.path.exists(self.log_path)
+            with open(self.log_path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if not file_exists:
+                    writer.writerow(["timestamp", "reason", "from_level", "to_level",
+                                     "width", "height", "model_complexity", "stride",
+                                     "measured_fps", "target_fps"])
+                width, height, complexity, stride = QUALITY_LEVELS[new_level]
+                writer.writerow([datetime.now().isoformat(), reason, old_level, new_level,
+                                 width, height, complexity, stride,
+                                 round(fps, 2), self.target_fps])
+        except Exception as e:
+            print(f"Error writing quality log: {e}")
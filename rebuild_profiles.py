@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from achievement_engine import AchievementEngine, new_state
+from analytics import LOG_COLUMNS, LOG_PATH, iter_log_chunks
+from leaderboard import LEADERBOARD_PATH, OVERALL_BOARD, Board, Leaderboard, exercise_board, week_board
+from utils import atomic_write_json
+
+PROFILE_DIR = "user_data"
+ROOT_PROFILE_PATH = "user_data.json"
+# Profile fields derived from the session history; everything else is left untouched
+DERIVED_FIELDS = ["points", "streak", "last_workout", "total_workouts", "achievements", "achievement_state"]
+
+
+def profile_id(username: str) -> str:
+    """File-safe profile id for a username (matches utils.load_user_data paths)"""
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(username)) or "default"
+
+
+def profile_path(username: str, profile_dir: str = PROFILE_DIR) -> str:
+    return os.path.join(profile_dir, f"{profile_id(username)}.json")
+
+
+def _read_json(path: str):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# ---------- Partitioning ----------
+def partition_history(log_path: str, out_dir: str, partitions: int, chunk_rows: int = 200_000) -> list:
+    """Hash-partition the session log by user into ``partitions`` CSV files.
+
+    A user's rows always land in the same partition, so partitions can be
+    replayed independently. Memory is bounded by ``chunk_rows``.
+    """
+    paths = [os.path.join(out_dir, f"part_{i:04d}.csv") for i in range(partitions)]
+    written = set()
+    for chunk in iter_log_chunks(log_path, chunk_rows):
+        chunk = chunk.dropna(subset=["user"])
+        shards = chunk["user"].map(lambda user: zlib.crc32(str(user).encode("utf-8")) % partitions)
+        for shard, rows in chunk.groupby(shards, sort=False):
+            path = paths[shard]
+            rows[LOG_COLUMNS].to_csv(path, mode="a", header=path not in written, index=False)
+            written.add(path)
+    return [path for path in paths if path in written]
+
+
+# ---------- Replay ----------
+def replay_user(rows: pd.DataFrame, existing: dict, engine: AchievementEngine, scopes: dict = None,
+                skipped: list = None) -> dict:
+    """Derive a user's profile state from their full history using the live rules.
+
+    If ``scopes`` is given, the points earned per exercise and per week board are added to it.
+    Rows without a usable timestamp or with unreadable numbers are left out and, if
+    ``skipped`` is given, listed there as (timestamp, reason).
+    """
+    existing = existing or {}
+    profile = {"points": 0, "streak": 0, "last_workout": None, "total_workouts": 0, "achievements": [],
+               "goals": existing.get("goals", {})}
+    state = new_state()
+    # Shares are not in the session log; carry them over
+    state["shares"] = (existing.get("achievement_state") or {}).get("shares", 0)
+    profile["achievement_state"] = state
+    for workout in rows.sort_values("timestamp", kind="stable").to_dict("records"):
+        timestamp = workout.get("timestamp")
+        try:
+            if not isinstance(timestamp, str) or not timestamp.strip():
+                raise ValueError("missing timestamp")
+            workout["timestamp"] = datetime.fromisoformat(timestamp)
+            # Validate before record_workout so a bad row leaves the profile untouched
+            workout = engine.normalize(workout)
+        except (ValueError, TypeError) as e:
+            if skipped is not None:
+                skipped.append((None if pd.isna(timestamp) else str(timestamp), str(e)))
+            continue
+        points, _ = engine.record_workout(profile, workout)
+        if scopes is not None:
+            names = [week_board(profile["last_workout"])]
+            if workout["exercise"]:
+                names.append(exercise_board(workout["exercise"]))
+            for name in names:
+                scopes[name] = scopes.get(name, 0) + points
+    engine.reevaluate(profile)
+    return {field: profile[field] for field in DERIVED_FIELDS}
+
+
+def rebuild_partition(task: tuple) -> dict:
+    """Worker: replay every user in one partition.
+
+    Returns {"profiles": {username: derived fields}, "boards": {board: {username: points}},
+    "skipped": {username: [(timestamp, reason)]}}.
+    """
+    partition_path, profile_dir = task
+    engine = AchievementEngine()
+    df = pd.read_csv(partition_path, encoding='utf-8', dtype={"user": "string", "exercise": "string"})
+    results = {}
+    boards = {}
+    skipped = {}
+    for username, rows in df.groupby("user", sort=False):
+        existing = _read_json(profile_path(username, profile_dir))
+        scopes = {}
+        bad_rows = []
+        results[username] = replay_user(rows, existing, engine, scopes, bad_rows)
+        if bad_rows:
+            skipped[username] = bad_rows
+        boards.setdefault(OVERALL_BOARD, {})[username] = results[username]["points"]
+        for name, points in scopes.items():
+            boards.setdefault(name, {})[username] = points
+    return {"profiles": results, "boards": boards, "skipped": skipped}
+
+
+# ---------- Diff and Write ----------
+def diff_profile(old: dict, new: dict) -> dict:
+    """Changed derived fields as {field: [old, new]}; achievements as added/removed lists"""
+    old = old or {}
+    changes = {}
+    for field in DERIVED_FIELDS:
+        if field == "achievement_state":
+            continue
+        before, after = old.get(field), new.get(field)
+        if field == "achievements":
+            added = sorted(set(after or []) - set(before or []))
+            removed = sorted(set(before or []) - set(after or []))
+            if added or removed:
+                changes[field] = {"added": added, "removed": removed}
+        elif before != after:
+            changes[field] = [before, after]
+    return changes
+
+
+def apply_results(results: dict, profile_dir: str = PROFILE_DIR, root_profile: str = ROOT_PROFILE_PATH,
+                  dry_run: bool = False) -> dict:
+    """Merge derived fields into each stored profile (atomically) and return the diff report"""
+    report = {}
+    root = _read_json(root_profile) if root_profile else None
+    for username, derived in results.items():
+        path = profile_path(username, profile_dir)
+        targets = [path]
+        if root is not None and root.get("username") == username:
+            targets.append(root_profile)
+        for target in targets:
+            existing = _read_json(target)
+            changes = diff_profile(existing, derived)
+            if not changes and existing is not None:
+                continue
+            report.setdefault(username, {})[target] = changes
+            if dry_run:
+                continue
+            profile = dict(existing) if existing else {"username": username, "created_at": datetime.now().isoformat()}
+            profile.update(derived)
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            atomic_write_json(target, profile)
+    return report
+
+
+def rebuild_profiles(log_path: str = LOG_PATH, profile_dir: str = PROFILE_DIR, root_profile: str = ROOT_PROFILE_PATH,
+                     workers: int = None, partitions: int = None, dry_run: bool = False,
+                     leaderboard_path: str = LEADERBOARD_PATH) -> dict:
+    """Recompute points, streaks, achievements and the leaderboard for every user in the session history"""
+    workers = workers or os.cpu_count() or 1
+    partitions = partitions or workers * 4
+    started = time.time()
+    work_dir = tempfile.mkdtemp(prefix="fitmate_rebuild_")
+    try:
+        partition_paths = partition_history(log_path, work_dir, partitions)
+        results = {}
+        boards = {}
+        skipped = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            tasks = [(path, profile_dir) for path in partition_paths]
+            for partition in pool.map(rebuild_partition, tasks):
+                results.update(partition["profiles"])
+                skipped.update(partition["skipped"])
+                for name, scores in partition["boards"].items():
+                    boards.setdefault(name, {}).update(scores)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for username, bad_rows in skipped.items():
+        for timestamp, reason in bad_rows:
+            print(f"Skipped a row for {username} ({timestamp or 'no timestamp'}): {reason}")
+    report = apply_results(results, profile_dir, root_profile, dry_run)
+    if not dry_run and leaderboard_path:
+        leaderboard = Leaderboard(leaderboard_path)
+        leaderboard.boards = {name: Board(scores.items()) for name, scores in boards.items()}
+        leaderboard.prune_weeks()
+        leaderboard.save()
+    print(f"Rebuilt {len(results)} profiles from {log_path} in {time.time() - started:.1f}s "
+          f"({workers} workers, {partitions} partitions); {len(report)} changed"
+          f"{' (dry run, nothing written)' if dry_run else ''}")
+    return {"results": results, "report": report}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute profile points, streaks and achievements from the session log")
+    parser.add_argument("--log", default=LOG_PATH)
+    parser.add_argument("--profiles", default=PROFILE_DIR, help="Directory of per-user profile JSON files")
+    parser.add_argument("--root-profile", default=ROOT_PROFILE_PATH, help="Single-user profile used by the app")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--partitions", type=int, default=None)
+    parser.add_argument("--leaderboard", default=LEADERBOARD_PATH, help="Leaderboard index to rebuild")
+    parser.add_argument("--dry-run", action="store_true", help="Report differences without writing")
+    parser.add_argument("--report", default=None, help="Write the diff report to this JSON file")
+    cli_args = parser.parse_args()
+
+    outcome = rebuild_profiles(cli_args.log, cli_args.profiles, cli_args.root_profile,
+                               cli_args.workers, cli_args.partitions, cli_args.dry_run, cli_args.leaderboard)
+    for username, targets in sorted(outcome["report"].items()):
+        for target, changes in targets.items():
+            print(f"{username} ({target}):")
+            for field, change in changes.items():
+                print(f"  {field}: {change}")
+    if cli_args.report:
+        atomic_write_json(cli_args.report, outcome["report"])
@@ -0,0 +1,285 @@
+import glob
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from analytics import LOG_COLUMNS, LOG_PATH, get_engine, iter_log_chunks, log_version
+
+REPORT_DIR = "logs/reports"
+CSV_CHUNK_ROWS = 50_000
+REPORT_KINDS = {
+    # kind: (file extension, mime type)
+    "csv": ("csv", "text/csv"),
+    "pdf": ("pdf", "application/pdf"),
+    "progress": ("md", "text/markdown"),
+}
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+# Builds retried when the log is written while a report is being built
+BUILD_ATTEMPTS = 3
+
+
+def version_key(version) -> str:
+    """File-name form of an analytics data version ("empty" when there is no log)"""
+    if version is None:
+        return "empty"
+    return "_".join("-".join(map(str, part)) if part else "0" for part in version)
+
+
+# ---------- Aggregates ----------
+def build_summary(log_path: str = LOG_PATH) -> dict:
+    """Aggregates shared by the PDF and progress reports, computed once per data version"""
+    engine = get_engine(log_path)
+    df = engine.frame
+    summary = {
+        "generated_at": datetime.now(),
+        "totals": engine.totals(),
+        "favourite_exercise": engine.favourite_exercise(),
+        "active_days": int(engine.workout_frequency()),
+        "first_day": df['timestamp'].min() if not df.empty else None,
+        "last_day": df['timestamp'].max() if not df.empty else None,
+        "weekly": engine.weekly_progress(weeks=8),
+        "exercises": {str(name): int(count) for name, count in engine.exercise_counts().items()},
+        "last_30": engine.range_metrics(30),
+        "last_7": engine.range_metrics(7),
+    }
+    return summary
+
+
+def _fmt(value, digits: int = 0, suffix: str = "") -> str:
+    try:
+        if value != value:  # NaN
+            return "-"
+        return f"{value:,.{digits}f}{suffix}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+# ---------- Builders ----------
+def write_csv(log_path: str, out_path: str, chunk_rows: int = CSV_CHUNK_ROWS):
+    """Copy the logged columns to ``out_path`` chunk by chunk, with exactly one header"""
+    with open(out_path, 'w', encoding='utf-8', newline='') as f:
+        header = True
+        if log_version(log_path) is not None:
+            for chunk in iter_log_chunks(log_path, chunk_rows):
+                chunk.reindex(columns=LOG_COLUMNS).to_csv(f, header=header, index=False)
+                header = False
+        if header:
+            f.write(",".join(LOG_COLUMNS) + "\n")
+
+
+def write_progress(summary: dict, out_path: str):
+    """Markdown progress report"""
+    totals = summary["totals"]
+    lines = [
+        "# Workout Progress Report",
+        "",
+        f"Generated {summary['generated_at']:%Y-%m-%d %H:%M}",
+        "",
+        "## All Time",
+        f"- Workouts: {totals['total_workouts']:,}",
+        f"- Active days: {summary['active_days']:,}",
+        f"- Total reps: {_fmt(totals['total_reps'])}",
+        f"- Calories burned: {_fmt(totals['total_calories'])}",
+        f"- Average form score: {_fmt(totals['avg_form_score'], 1, '%')}",
+        f"- Time trained: {_fmt(totals['total_duration'] / 60 if totals['total_workouts'] else 0)} minutes",
+        f"- Favourite exercise: {summary['favourite_exercise']}",
+    ]
+    if summary["first_day"] is not None:
+        lines.append(f"- History: {summary['first_day']:%Y-%m-%d} to {summary['last_day']:%Y-%m-%d}")
+    lines += ["", "## Recent Activity", "", "| Period | Workouts | Calories | Avg Form |", "|---|---|---|---|"]
+    for label, key in (("Last 7 days", "last_7"), ("Last 30 days", "last_30")):
+        metrics = summary[key]
+        lines.append(f"| {label} | {metrics['workouts']} | {_fmt(metrics['calories'])} | {_fmt(metrics['avg_score'], 1, '%')} |")
+    if summary["weekly"]:
+        lines += ["", "## Weekly Progress", "", "| Week | Reps | Calories | Avg Form | Minutes |", "|---|---|---|---|---|"]
+        for week in summary["weekly"]:
+            lines.append(f"| {week['week']} | {_fmt(week['reps'])} | {_fmt(week['calories'])} | "
+                         f"{_fmt(week['avg_score'], 1, '%')} | {_fmt(week['duration_sec'] / 60)} |")
+    if summary["exercises"]:
+        lines += ["", "## Exercises", "", "| Exercise | Workouts |", "|---|---|"]
+        for name, count in summary["exercises"].items():
+            lines.append(f"| {name.title()} | {count} |")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def write_pdf(summary: dict, out_path: str):
+    """PDF summary report (requires reportlab)"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    table_style = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#667eea")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+    ])
+    totals = summary["totals"]
+    story = [
+        Paragraph("AI Fitness Trainer — Workout Report", styles["Title"]),
+        Paragraph(f"Generated {summary['generated_at']:%Y-%m-%d %H:%M}", styles["Normal"]),
+        Spacer(1, 12),
+        Paragraph("All Time", styles["Heading2"]),
+        Table([
+            ["Metric", "Value"],
+            ["Workouts", f"{totals['total_workouts']:,}"],
+            ["Active days", f"{summary['active_days']:,}"],
+            ["Total reps", _fmt(totals['total_reps'])],
+            ["Calories burned", _fmt(totals['total_calories'])],
+            ["Average form score", _fmt(totals['avg_form_score'], 1, "%")],
+            ["Favourite exercise", str(summary['favourite_exercise']).title()],
+        ], style=table_style, hAlign="LEFT"),
+    ]
+    if summary["weekly"]:
+        rows = [["Week", "Reps", "Calories", "Avg Form", "Minutes"]]
+        rows += [[str(week['week']), _fmt(week['reps']), _fmt(week['calories']),
+                  _fmt(week['avg_score'], 1, "%"), _fmt(week['duration_sec'] / 60)] for week in summary["weekly"]]
+        story += [Spacer(1, 12), Paragraph("Weekly Progress", styles["Heading2"]),
+                  Table(rows, style=table_style, hAlign="LEFT")]
+    if summary["exercises"]:
+        rows = [["Exercise", "Workouts"]] + [[name.title(), str(count)] for name, count in summary["exercises"].items()]
+        story += [Spacer(1, 12), Paragraph("Exercises", styles["Heading2"]),
+                  Table(rows, style=table_style, hAlign="LEFT")]
+    SimpleDocTemplate(out_path, pagesize=A4, title="Workout Report").build(story)
+
+
+# ---------- Worker ----------
+class ReportJob:
+    def __init__(self, kind: str, version_key: str, path: str):
+        self.kind = kind
+        self.version_key = version_key
+        self.path = path
+        self.status = PENDING
+        self.error = None
+        self.seconds = None
+
+    @property
+    def mime(self) -> str:
+        return REPORT_KINDS[self.kind][1]
+
+    @property
+    def file_name(self) -> str:
+        return f"workout_{self.kind}_{datetime.now():%Y%m%d}.{REPORT_KINDS[self.kind][0]}"
+
+    def read(self) -> bytes:
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+class ReportWorker:
+    """Builds reports on a background thread and caches finished files by data version.
+
+    ``request`` never blocks: it returns a job that is already done when the file for
+    the current log version exists, otherwise one that a single worker thread builds.
+    Shared aggregates are computed once per version and reused by every report.
+    """
+
+    def __init__(self, log_path: str = LOG_PATH, out_dir: str = REPORT_DIR):
+        self.log_path = log_path
+        self.out_dir = out_dir
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reports")
+        self._jobs = {}
+        self._summary = (None, None)
+        self._lock = threading.Lock()
+
+    def request(self, kind: str) -> ReportJob:
+        if kind not in REPORT_KINDS:
+            raise ValueError(f"Unknown report kind: {kind}")
+        key = version_key(log_version(self.log_path))
+        with self._lock:
+            job = self._jobs.get((kind, key))
+            if job is not None and job.status != FAILED:
+                return job
+            job = ReportJob(kind, key, os.path.join(self.out_dir, f"{kind}_{key}.{REPORT_KINDS[kind][0]}"))
+            self._jobs[(kind, key)] = job
+            if os.path.exists(job.path):
+                job.status = DONE
+            else:
+                self._executor.submit(self._build, job)
+        return job
+
+    def latest(self, kind: str):
+        """The job for the current data version, if one was requested"""
+        return self._jobs.get((kind, version_key(log_version(self.log_path))))
+
+    def summary(self, key: str) -> dict:
+        cached_key, summary = self._summary
+        if cached_key != key:
+            summary = build_summary(self.log_path)
+            self._summary = (key, summary)
+        return summary
+
+    def _build(self, job: ReportJob):
+        job.status = RUNNING
+        started = time.perf_counter()
+        tmp_path = job.path + ".tmp"
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            # A report is only filed under a version if the log did not change while it was built
+            for _ in range(BUILD_ATTEMPTS):
+                key = version_key(log_version(self.log_path))
+                if job.kind == "csv":
+                    write_csv(self.log_path, tmp_path)
+                elif job.kind == "pdf":
+                    write_pdf(self.summary(key), tmp_path)
+                else:
+                    write_progress(self.summary(key), tmp_path)
+                if version_key(log_version(self.log_path)) == key:
+                    break
+                self._summary = (None, None)
+            else:
+                raise RuntimeError("The session log kept changing while the report was built")
+            if key != job.version_key:
+                self._retarget(job, key)
+            os.replace(tmp_path, job.path)
+            self._prune(job)
+            job.seconds = time.perf_counter() - started
+            job.status = DONE
+        except ImportError as e:
+            job.error = f"Missing dependency: {e.name}"
+            job.status = FAILED
+        except Exception as e:
+            print(f"Error building {job.kind} report: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _retarget(self, job: ReportJob, key: str):
+        """File a job under the newer data version its report was built from"""
+        job.version_key = key
+        job.path = os.path.join(self.out_dir, f"{job.kind}_{key}.{REPORT_KINDS[job.kind][0]}")
+        with self._lock:
+            self._jobs[(job.kind, key)] = job
+
+    def _prune(self, job: ReportJob):
+        """Remove files for older data versions of the same report"""
+        extension = REPORT_KINDS[job.kind][0]
+        for path in glob.glob(os.path.join(self.out_dir, f"{job.kind}_*.{extension}")):
+            if path != job.path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        with self._lock:
+            for key in [key for key in self._jobs if key[0] == job.kind and key[1] != job.version_key]:
+                del self._jobs[key]
+
+
+_workers = {}
+_workers_lock = threading.Lock()
+
+
+def get_report_worker(log_path: str = LOG_PATH) -> ReportWorker:
+    """Process-wide report worker for a log path"""
+    key = os.path.abspath(log_path)
+    with _workers_lock:
+        if key not in _workers:
+            _workers[key] = ReportWorker(log_path)
+        return _workers[key]
@@ -0,0 +1,454 @@
+import math
+from collections import deque
+
+from utils import form_score
+
+# MediaPipe Pose landmark indices
+LANDMARKS = {
+    "l_shoulder": 11, "r_shoulder": 12,
+    "l_elbow": 13, "r_elbow": 14,
+    "l_wrist": 15, "r_wrist": 16,
+    "l_hip": 23, "r_hip": 24,
+    "l_knee": 25, "r_knee": 26,
+    "l_ankle": 27, "r_ankle": 28,
+}
+
+# Joint angles as (a, vertex, c) landmark names, per side
+SIDE_ANGLES = {
+    "elbow": ("shoulder", "elbow", "wrist"),
+    "knee": ("hip", "knee", "ankle"),
+    "back": ("shoulder", "hip", "knee"),
+}
+
+# Angles each exercise's rules read. Side-neutral names ("knee") are taken from one
+# side (left, or the best visible one); "l_"/"r_" names always use that side.
+EXERCISE_ANGLES = {
+    "squat": ["knee", "back"],
+    "pushup": ["elbow", "back"],
+    "curl": ["elbow"],
+    "lunge": ["knee", "back"],
+    "plank": ["back"],
+    "burpee": ["l_knee", "r_knee", "back"],
+}
+# Spoken when a rep is counted
+REP_CUES = {
+    "squat": "Great! Rep {}",
+    "pushup": "Excellent! Rep {}",
+    "curl": "Strong! Rep {}",
+    "lunge": "Powerful! Rep {}",
+    "burpee": "Burpee {} complete!",
+}
+# MediaPipe Pose has 33 landmarks
+LANDMARK_COUNT = 33
+# Landmarks less visible than this give no angle (the cut-off in utils.calculate_angle_3d)
+MIN_CONFIDENCE = 0.2
+# utils.smooth_angle defaults; batch_scoring uses the same values
+SMOOTHING_WINDOW = 5
+SMOOTHING_RECENT_WEIGHT = 0.7
+BURPEE_FEEDBACK = {state: f"Burpee state: {state}" for state in ("stand", "squat", "plank", "squat_up")}
+# Visibility advantage the other side needs before the plan switches to it
+SIDE_SWITCH_MARGIN = 0.15
+
+
+def _angle_landmarks(side: str, joint: str) -> tuple:
+    prefix = "l_" if side == "left" else "r_"
+    return tuple(LANDMARKS[prefix + part] for part in SIDE_ANGLES[joint])
+
+
+class AngleSmoother:
+    """``utils.smooth_angle`` for one angle without allocating per frame.
+
+    The history lists stay at ``window_size`` (+1 briefly) so they never reallocate, and
+    the weighted average walks them by index rather than through iterator objects.
+    Gives the same values as ``smooth_angle`` with the same window and weight.
+    """
+
+    __slots__ = ("angles", "confidences", "window_size", "weight_recent")
+
+    def __init__(self, window_size: int = SMOOTHING_WINDOW, weight_recent: float = SMOOTHING_RECENT_WEIGHT):
+        self.angles = []
+        self.confidences = []
+        self.window_size = window_size
+        self.weight_recent = weight_recent
+
+    def update(self, angle: float, confidence: float = 1.0) -> float:
+        angles, confidences = self.angles, self.confidences
+        angles.append(angle)
+        confidences.append(confidence)
+        if len(angles) > self.window_size:
+            del angles[0]
+            del confidences[0]
+        count = len(angles)
+        if count == 1:
+            return angle
+        total_weight = 0
+        weighted_sum = 0
+        last = count - 1
+        weight_step = self.weight_recent - 1
+        i = 0
+        while i < count:
+            combined_weight = (1 + i / last * weight_step) * confidences[i]
+            weighted_sum += angles[i] * combined_weight
+            total_weight += combined_weight
+            i += 1
+        return weighted_sum / total_weight
+
+
+class JointPlan:
+    """Works out which landmarks, angles and smoothers an exercise needs and computes only those.
+
+    ``compute`` returns smoothed angles keyed by the names in ``EXERCISE_ANGLES``
+    (None when a landmark is not visible enough). With ``best_side`` the side-neutral
+    angles follow whichever body side the camera sees better, with hysteresis.
+    Smoothing state is kept per plan, so several sessions can run side by side.
+
+    Everything a frame needs (the angles dict, coordinate buffers, smoothers) is built
+    here once; ``compute`` fills it in place and returns the same dict every frame.
+    """
+
+    def __init__(self, exercise: str, best_side: bool = False):
+        self.exercise = exercise
+        self.best_side = best_side
+        self.side = "left"
+        names = EXERCISE_ANGLES.get(exercise, ["knee", "elbow", "back"])
+        self.fixed = {}
+        self.sided = []
+        for name in names:
+            if name[:2] in ("l_", "r_"):
+                self.fixed[name] = _angle_landmarks("left" if name[0] == "l" else "right", name[2:])
+            else:
+                self.sided.append(name)
+        self.per_side = {side: {name: _angle_landmarks(side, name) for name in self.sided}
+                         for side in ("left", "right")}
+        sides = ("left", "right") if best_side else ("left",)
+        self.landmarks = sorted({index for angle in self.fixed.values() for index in angle}
+                                | {index for side in sides for angle in self.per_side[side].values() for index in angle})
+        self._side_landmarks = {side: sorted({index for angle in self.per_side[side].values() for index in angle})
+                                for side in ("left", "right")}
+
+        # Smoothing keys match the ones the main loop used: "l_knee", "r_back", "l_knee" (fixed)...
+        self.smoothers = {}
+        self._jobs = {}
+        for side in ("left", "right"):
+            jobs = [(name, indices, self.smoothers.setdefault(f"{side[0]}_{name}", AngleSmoother()))
+                    for name, indices in self.per_side[side].items()]
+            jobs += [(name, indices, self.smoothers.setdefault(name, AngleSmoother()))
+                     for name, indices in self.fixed.items()]
+            self._jobs[side] = jobs
+        self._x = [0.0] * LANDMARK_COUNT
+        self._y = [0.0] * LANDMARK_COUNT
+        self._z = [0.0] * LANDMARK_COUNT
+        self._visibility = [0.0] * LANDMARK_COUNT
+        self.angles = dict.fromkeys(self.angle_names)
+
+    @property
+    def angle_names(self) -> list:
+        return list(self.sided) + list(self.fixed)
+
+    def choose_side(self, landmarks) -> str:
+        """Switch sides only when the other one is clearly more visible"""
+        if self.best_side and self.sided:
+            current = self._mean_visibility(landmarks, self._side_landmarks[self.side])
+            other = "right" if self.side == "left" else "left"
+            if self._mean_visibility(landmarks, self._side_landmarks[other]) > current + SIDE_SWITCH_MARGIN:
+                self.side = other
+        return self.side
+
+    @staticmethod
+    def _mean_visibility(landmarks, indices) -> float:
+        total = 0
+        for index in indices:
+            total += landmarks[index].visibility
+        return total / len(indices)
+
+    def compute(self, landmarks, width: int, height: int) -> dict:
+        """Smoothed angles for this frame from MediaPipe landmarks (the plan's reused ``angles`` dict)"""
+        xs, ys, zs, visibility = self._x, self._y, self._z, self._visibility
+        for index in self.landmarks:
+            landmark = landmarks[index]
+            # Scale z by width for proportional depth
+            xs[index] = landmark.x * width
+            ys[index] = landmark.y * height
+            zs[index] = landmark.z * width
+            visibility[index] = landmark.visibility
+
+        angles = self.angles
+        for name, indices, smoother in self._jobs[self.choose_side(landmarks)]:
+            angles[name] = self._angle(indices, smoother)
+        return angles
+
+    def _angle(self, indices: tuple, smoother: AngleSmoother):
+        """``utils.calculate_angle_3d`` with confidences, then smoothing, on the plan's buffers"""
+        a, b, c = indices
+        visibility = self._visibility
+        conf_a, conf_b, conf_c = visibility[a], visibility[b], visibility[c]
+        if min(conf_a, conf_b, conf_c) < MIN_CONFIDENCE:
+            return None
+        xs, ys, zs = self._x, self._y, self._z
+        ba_x, ba_y, ba_z = xs[a] - xs[b], ys[a] - ys[b], zs[a] - zs[b]
+        bc_x, bc_y, bc_z = xs[c] - xs[b], ys[c] - ys[b], zs[c] - zs[b]
+        dot_product = ba_x * bc_x + ba_y * bc_y + ba_z * bc_z
+        magnitude_ba = math.sqrt(ba_x ** 2 + ba_y ** 2 + ba_z ** 2)
+        magnitude_bc = math.sqrt(bc_x ** 2 + bc_y ** 2 + bc_z ** 2)
+        cosine = max(-1.0, min(1.0, dot_product / (magnitude_ba * magnitude_bc)))
+        return smoother.update(math.degrees(math.acos(cosine)), (conf_a + conf_b + conf_c) / 3)
+
+
+class Landmark:
+    __slots__ = ("x", "y", "z", "visibility")
+
+    def __init__(self, x, y, z, visibility):
+        self.x, self.y, self.z, self.visibility = x, y, z, visibility
+
+
+class LandmarkList:
+    """Read-only view of one (33, 4) frame with the attribute access MediaPipe results have"""
+
+    def __init__(self, frame):
+        self._rows = frame.tolist()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        return Landmark(*self._rows[index])
+
+
+class ExerciseScorer:
+    """Rep counting, form checks and feedback for one exercise session.
+
+    ``update`` scores one frame of landmarks and leaves the results on the instance
+    (``counter``, ``feedback``, ``color``, ``form_score`` and ``rep_angle``, the angle
+    reps are counted on) so the frame loop and offline tools share the same rules.
+    """
+
+    def __init__(self, exercise: str, best_side: bool = False):
+        self.exercise = exercise
+        self.plan = JointPlan(exercise, best_side)
+        self.counter = 0
+        self.direction = 0
+        self.burpee_state = "stand"
+        self.feedback = ""
+        self.color = (0, 255, 0)
+        self.form_score = 100
+        self.rep_angle = None
+
+    def update(self, landmarks, width: int, height: int) -> bool:
+        """Score one frame. Returns True when this frame completed a rep."""
+        angles = self.plan.compute(landmarks, width, height)
+        elbow_ang = angles.get("elbow")
+        knee_ang = angles.get("knee")
+        back_ang = angles.get("back")
+        reps_before = self.counter
+        angle = None
+        knee_angle = None
+
+        # Initialize feedback
+        feedback = ""
+        color = (0, 255, 0)
+        current_form_score = 100
+
+        # Exercise-specific logic
+        if self.exercise == "squat":
+            angle = knee_ang
+            if angle is None:
+                feedback = "Adjusting pose detection..."
+                color = (255, 165, 0)  # Orange
+                current_form_score = 50
+            else:
+                # Improved rep counting with hysteresis for squats
+                if self.direction == 0 and angle < 90:
+                    self.direction = 1  # Down position reached
+                elif self.direction == 1 and angle > 160:
+                    self.counter += 1
+                    self.direction = 0  # Up position reached, rep counted
+
+                # Form checking
+                if angle < 50 or angle > 180:
+                    feedback = "Knee angle incorrect!"
+                    color = (0, 0, 255)
+                    current_form_score = form_score("squat", "bottom_knee", angle)
+                elif back_ang is None:
+                    feedback = "Cannot see your back clearly"
+                    color = (255, 165, 0)  # Orange
+                    current_form_score = 70
+                elif back_ang < 145:
+                    feedback = "Straighten your back!"
+                    color = (0, 0, 255)
+                    current_form_score = form_score("squat", "back", back_ang)
+                else:
+                    feedback = "Perfect squat form!"
+                    current_form_score = 100
+
+        elif self.exercise == "pushup":
+            angle = elbow_ang
+            if angle is None:
+                feedback = "Adjusting pose detection..."
+                color = (255, 165, 0)  # Orange
+                current_form_score = 50
+            else:
+                # Improved rep counting with hysteresis
+                # Only count a rep when angle goes below 80 (down) and then above 160 (up)
+                if self.direction == 0 and angle < 80:
+                    self.direction = 1  # Down position reached
+                elif self.direction == 1 and angle > 160:
+                    self.counter += 1
+                    self.direction = 0  # Up position reached, rep counted
+
+                if angle < 60:
+                    feedback = "Too low on push-up!"
+                    color = (0, 0, 255)
+                    current_form_score = form_score("pushup", "down_elbow", angle)
+                elif angle > 180:
+                    feedback = "Don't lock elbows!"
+                    color = (0, 0, 255)
+                    current_form_score = form_score("pushup", "up_elbow", angle)
+                elif back_ang is None:
+                    feedback = "Cannot see your back clearly"
+                    color = (255, 165, 0)  # Orange
+                    current_form_score = 70
+                else:
+                    feedback = "Perfect push-up form!"
+                    current_form_score = 100
+
+        elif self.exercise == "curl":
+            angle = elbow_ang
+            if angle is None:
+                feedback = "Adjusting pose detection..."
+                color = (255, 165, 0)  # Orange
+                current_form_score = 50
+            else:
+                # Improved rep counting with hysteresis for curls
+                if self.direction == 0 and angle < 60:
+                    self.direction = 1  # Curl up position reached
+                elif self.direction == 1 and angle > 150:
+                    self.counter += 1
+                    self.direction = 0  # Curl down position reached, rep counted
+
+                if angle > 160:
+                    feedback = "Fully extended arm!"
+                    color = (0, 0, 255)
+                    current_form_score = form_score("curl", "down_elbow", angle)
+                elif angle < 40:
+                    feedback = "Excellent curl!"
+                    current_form_score = 100
+                else:
+                    feedback = "Keep curling!"
+                    current_form_score = form_score("curl", "up_elbow", angle)
+
+        elif self.exercise == "lunge":
+            angle = knee_ang
+            if angle is None:
+                feedback = "Adjusting pose detection..."
+                color = (255, 165, 0)  # Orange
+                current_form_score = 50
+            else:
+                # Improved rep counting with hysteresis for lunges
+                if self.direction == 0 and angle < 90:
+                    self.direction = 1  # Down position reached
+                elif self.direction == 1 and angle > 150:
+                    self.counter += 1
+                    self.direction = 0  # Up position reached, rep counted
+
+                if angle < 60 or angle > 170:
+                    feedback = "Incorrect lunge form!"
+                    color = (0, 0, 255)
+                    current_form_score = form_score("lunge", "bottom_knee", angle)
+                elif back_ang is None:
+                    feedback = "Cannot see your back clearly"
+                    color = (255, 165, 0)  # Orange
+                    current_form_score = 70
+                else:
+                    feedback = "Nice lunge form!"
+                    current_form_score = 100
+
+        elif self.exercise == "plank":
+            feedback = "Hold steady!"
+            if back_ang is None:
+                feedback = "Cannot see your back clearly"
+                color = (255, 165, 0)  # Orange
+                current_form_score = 70
+            elif back_ang < 145 or back_ang > 165:
+                feedback = "Keep your back straight!"
+                color = (0, 0, 255)
+                current_form_score = form_score("plank", "back", back_ang)
+            else:
+                current_form_score = 100
+
+        elif self.exercise == "burpee":
+            # Burpee has multiple stages: stand > squat > plank > squat > jump
+            l_kn_ang, r_kn_ang = angles["l_knee"], angles["r_knee"]
+            if l_kn_ang is None or r_kn_ang is None:
+                knee_angle = None
+                feedback = "Adjusting pose detection..."
+                color = (255, 165, 0)  # Orange
+                current_form_score = 50
+            else:
+                knee_angle = min(l_kn_ang, r_kn_ang)
+                
+                # State machine for burpee
+                if knee_angle is not None and back_ang is not None:
+                    if self.burpee_state == "stand" and knee_angle < 100:
+                        self.burpee_state = "squat"
+                    elif self.burpee_state == "squat" and back_ang < 140:  # Transitioned to plank
+                        self.burpee_state = "plank"
+                    elif self.burpee_state == "plank" and back_ang > 160 and knee_angle < 100:  # Back to squat
+                        self.burpee_state = "squat_up"
+                    elif self.burpee_state == "squat_up" and knee_angle > 170:  # Standing/jumping
+                        self.burpee_state = "stand"
+                        self.counter += 1
+                
+                feedback = BURPEE_FEEDBACK[self.burpee_state]
+                current_form_score = 100  # Simplified scoring for burpees
+
+        self.feedback = feedback
+        self.color = color
+        self.form_score = current_form_score
+        self.rep_angle = knee_angle if self.exercise == "burpee" else angle
+        return self.counter > reps_before
+
+
+class ScoreTracker:
+    """Per-frame session bookkeeping shared by the frame loop and the session server.
+
+    Keeps running form-score totals (whole session and a recent window) instead of
+    growing lists, and throttles spoken cues: a new cue is released at most once per
+    ``cooldown`` frames and "Perfect" feedback is never spoken.
+    """
+
+    def __init__(self, recent: int = 90, cooldown: int = 30):
+        self.frames = 0
+        self.total = 0
+        self.recent = deque(maxlen=recent)
+        self.recent_total = 0
+        self.cooldown = cooldown
+        self.cooldown_left = 0
+        self.last_feedback = ""
+
+    def add(self, form_score):
+        self.frames += 1
+        self.total += form_score
+        if len(self.recent) == self.recent.maxlen:
+            self.recent_total -= self.recent[0]
+        self.recent.append(form_score)
+        self.recent_total += form_score
+
+    @property
+    def average(self) -> float:
+        return self.total / self.frames if self.frames else 0.0
+
+    @property
+    def recent_average(self) -> float:
+        return self.recent_total / len(self.recent) if self.recent else 0.0
+
+    def cue(self, feedback: str):
+        """The feedback to speak this frame, or None"""
+        spoken = None
+        if feedback != self.last_feedback and "Perfect" not in feedback and feedback and self.cooldown_left <= 0:
+            spoken = self.last_feedback = feedback
+            self.cooldown_left = self.cooldown
+        elif "Perfect" in feedback:
+            self.last_feedback = feedback
+        if self.cooldown_left > 0:
+            self.cooldown_left -= 1
+        return spoken
@@ -0,0 +1,387 @@
+import argparse
+import asyncio
+import json
+import os
+import struct
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from landmark_format import DEFAULT_KEYFRAME_INTERVAL, LandmarkDecoder, LandmarkEncoder, LandmarkFormat, read_landmarks
+from log_store import get_writer
+from metrics import REGISTRY
+from scoring import EXERCISE_ANGLES, REP_CUES, ExerciseScorer, LandmarkList, ScoreTracker
+from timeline import ScoreTimeline, save_timeline
+from utils import estimate_calories
+
+HOST = "127.0.0.1"
+PORT = 8765
+LOG_PATH = "logs/sessions.csv"
+# Every message is a 4-byte big-endian length, a one-byte kind and the payload
+HEADER = struct.Struct(">I")
+MSG_JSON = b"J"
+MSG_LANDMARKS = b"L"
+# Landmark payloads are single landmark_format records; clients name their format in the hello
+WIRE_FORMAT = LandmarkFormat(float16=True, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL)
+MAX_MESSAGE_BYTES = 64 * 1024
+HELLO_TIMEOUT = 10.0
+MAX_USER_CHARS = 64
+MAX_WEIGHT_KG = 500
+IDLE_TIMEOUT = 30.0
+# Queued events before score updates are dropped, and how long a client may leave
+# sent events unread before it is disconnected
+OUTBOX_LIMIT = 64
+SLOW_CLIENT_TIMEOUT = 5.0
+SCORE_EVERY = 15
+FEEDBACK_COOLDOWN = 30  # frames, as in the desktop loop
+
+sessions_active = REGISTRY.gauge("server_sessions_active", "Connected client sessions")
+sessions_total = REGISTRY.counter("server_sessions_total", "Client sessions accepted")
+frames_scored = REGISTRY.counter("server_frames_total", "Landmark frames scored for clients")
+score_seconds = REGISTRY.histogram("server_scoring_seconds", "Scoring time per client frame")
+events_dropped = REGISTRY.counter("server_events_dropped_total", "Score updates dropped for clients not keeping up")
+slow_clients = REGISTRY.counter("server_slow_clients_total", "Clients disconnected for not reading their events")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+# ---------- Framing ----------
+def encode(kind: bytes, payload: bytes) -> bytes:
+    return HEADER.pack(len(payload) + 1) + kind + payload
+
+
+def encode_json(message: dict) -> bytes:
+    return encode(MSG_JSON, json.dumps(message, separators=(",", ":")).encode("utf-8"))
+
+
+def _json_object(payload: bytes) -> dict:
+    message = json.loads(payload)
+    if not isinstance(message, dict):
+        raise ProtocolError("JSON messages must be objects")
+    return message
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple:
+    """Next (kind, payload); raises asyncio.IncompleteReadError at end of stream"""
+    (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if not 1 <= length <= MAX_MESSAGE_BYTES:
+        raise ProtocolError(f"Message of {length} bytes")
+    data = await reader.readexactly(length)
+    return data[:1], data[1:]
+
+
+# ---------- Server ----------
+class ClientSession:
+    """One connected client: scores its landmark frames and pushes events back.
+
+    Events go through a bounded outbox drained by a writer task, so a client that
+    reads slowly never blocks scoring: score updates are dropped once the outbox is
+    full, and a client that stops reading for ``SLOW_CLIENT_TIMEOUT`` is disconnected.
+    Rep, cue and summary events are never dropped.
+    """
+
+    def __init__(self, reader, writer, log_path: str = LOG_PATH):
+        self.reader = reader
+        self.writer = writer
+        self.log_path = log_path
+        self.session_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self.outbox = deque()
+        self._pending = asyncio.Event()
+        self._closing = False
+        self.scorer = None
+        self.tracker = ScoreTracker(cooldown=FEEDBACK_COOLDOWN)
+        self.started = None
+        self.last_frame = None
+        self.last_message = time.monotonic()
+
+    def send(self, event: dict, droppable: bool = False):
+        if droppable and len(self.outbox) >= OUTBOX_LIMIT:
+            events_dropped.inc()
+            return
+        self.outbox.append(encode_json(event))
+        self._pending.set()
+
+    async def _write_events(self):
+        while True:
+            await self._pending.wait()
+            self._pending.clear()
+            while self.outbox:
+                self.writer.write(self.outbox.popleft())
+            try:
+                await asyncio.wait_for(self.writer.drain(), SLOW_CLIENT_TIMEOUT)
+            except asyncio.TimeoutError:
+                slow_clients.inc()
+                self.writer.transport.abort()
+                return
+            if self._closing and not self.outbox:
+                return
+
+    async def run(self):
+        sessions_total.inc()
+        sessions_active.set(sessions_active.value + 1)
+        writer_task = asyncio.create_task(self._write_events())
+        watchdog = asyncio.create_task(self._watch_idle())
+        try:
+            hello = await self._hello()
+            self.send({"type": "ready", "session_id": self.session_id})
+            while True:
+                kind, payload = await read_message(self.reader)
+                self.last_message = time.monotonic()
+                if kind == MSG_LANDMARKS:
+                    self.score(*self.decoder.decode(payload))
+                elif _json_object(payload).get("type") == "bye":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.TimeoutError):
+            pass
+        except (ProtocolError, ValueError) as e:
+            self.send({"type": "error", "message": str(e)})
+        finally:
+            watchdog.cancel()
+            if self.scorer is not None and self.started is not None:
+                try:
+                    row = await self._finish(hello)
+                    self.send({"type": "summary", **row})
+                except Exception as e:
+                    # Still close the connection and release the session below
+                    print(f"Error saving session {self.session_id}: {e}")
+                    self.send({"type": "error", "message": "Session could not be saved"})
+            self._closing = True
+            self._pending.set()
+            try:
+                await asyncio.wait_for(writer_task, SLOW_CLIENT_TIMEOUT)
+            except (asyncio.TimeoutError, ConnectionError):
+                pass
+            self.writer.close()
+            sessions_active.set(sessions_active.value - 1)
+
+    async def _watch_idle(self):
+        """Disconnect clients that send nothing for IDLE_TIMEOUT (cheaper than a timeout per read)"""
+        while True:
+            await asyncio.sleep(IDLE_TIMEOUT / 4)
+            if time.monotonic() - self.last_message > IDLE_TIMEOUT:
+                self.writer.transport.abort()
+                return
+
+    async def _hello(self) -> dict:
+        kind, payload = await asyncio.wait_for(read_message(self.reader), HELLO_TIMEOUT)
+        hello = _json_object(payload) if kind == MSG_JSON else {}
+        if hello.get("type") != "hello" or not isinstance(hello.get("exercise"), str) \
+                or hello["exercise"] not in EXERCISE_ANGLES:
+            raise ProtocolError("Expected hello with a supported exercise")
+        self.scorer = ExerciseScorer(hello["exercise"], best_side=bool(hello.get("best_side")))
+        self.timeline = ScoreTimeline(self.scorer.plan.angle_names)
+        fmt = hello.get("format", {})
+        if not isinstance(fmt, dict):
+            raise ProtocolError("Hello format must be an object")
+        try:
+            self.width, self.height = int(hello.get("width", 1280)), int(hello.get("height", 720))
+            keyframe_interval = int(fmt.get("keyframe_interval", 1))
+        except (TypeError, ValueError):
+            raise ProtocolError("Hello width, height and keyframe_interval must be integers")
+        # Both end up in the session log
+        user = hello.get("user", "guest")
+        if not isinstance(user, str) or not 0 < len(user) <= MAX_USER_CHARS or not user.isprintable():
+            raise ProtocolError(f"Hello user must be a printable string of at most {MAX_USER_CHARS} characters")
+        weight_kg = hello.get("weight_kg", 70)
+        if isinstance(weight_kg, bool) or not isinstance(weight_kg, (int, float)) or not 0 < weight_kg <= MAX_WEIGHT_KG:
+            raise ProtocolError("Hello weight_kg must be a positive number of kilograms")
+        hello["user"], hello["weight_kg"] = user, float(weight_kg)
+        self.decoder = LandmarkDecoder(LandmarkFormat(bool(fmt.get("float16")), keyframe_interval))
+        return hello
+
+    def score(self, seq: int, frame: np.ndarray):
+        started = time.perf_counter()
+        scorer = self.scorer
+        if self.started is None:
+            self.started = time.time()
+        self.last_frame = time.time()
+        rep_completed = scorer.update(LandmarkList(frame), self.width, self.height)
+        tracker = self.tracker
+        tracker.add(scorer.form_score)
+        elapsed = self.last_frame - self.started
+        self.timeline.add(elapsed, scorer.form_score, scorer.plan.angles)
+        if rep_completed:
+            self.timeline.rep(elapsed)
+            self.send({"type": "rep", "frame": seq, "count": scorer.counter,
+                       "cue": REP_CUES[scorer.exercise].format(scorer.counter)})
+
+        # Same cue throttling as the desktop loop
+        cue = tracker.cue(scorer.feedback)
+        if cue:
+            self.send({"type": "cue", "frame": seq, "text": cue, "color": list(scorer.color)})
+
+        if tracker.frames % SCORE_EVERY == 0:
+            self.send({"type": "score", "frame": seq, "reps": scorer.counter, "form_score": scorer.form_score,
+                       "avg_score": round(tracker.average, 1)}, droppable=True)
+        frames_scored.inc()
+        score_seconds.observe(time.perf_counter() - started)
+
+    async def _finish(self, hello: dict) -> dict:
+        """Write the session row and its score timeline, off the event loop"""
+        duration = self.last_frame - self.started
+        row = {
+            "timestamp": datetime.now().isoformat(),
+            "user": hello["user"],
+            "exercise": self.scorer.exercise,
+            "reps": self.scorer.counter,
+            "avg_score": round(self.tracker.average, 1),
+            "duration_sec": round(duration, 1),
+            "calories": round(estimate_calories(self.scorer.exercise, duration, hello["weight_kg"]), 1),
+        }
+        # Sessions ending together share one group commit; the summary goes out once the row is durable
+        await asyncio.wrap_future(get_writer(self.log_path).submit(row))
+        meta = {key: row[key] for key in ("timestamp", "user", "exercise", "reps", "avg_score")}
+        await asyncio.get_running_loop().run_in_executor(None, save_timeline, self.session_id, self.timeline, meta)
+        return row
+
+
+async def serve(host: str = HOST, port: int = PORT, log_path: str = LOG_PATH):
+    async def handle(reader, writer):
+        await ClientSession(reader, writer, log_path).run()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"Session server listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+# ---------- Replay Client ----------
+async def replay_session(frames, exercise: str, user: str = "replay", host: str = HOST, port: int = PORT,
+                         fps: float = 30.0, speed: float = 1.0, fmt: LandmarkFormat = WIRE_FORMAT) -> dict:
+    """Stream one recorded session to the server as a thin client would.
+
+    ``speed`` 1 sends frames in real time, 0 as fast as the connection allows.
+    Returns the events received and the latency of each rep event.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode_json({"type": "hello", "user": user, "exercise": exercise, "width": 1280, "height": 720,
+                              "format": fmt.to_dict()}))
+    encoder = LandmarkEncoder(fmt)
+    sent_at = {}
+    events = []
+    latencies = []
+
+    async def receive():
+        try:
+            while True:
+                kind, payload = await read_message(reader)
+                event = json.loads(payload)
+                events.append(event)
+                if event["type"] == "rep" and event["frame"] in sent_at:
+                    latencies.append(time.perf_counter() - sent_at[event["frame"]])
+                if event["type"] in ("summary", "error"):
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+
+    receiver = asyncio.create_task(receive())
+    loop = asyncio.get_running_loop()
+    interval = 1.0 / (fps * speed) if speed > 0 else 0.0
+    start = loop.time()
+    try:
+        for seq, frame in enumerate(frames):
+            sent_at[seq] = time.perf_counter()
+            writer.write(encode(MSG_LANDMARKS, encoder.encode(seq, frame)))
+            await writer.drain()
+            if interval:
+                await asyncio.sleep(max(0.0, start + (seq + 1) * interval - loop.time()))
+            elif seq % 32 == 0:
+                await asyncio.sleep(0)
+        writer.write(encode_json({"type": "bye"}))
+        await writer.drain()
+    except ConnectionError:
+        pass
+    await receiver
+    writer.close()
+    summary = next((event for event in events if event["type"] == "summary"), None)
+    return {"events": events, "latencies": latencies, "summary": summary}
+
+
+def load_recording(path: str) -> tuple:
+    """(frames, exercise, ground-truth reps or None) from a .lmk or .npy recording and its .json sidecar"""
+    frames = read_landmarks(path)[0] if path.endswith(".lmk") else np.load(path)
+    info = {}
+    sidecar = path.rsplit(".", 1)[0] + ".json"
+    if os.path.exists(sidecar):
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    return frames, info.get("exercise", "squat"), info.get("reps")
+
+
+async def load_test(recordings: list, clients: int, host: str = HOST, port: int = PORT,
+                    speed: float = 1.0, stagger: float = 1.0) -> dict:
+    """Replay ``recordings`` round-robin over ``clients`` concurrent connections.
+
+    Recordings are (frames, exercise, expected reps) tuples; connections start spread over ``stagger`` seconds.
+    """
+    async def client(i):
+        frames, exercise, expected = recordings[i % len(recordings)]
+        await asyncio.sleep(stagger * i / clients)
+        result = await replay_session(frames, exercise, f"load_{i}", host, port, speed=speed)
+        result["expected"] = expected
+        result["frames"] = len(frames)
+        return result
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(client(i) for i in range(clients)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    completed = [result for result in results if isinstance(result, dict) and result["summary"]]
+    checked = [result for result in completed if result["expected"] is not None]
+    latencies = np.array([latency for result in completed for latency in result["latencies"]])
+    return {
+        "clients": clients,
+        "completed": len(completed),
+        "failed": clients - len(completed),
+        "frames_per_second": sum(result["frames"] for result in completed) / elapsed,
+        "exact": (sum(result["summary"]["reps"] == result["expected"] for result in checked) / len(checked)
+                  if checked else None),
+        "rep_latency_ms": {q: float(np.percentile(latencies, q)) * 1000 for q in (50, 99)} if len(latencies) else {},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scoring server for thin clients that send pose landmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="Accept landmark streams over TCP")
+    serve_parser.add_argument("--log-path", default=LOG_PATH, help="Session log the rows are appended to")
+    replay_parser = commands.add_parser("replay", help="Replay recorded sessions over many connections")
+    replay_parser.add_argument("recordings", nargs="*", help=".lmk or .npy landmark recordings (with .json sidecars)")
+    replay_parser.add_argument("--clients", type=int, default=1)
+    replay_parser.add_argument("--synthetic", type=int, default=0,
+                               help="Also replay this many generated sessions (synthetic.py)")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="1 = real time, 0 = as fast as possible")
+    replay_parser.add_argument("--stagger", type=float, default=1.0, help="Seconds over which clients connect")
+    for sub in (serve_parser, replay_parser):
+        sub.add_argument("--host", default=HOST)
+        sub.add_argument("--port", type=int, default=PORT)
+    cli_args = parser.parse_args()
+
+    if cli_args.command == "serve":
+        try:
+            asyncio.run(serve(cli_args.host, cli_args.port, cli_args.log_path))
+        except KeyboardInterrupt:
+            pass
+    else:
+        recordings = [load_recording(path) for path in cli_args.recordings]
+        if cli_args.synthetic:
+            from synthetic import COUNTED_EXERCISES, generate
+            for i in range(cli_args.synthetic):
+                exercise = COUNTED_EXERCISES[i % len(COUNTED_EXERCISES)]
+                frames, info = generate(exercise, reps=8, partial_reps=1, seed=i)
+                recordings.append((frames, exercise, info["reps"]))
+        if not recordings:
+            parser.error("no recordings given (pass .npy files or --synthetic N)")
+        result = asyncio.run(load_test(recordings, max(cli_args.clients, 1), cli_args.host, cli_args.port,
+                                       cli_args.speed, cli_args.stagger))
+        latency = result["rep_latency_ms"]
+        print(f"{result['completed']}/{result['clients']} sessions completed, "
+              f"{result['frames_per_second']:.0f} frames/s scored")
+        if result["exact"] is not None:
+            print(f"Exact rep counts: {result['exact']:.1%}")
+        if latency:
+            print(f"Rep event latency: p50 {latency[50]:.1f} ms, p99 {latency[99]:.1f} ms")
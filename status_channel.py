@@ -0,0 +1,105 @@
+import os
+import struct
+import time
+
+from frame_bus import attach_shared_memory, create_segment
+
+# ---------- Layout ----------
+# One fixed-layout record in shared memory, guarded by a sequence counter (seqlock):
+# the writer makes the counter odd while it updates the record and even when done,
+# so readers never see a half-written record and the writer never waits for them.
+STATUS_CHANNEL_NAME = "fitmate_status"
+STATUS_VERSION = 1
+
+STATE_IDLE = 0
+STATE_RUNNING = 1
+STATE_RESTING = 2
+STATE_FINISHED = 3
+STATE_NAMES = {STATE_IDLE: "idle", STATE_RUNNING: "running",
+               STATE_RESTING: "resting", STATE_FINISHED: "finished"}
+
+_SEQ = struct.Struct("<Q")
+_RECORD = struct.Struct("<HHi16siiiiffffd96s")
+_RECORD_FIELDS = ["version", "state", "pid", "exercise", "reps", "target_reps", "set",
+                  "target_sets", "form_score", "fps", "rest_remaining", "elapsed",
+                  "updated_at", "cue"]
+STATUS_SIZE = _SEQ.size + _RECORD.size
+
+
+def _owner_pid(shm) -> int:
+    # pid follows the version and state fields of the record
+    return struct.unpack_from("<i", shm.buf, _SEQ.size + 4)[0]
+
+
+def _encode(text: str, size: int) -> bytes:
+    data = (text or "").encode("utf-8")[:size]
+    # Do not cut a multi-byte character in half
+    return data.decode("utf-8", "ignore").encode("utf-8")
+
+
+class StatusWriter:
+    """Publishes live workout status for the dashboard"""
+
+    def __init__(self, name: str = STATUS_CHANNEL_NAME, exercise: str = ""):
+        self.shm = create_segment(name, STATUS_SIZE, _owner_pid)
+        self.exercise = exercise
+        self.seq = 0
+        self.started = time.time()
+        self.publish(STATE_IDLE)
+
+    def publish(self, state: int, reps: int = 0, target_reps: int = 0, current_set: int = 0,
+                target_sets: int = 0, form_score: float = 0.0, fps: float = 0.0,
+                rest_remaining: float = 0.0, cue: str = ""):
+        now = time.time()
+        record = _RECORD.pack(STATUS_VERSION, state, os.getpid(), _encode(self.exercise, 16),
+                              reps, target_reps, current_set, target_sets,
+                              form_score, fps, max(0.0, rest_remaining), now - self.started,
+                              now, _encode(cue, 96))
+        buf = self.shm.buf
+        self.seq += 1
+        _SEQ.pack_into(buf, 0, self.seq * 2 - 1)
+        buf[_SEQ.size:STATUS_SIZE] = record
+        _SEQ.pack_into(buf, 0, self.seq * 2)
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+
+class StatusReader:
+    """Polls the live workout status. Each read is a few struct unpacks, no file I/O."""
+
+    def __init__(self, name: str = STATUS_CHANNEL_NAME):
+        self.shm = attach_shared_memory(name)
+
+    def read(self, retries: int = 5):
+        """Return the latest status as a dict, or None if no consistent record could be read"""
+        buf = self.shm.buf
+        for _ in range(retries):
+            before = _SEQ.unpack_from(buf, 0)[0]
+            if before % 2:
+                continue
+            values = _RECORD.unpack_from(buf, _SEQ.size)
+            if _SEQ.unpack_from(buf, 0)[0] != before:
+                continue
+            status = dict(zip(_RECORD_FIELDS, values))
+            if status["version"] != STATUS_VERSION:
+                return None
+            status["exercise"] = status["exercise"].rstrip(b"\0").decode("utf-8", "ignore")
+            status["cue"] = status["cue"].rstrip(b"\0").decode("utf-8", "ignore")
+            status["state_name"] = STATE_NAMES.get(status["state"], "unknown")
+            status["age"] = time.time() - status["updated_at"]
+            return status
+        return None
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.shm.close()
+        self.shm = None
@@ -0,0 +1,428 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from batch_scoring import BatchScorer
+from scoring import ExerciseScorer, LandmarkList
+
+# Seconds per rep by default, and the exercises whose reps are counted
+DEFAULT_TEMPO = {"squat": 2.5, "pushup": 2.0, "curl": 2.0, "lunge": 2.5, "plank": 3.0, "burpee": 4.0}
+COUNTED_EXERCISES = ["squat", "pushup", "curl", "lunge", "burpee"]
+# Depth of a partial rep (fraction of the full range) that a counter should ignore
+PARTIAL_DEPTH = 0.35
+# Dropouts last this many frames; z is noisier than x/y, as it is with MediaPipe
+DROPOUT_BURST = 4
+Z_NOISE_SCALE = 2.0
+# Body height as a fraction of the frame height, and where the hips sit in the frame
+BODY_SCALE = 0.42
+HIP_POSITION = (0.5, 0.55)
+# Visibility of the near side, and how much of it the far side loses in profile
+VISIBILITY_NEAR = 0.95
+FAR_SIDE_OCCLUSION = 0.3
+
+# ---------- Body Model ----------
+# Sagittal-plane segment directions in degrees (0 = facing direction, 90 = up).
+# Legs point from ankle to knee (shin) and knee to hip (thigh), arms from shoulder down.
+SEGMENTS = ["shin_l", "thigh_l", "shin_r", "thigh_r", "trunk", "arm", "forearm"]
+SEGMENT_LENGTHS = {"shin": 0.24, "thigh": 0.24, "trunk": 0.30, "arm": 0.16, "forearm": 0.14}
+# Half the body width for each joint; the left side is nearer the camera (negative z)
+HALF_WIDTH = {"shoulder": 0.10, "hip": 0.08}
+
+
+def _pose(**directions) -> tuple:
+    stand = {"shin_l": 90, "thigh_l": 90, "shin_r": 90, "thigh_r": 90, "trunk": 90, "arm": -90, "forearm": -90}
+    stand.update(directions)
+    return tuple(float(stand[name]) for name in SEGMENTS)
+
+
+STAND = _pose()
+PLANK = _pose(shin_l=12, thigh_l=12, shin_r=12, thigh_r=12, trunk=12)
+CROUCH = _pose(shin_l=55, thigh_l=165, shin_r=55, thigh_r=165, trunk=60, arm=-80, forearm=-80)
+# Knees already bent while the back is still straight, on the way back from the plank
+TUCK = _pose(shin_l=30, thigh_l=120, shin_r=30, thigh_r=120, trunk=115, arm=-80, forearm=-80)
+
+# (rep phase, pose) keyframes; the first one is the rest pose
+KEYFRAMES = {
+    # knee 70 at the bottom
+    "squat": [(0.0, STAND), (0.5, _pose(shin_l=60, thigh_l=170, shin_r=60, thigh_r=170, trunk=75, arm=0, forearm=0)),
+              (1.0, STAND)],
+    # elbow 65 at the bottom
+    "pushup": [(0.0, PLANK), (0.5, _pose(shin_l=4, thigh_l=4, shin_r=4, thigh_r=4, trunk=4, arm=-150, forearm=-35)),
+               (1.0, PLANK)],
+    # elbow 40 at the top of the curl
+    "curl": [(0.0, STAND), (0.5, _pose(forearm=50)), (1.0, STAND)],
+    # front (left) knee 75, rear knee dropping behind
+    "lunge": [(0.0, STAND), (0.5, _pose(shin_l=75, thigh_l=180, shin_r=10, thigh_r=70)), (1.0, STAND)],
+    # hips sagging slightly
+    "plank": [(0.0, PLANK), (0.5, _pose(shin_l=6, thigh_l=6, shin_r=6, thigh_r=6, trunk=18)), (1.0, PLANK)],
+    "burpee": [(0.0, STAND), (0.2, CROUCH), (0.4, PLANK), (0.55, PLANK), (0.65, TUCK), (0.8, CROUCH), (1.0, STAND)],
+}
+
+# MediaPipe Pose indices of left/right pairs (left first)
+LEFT_RIGHT = [(1, 4), (2, 5), (3, 6), (7, 8), (9, 10), (11, 12), (13, 14), (15, 16), (17, 18), (19, 20),
+              (21, 22), (23, 24), (25, 26), (27, 28), (29, 30), (31, 32)]
+LEFT_LANDMARKS = [left for left, _ in LEFT_RIGHT]
+RIGHT_LANDMARKS = [right for _, right in LEFT_RIGHT]
+
+
+def _unit(degrees: np.ndarray) -> np.ndarray:
+    radians = np.radians(degrees)
+    return np.stack([np.cos(radians), np.sin(radians)], axis=-1)
+
+
+def pose_directions(exercise: str, phase, depth) -> np.ndarray:
+    """Segment directions (N, len(SEGMENTS)) at rep ``phase`` 0..1, scaled by ``depth``"""
+    times = np.array([time for time, _ in KEYFRAMES[exercise]])
+    poses = np.array([pose for _, pose in KEYFRAMES[exercise]])
+    phase = np.clip(np.asarray(phase, dtype=np.float64), 0.0, 1.0)
+    index = np.clip(np.searchsorted(times, phase, side="right") - 1, 0, len(times) - 2)
+    fraction = (phase - times[index]) / (times[index + 1] - times[index])
+    ease = ((1 - np.cos(np.pi * np.clip(fraction, 0.0, 1.0))) / 2)[:, None]
+    directions = poses[index] + ease * (poses[index + 1] - poses[index])
+    return poses[0] + np.asarray(depth, dtype=np.float64).reshape(-1, 1) * (directions - poses[0])
+
+
+def body_points(directions: np.ndarray) -> np.ndarray:
+    """Forward kinematics: (N, 33, 3) body coordinates (x forward, y up, z left-negative), hips at 0"""
+    n = len(directions)
+    unit = {name: _unit(directions[:, i]) for i, name in enumerate(SEGMENTS)}
+    lengths = SEGMENT_LENGTHS
+    knee_l = lengths["shin"] * unit["shin_l"]
+    hip = knee_l + lengths["thigh"] * unit["thigh_l"]
+    knee_r = hip - lengths["thigh"] * unit["thigh_r"]
+    ankle_r = knee_r - lengths["shin"] * unit["shin_r"]
+    shoulder = hip + lengths["trunk"] * unit["trunk"]
+    elbow = shoulder + lengths["arm"] * unit["arm"]
+    wrist = elbow + lengths["forearm"] * unit["forearm"]
+    # Facing direction is the trunk turned back by 90 degrees
+    trunk, facing = unit["trunk"], unit["trunk"] @ np.array([[0.0, -1.0], [1.0, 0.0]])
+    head = shoulder + 0.10 * trunk
+    nose = head + 0.04 * facing
+    hand = wrist + 0.04 * unit["forearm"]
+    foot = np.array([0.08, -0.03])
+
+    points = np.zeros((n, 33, 3))
+    planar = {
+        0: nose, 7: head, 8: head,
+        11: shoulder, 12: shoulder, 13: elbow, 14: elbow, 15: wrist, 16: wrist,
+        23: hip, 24: hip, 25: knee_l, 26: knee_r, 27: np.zeros((n, 2)), 28: ankle_r,
+    }
+    for eye in (1, 2, 3, 4, 5, 6):
+        planar[eye] = nose + 0.02 * trunk - 0.01 * facing
+    for mouth in (9, 10):
+        planar[mouth] = nose - 0.02 * trunk
+    for finger in range(17, 23):
+        planar[finger] = hand
+    planar[29], planar[30] = planar[27] - 0.5 * foot, ankle_r - 0.5 * foot
+    planar[31], planar[32] = planar[27] + foot, ankle_r + foot
+    for index, xy in planar.items():
+        points[:, index, :2] = xy
+    points[:, :, :2] -= hip[:, None, :]
+
+    widths = {0: 0.0, 7: 0.07, 8: 0.07, 9: 0.02, 10: 0.02, 23: HALF_WIDTH["hip"], 24: HALF_WIDTH["hip"]}
+    for eye in (1, 2, 3, 4, 5, 6):
+        widths[eye] = 0.01 + 0.01 * (eye % 3)
+    for index in list(range(11, 23)):
+        widths[index] = HALF_WIDTH["shoulder"]
+    for index in range(25, 33):
+        widths[index] = HALF_WIDTH["hip"]
+    for index, width in widths.items():
+        points[:, index, 2] = -width if index in LEFT_LANDMARKS else width
+    return points
+
+
+def render(exercise: str, phase, depth, camera_yaw, noise: float, dropout: float, rng,
+           aspect: float = 16 / 9, dropout_mask=None) -> np.ndarray:
+    """MediaPipe-style (N, 33, 4) float32 [x, y, z, visibility] for N poses of one exercise.
+
+    ``camera_yaw`` (degrees, scalar or per pose) turns the body away from a side-on
+    view; x/y are normalized to the frame and z uses the x scale, hips at depth 0.
+    """
+    points = body_points(pose_directions(exercise, phase, depth))
+    n = len(points)
+    yaw = np.radians(np.broadcast_to(np.asarray(camera_yaw, dtype=np.float64), (n,)))[:, None]
+    x, z = points[..., 0], points[..., 2]
+    rotated_x = x * np.cos(yaw) + z * np.sin(yaw)
+    rotated_z = -x * np.sin(yaw) + z * np.cos(yaw)
+
+    frames = np.empty((n, 33, 4), dtype=np.float32)
+    frames[..., 0] = HIP_POSITION[0] + rotated_x * BODY_SCALE / aspect
+    frames[..., 1] = HIP_POSITION[1] - points[..., 1] * BODY_SCALE
+    frames[..., 2] = rotated_z * BODY_SCALE / aspect
+
+    visibility = np.full((n, 33), VISIBILITY_NEAR)
+    visibility[:, RIGHT_LANDMARKS] -= FAR_SIDE_OCCLUSION * np.abs(np.cos(yaw))
+    visibility += rng.uniform(-0.03, 0.03, size=(n, 33))
+    scale = np.full((n, 33, 1), noise)
+    if dropout_mask is None and dropout > 0:
+        dropout_mask = np.repeat(rng.random((n // DROPOUT_BURST + 1, 33)) < dropout, DROPOUT_BURST, axis=0)[:n]
+    if dropout_mask is not None:
+        # A dropped landmark is reported with low visibility and a poor position guess
+        visibility[dropout_mask] = rng.uniform(0.0, 0.15, size=int(dropout_mask.sum()))
+        scale[dropout_mask] *= 5
+    if noise > 0:
+        frames[..., :2] += rng.normal(0.0, 1.0, size=(n, 33, 2)) * scale
+        frames[..., 2] += rng.normal(0.0, 1.0, size=(n, 33)) * scale[..., 0] * Z_NOISE_SCALE
+    frames[..., 3] = np.clip(visibility, 0.0, 1.0)
+    return frames
+
+
+# ---------- Sequences ----------
+def timeline(exercise: str, reps: int, tempo: float = None, rom: float = 1.0, partial_reps: int = 0,
+             pause: float = 0.5, lead_in: float = 1.0, fps: int = 30, rng=None, max_frames: int = None) -> tuple:
+    """Per-frame (phase, depth) arrays and the frame each full rep ends on.
+
+    Reps vary in tempo by up to 10%; partial reps are shuffled in between. With
+    ``max_frames`` only reps that fit completely are kept and the rest is standing.
+    """
+    rng = rng if rng is not None else np.random.default_rng(0)
+    tempo = tempo or DEFAULT_TEMPO[exercise]
+    kinds = np.array([True] * reps + [False] * partial_reps)
+    rng.shuffle(kinds)
+    phase = [np.zeros(int(round(lead_in * fps)))]
+    depth = [np.zeros(len(phase[0]))]
+    used, rep_ends = len(phase[0]), []
+    for full in kinds:
+        frames = max(4, int(round(tempo * rng.uniform(0.9, 1.1) * fps)))
+        rest = int(round(pause * fps))
+        if max_frames is not None and used + frames > max_frames:
+            break
+        phase += [np.arange(frames) / (frames - 1), np.zeros(rest)]
+        depth += [np.full(frames, rom if full else rom * PARTIAL_DEPTH), np.zeros(rest)]
+        used += frames + rest
+        if full:
+            rep_ends.append(used - rest - 1)
+    tail = int(round(lead_in * fps)) if max_frames is None else max(0, max_frames - used)
+    phase.append(np.zeros(tail))
+    depth.append(np.zeros(tail))
+    phase, depth = np.concatenate(phase), np.concatenate(depth)
+    if max_frames is not None:
+        phase, depth = phase[:max_frames], depth[:max_frames]
+    return phase, depth, rep_ends
+
+
+def generate(exercise: str, reps: int = 10, tempo: float = None, rom: float = 1.0, noise: float = 0.002,
+             dropout: float = 0.0, camera_yaw: float = 0.0, fps: int = 30, partial_reps: int = 0,
+             pause: float = 0.5, lead_in: float = 1.0, seed: int = 0) -> tuple:
+    """One synthetic session: ((frames, 33, 4) float32 landmarks, ground-truth info).
+
+    The same arguments always produce the same array.
+    """
+    rng = np.random.default_rng(seed)
+    phase, depth, rep_ends = timeline(exercise, reps, tempo, rom, partial_reps, pause, lead_in, fps, rng)
+    frames = render(exercise, phase, depth, camera_yaw, noise, dropout, rng)
+    info = {
+        "exercise": exercise,
+        "reps": 0 if exercise == "plank" else len(rep_ends),
+        "partial_reps": partial_reps,
+        "rep_end_frames": rep_ends,
+        "frames": len(frames),
+        "fps": fps,
+        "params": {"tempo": tempo or DEFAULT_TEMPO[exercise], "rom": rom, "noise": noise, "dropout": dropout,
+                   "camera_yaw": camera_yaw, "pause": pause, "lead_in": lead_in, "seed": seed},
+    }
+    return frames, info
+
+
+def as_landmarks(frame) -> LandmarkList:
+    return LandmarkList(frame)
+
+
+# ---------- Concurrent Streams ----------
+class SyntheticStreams:
+    """Many independent sessions advanced in lockstep, rendered one (K, 33, 4) tick at a time.
+
+    Stream ``i`` runs ``exercises[i % len(exercises)]`` with its own tempo, camera
+    angle and rep order; frames are computed on demand and vectorized across streams,
+    so thousands of streams cost one batch of array operations per tick. Tick ``t``
+    is the same whatever order or chunking it is requested in.
+    """
+
+    def __init__(self, count: int, exercises=None, seconds: float = 60.0, fps: int = 30, seed: int = 0,
+                 noise: float = 0.002, dropout: float = 0.0, rom: float = 1.0, max_yaw: float = 30.0,
+                 partial_reps: int = 1):
+        self.count = count
+        self.exercises = list(exercises or COUNTED_EXERCISES)
+        self.fps = fps
+        self.frames = int(seconds * fps)
+        self.seed = seed
+        self.noise = noise
+        self.dropout = dropout
+        self.exercise = [self.exercises[i % len(self.exercises)] for i in range(count)]
+        self.phase = np.zeros((count, self.frames), dtype=np.float32)
+        self.depth = np.zeros((count, self.frames), dtype=np.float32)
+        self.yaw = np.zeros(count)
+        self.truth = []
+        for i, exercise in enumerate(self.exercise):
+            rng = np.random.default_rng((seed, i))
+            tempo = DEFAULT_TEMPO[exercise] * rng.uniform(0.8, 1.25)
+            reps = int(self.frames / (tempo * fps)) + 1
+            phase, depth, rep_ends = timeline(exercise, reps, tempo, rom, partial_reps, rng.uniform(0.2, 1.0),
+                                              rng.uniform(0.5, 2.0), fps, rng, max_frames=self.frames)
+            self.phase[i], self.depth[i] = phase, depth
+            self.yaw[i] = rng.uniform(-max_yaw, max_yaw)
+            self.truth.append(0 if exercise == "plank" else len(rep_ends))
+        self._groups = {exercise: np.array([i for i, name in enumerate(self.exercise) if name == exercise])
+                        for exercise in self.exercises}
+
+    def __len__(self):
+        return self.frames
+
+    def frame(self, t: int) -> np.ndarray:
+        """Landmarks of every stream at tick ``t``: (count, 33, 4) float32"""
+        rng = np.random.default_rng((self.seed, 0, t))
+        dropout_mask = None
+        if self.dropout > 0:
+            burst_rng = np.random.default_rng((self.seed, 1, t // DROPOUT_BURST))
+            dropout_mask = burst_rng.random((self.count, 33)) < self.dropout
+        out = np.empty((self.count, 33, 4), dtype=np.float32)
+        for exercise, indices in self._groups.items():
+            if len(indices):
+                mask = dropout_mask[indices] if dropout_mask is not None else None
+                out[indices] = render(exercise, self.phase[indices, t], self.depth[indices, t], self.yaw[indices],
+                                      self.noise, 0.0, rng, dropout_mask=mask)
+        return out
+
+    def window(self, start: int, stop: int) -> np.ndarray:
+        """Ticks ``start``..``stop``: (stop - start, count, 33, 4)"""
+        return np.stack([self.frame(t) for t in range(start, min(stop, self.frames))])
+
+    def __iter__(self):
+        for t in range(self.frames):
+            yield self.frame(t)
+
+
+# ---------- Measurements ----------
+def count_reps(exercise: str, frames, width: int = 1280, height: int = 720) -> int:
+    """Run the app's rep counter over a (frames, 33, 4) sequence"""
+    scorer = ExerciseScorer(exercise)
+    for frame in frames:
+        scorer.update(as_landmarks(frame), width, height)
+    return scorer.counter
+
+
+def accuracy(exercises=None, sessions: int = 50, seed: int = 0, noise: float = 0.002, dropout: float = 0.0,
+             max_yaw: float = 30.0, rom: float = 1.0) -> dict:
+    """Rep-counter accuracy against ground truth over randomized sessions per exercise.
+
+    Returns {exercise: {"sessions", "exact", "mean_abs_error", "over", "under"}}.
+    """
+    results = {}
+    for e, exercise in enumerate(exercises or COUNTED_EXERCISES):
+        errors = []
+        for i in range(sessions):
+            rng = np.random.default_rng((seed, e, i))
+            frames, info = generate(exercise, reps=int(rng.integers(5, 16)),
+                                    tempo=DEFAULT_TEMPO[exercise] * rng.uniform(0.8, 1.25), rom=rom, noise=noise,
+                                    dropout=dropout, camera_yaw=rng.uniform(-max_yaw, max_yaw),
+                                    partial_reps=int(rng.integers(0, 3)), seed=int(rng.integers(2 ** 31)))
+            errors.append(count_reps(exercise, frames) - info["reps"])
+        errors = np.array(errors)
+        results[exercise] = {
+            "sessions": sessions,
+            "exact": float(np.mean(errors == 0)),
+            "mean_abs_error": float(np.mean(np.abs(errors))),
+            "over": int(np.sum(errors > 0)),
+            "under": int(np.sum(errors < 0)),
+        }
+    return results
+
+
+def throughput(streams: int = 1000, seconds: float = 10.0, fps: int = 30, seed: int = 0,
+               noise: float = 0.002, dropout: float = 0.0, batch: bool = False) -> dict:
+    """Single-core scoring throughput over many concurrent synthetic sessions.
+
+    Only CPU time spent inside the scorers counts towards ``sessions_per_core``
+    (real-time sessions one core can score at ``fps``); generation is reported separately.
+    With ``batch`` all sessions are stepped together by one BatchScorer.
+    """
+    source = SyntheticStreams(streams, seconds=seconds, fps=fps, seed=seed, noise=noise, dropout=dropout)
+    if batch:
+        batch_scorer = BatchScorer(source.exercise)
+    else:
+        scorers = [ExerciseScorer(exercise) for exercise in source.exercise]
+    generate_seconds = score_seconds = 0.0
+    for t in range(len(source)):
+        started = time.process_time()
+        landmarks = source.frame(t)
+        generated = time.process_time()
+        if batch:
+            batch_scorer.step(landmarks, 1280, 720)
+        else:
+            for scorer, frame in zip(scorers, landmarks):
+                scorer.update(as_landmarks(frame), 1280, 720)
+        score_seconds += time.process_time() - generated
+        generate_seconds += generated - started
+    frames = streams * len(source)
+    counters = batch_scorer.counter if batch else [scorer.counter for scorer in scorers]
+    counted = [i for i, exercise in enumerate(source.exercise) if exercise != "plank"]
+    exact = sum(counters[i] == source.truth[i] for i in counted) / max(1, len(counted))
+    return {
+        "streams": streams,
+        "frames": frames,
+        "score_us_per_frame": 1e6 * score_seconds / frames,
+        "generate_us_per_frame": 1e6 * generate_seconds / frames,
+        "sessions_per_core": frames / score_seconds / fps if score_seconds else float("inf"),
+        "exact": exact,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic pose landmarks for load and accuracy testing")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate_parser = commands.add_parser("generate", help="Write one session to .lmk or .npy (plus ground truth .json)")
+    generate_parser.add_argument("exercise", choices=sorted(KEYFRAMES))
+    generate_parser.add_argument("out", help="Output .lmk (binary landmark format) or .npy path")
+    generate_parser.add_argument("--reps", type=int, default=10)
+    generate_parser.add_argument("--tempo", type=float, default=None, help="Seconds per rep")
+    generate_parser.add_argument("--rom", type=float, default=1.0, help="Range of motion (1 = full)")
+    generate_parser.add_argument("--partial-reps", type=int, default=0)
+    generate_parser.add_argument("--camera-yaw", type=float, default=0.0, help="Degrees away from side-on")
+    generate_parser.add_argument("--fps", type=int, default=30)
+    for sub in (generate_parser,
+                commands.add_parser("accuracy", help="Rep-counter accuracy against ground truth"),
+                commands.add_parser("throughput", help="Sessions per core over concurrent streams")):
+        sub.add_argument("--noise", type=float, default=0.002, help="Landmark noise (fraction of the frame)")
+        sub.add_argument("--dropout", type=float, default=0.0, help="Chance a landmark drops out per burst")
+        sub.add_argument("--seed", type=int, default=0)
+    accuracy_parser = commands.choices["accuracy"]
+    accuracy_parser.add_argument("--sessions", type=int, default=50, help="Sessions per exercise")
+    accuracy_parser.add_argument("--rom", type=float, default=1.0)
+    accuracy_parser.add_argument("--max-yaw", type=float, default=30.0)
+    throughput_parser = commands.choices["throughput"]
+    throughput_parser.add_argument("--streams", type=int, default=1000)
+    throughput_parser.add_argument("--seconds", type=float, default=10.0)
+    throughput_parser.add_argument("--fps", type=int, default=30)
+    throughput_parser.add_argument("--batch", action="store_true", help="Score all streams with one BatchScorer")
+    cli_args = parser.parse_args()
+
+    if cli_args.command == "generate":
+        frames, info = generate(cli_args.exercise, cli_args.reps, cli_args.tempo, cli_args.rom, cli_args.noise,
+                                cli_args.dropout, cli_args.camera_yaw, cli_args.fps, cli_args.partial_reps,
+                                seed=cli_args.seed)
+        if cli_args.out.endswith(".lmk"):
+            from landmark_format import DEFAULT_KEYFRAME_INTERVAL, LandmarkFormat, encode_frames
+            with open(cli_args.out, 'wb') as f:
+                f.write(encode_frames(frames, LandmarkFormat(True, DEFAULT_KEYFRAME_INTERVAL), cli_args.fps))
+        else:
+            np.save(cli_args.out, frames)
+        with open(cli_args.out.rsplit(".", 1)[0] + ".json", 'w', encoding='utf-8') as f:
+            json.dump(info, f, indent=2)
+        print(f"Wrote {frames.shape} to {cli_args.out} ({info['reps']} reps)")
+    elif cli_args.command == "accuracy":
+        results = accuracy(sessions=cli_args.sessions, seed=cli_args.seed, noise=cli_args.noise,
+                           dropout=cli_args.dropout, max_yaw=cli_args.max_yaw, rom=cli_args.rom)
+        print(f"{'exercise':<10}{'exact':>8}{'mean |err|':>12}{'over':>6}{'under':>7}")
+        for exercise, result in results.items():
+            print(f"{exercise:<10}{result['exact']:>8.1%}{result['mean_abs_error']:>12.2f}"
+                  f"{result['over']:>6}{result['under']:>7}")
+    else:
+        result = throughput(cli_args.streams, cli_args.seconds, cli_args.fps, cli_args.seed,
+                            cli_args.noise, cli_args.dropout, cli_args.batch)
+        print(f"{result['streams']} streams, {result['frames']:,} frames: "
+              f"{result['score_us_per_frame']:.1f} us/frame scoring, "
+              f"{result['generate_us_per_frame']:.1f} us/frame generating, "
+              f"{result['sessions_per_core']:.0f} sessions per core at {cli_args.fps} fps, "
+              f"{result['exact']:.1%} exact rep counts")
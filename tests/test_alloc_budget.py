@@ -0,0 +1,38 @@
+import json
+import os
+import sys
+
+import pytest
+
+from alloc_budget import BUDGET_PATH, STAGES, _session, _stage, check, measure, run
+
+BUDGET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), BUDGET_PATH)
+
+
+@pytest.fixture(scope="module")
+def budget():
+    with open(BUDGET, 'r', encoding='utf-8') as f:
+        budget = json.load(f)
+    if budget.get("python") != f"{sys.version_info.major}.{sys.version_info.minor}":
+        pytest.skip(f"Budget was measured on Python {budget.get('python')}; object sizes differ between versions")
+    return budget
+
+
+@pytest.fixture(scope="module")
+def report():
+    return run()
+
+
+@pytest.mark.parametrize("stage", STAGES)
+def test_stage_within_budget(stage, report, budget):
+    assert stage in budget["stages"]
+    assert check({stage: report[stage]}, budget) == []
+
+
+def test_leaking_stage_fails_budget(budget):
+    frames = _session("squat", reps=4, seed=0)
+    score = _stage("score", "squat")
+    kept = []
+    # One list slot per frame is the smallest leak the budget has to catch
+    result = measure(lambda landmarks: kept.append(score(landmarks)), frames)
+    assert check({"score": result}, budget)
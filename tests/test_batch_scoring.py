@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from batch_scoring import BatchScorer
+from scoring import ExerciseScorer, LandmarkList
+from synthetic import COUNTED_EXERCISES, SyntheticStreams
+
+EXERCISES = COUNTED_EXERCISES + ["plank"]
+
+
+@pytest.mark.parametrize("best_side", [False, True])
+def test_batch_matches_scorer_frame_by_frame(best_side):
+    streams = SyntheticStreams(len(EXERCISES) * 2, exercises=EXERCISES, seconds=12, seed=3, max_yaw=10,
+                               noise=0.002, dropout=0.02)
+    batch = BatchScorer(streams.exercise, best_side=best_side)
+    scorers = [ExerciseScorer(exercise, best_side=best_side) for exercise in streams.exercise]
+    for t in range(len(streams)):
+        landmarks = streams.frame(t)
+        completed = batch.step(landmarks, 1280, 720)
+        for i, (scorer, frame) in enumerate(zip(scorers, landmarks)):
+            rep = scorer.update(LandmarkList(frame), 1280, 720)
+            assert bool(completed[i]) == bool(rep), (t, i)
+            assert batch.counter[i] == scorer.counter, (t, i)
+            assert batch.form_score[i] == scorer.form_score, (t, i)
+            assert batch.feedback(i) == (scorer.feedback, scorer.color), (t, i)
+    # Every exercise really counted reps, so the comparison covered the rep state machines
+    assert {exercise for scorer, exercise in zip(scorers, streams.exercise) if scorer.counter} == set(COUNTED_EXERCISES)
+
+
+def test_reset_starts_a_fresh_session():
+    streams = SyntheticStreams(2, exercises=["squat"], seconds=8, seed=1)
+    batch = BatchScorer(streams.exercise)
+    for t in range(len(streams)):
+        batch.step(streams.frame(t))
+    assert batch.counter[0] > 0
+    batch.reset([0])
+    assert batch.counter[0] == 0 and batch.counter[1] > 0
+    fresh = ExerciseScorer("squat")
+    for t in range(len(streams)):
+        batch.step(streams.frame(t))
+        fresh.update(LandmarkList(streams.frame(t)[0]), 1280, 720)
+    assert batch.counter[0] == fresh.counter
+    assert np.isfinite(batch.rep_angle[0])
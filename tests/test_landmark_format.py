@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from landmark_format import (DELTA_STEP, FILE_HEADER, KIND_KEY, RECORD_HEADER, LandmarkDecoder, LandmarkEncoder,
+                             LandmarkFormat, decode_frames, encode_frames)
+from synthetic import generate
+
+FORMATS = [LandmarkFormat(), LandmarkFormat(float16=True), LandmarkFormat(float16=True, keyframe_interval=30),
+           LandmarkFormat(keyframe_interval=7)]
+
+
+@pytest.fixture(scope="module")
+def frames():
+    # Dropouts make visibility jump, so large-shift delta records are covered too
+    frames, _ = generate("burpee", reps=3, noise=0.002, dropout=0.02, seed=0)
+    return frames.astype(np.float32)
+
+
+def _records(data, fmt):
+    """Each record of a stream as bytes"""
+    body, offset = bytes(data[FILE_HEADER.size:]), 0
+    while offset < len(body):
+        _, kind, _ = RECORD_HEADER.unpack_from(body, offset)
+        size = (fmt.key_dtype if kind == KIND_KEY else fmt.delta_dtype).itemsize
+        yield body[offset:offset + size]
+        offset += size
+
+
+def _bound(fmt, kind, shift, frame):
+    """Worst-case absolute error of one record"""
+    if kind == KIND_KEY:
+        return 0.0 if not fmt.float16 else np.abs(frame) * 2.0 ** -11 + 1e-7
+    return ((2 ** (shift - 1) if shift else 0) + 0.5) * DELTA_STEP + 1e-6
+
+
+@pytest.mark.parametrize("fmt", FORMATS, ids=lambda fmt: str(fmt.to_dict()))
+def test_encoder_matches_whole_stream(fmt, frames):
+    # 100 frames is not a multiple of the keyframe interval, so the tail block is covered
+    encoder = LandmarkEncoder(fmt)
+    streamed = fmt.header(30.0) + b"".join(encoder.encode(seq, frame) for seq, frame in enumerate(frames[:100]))
+    assert streamed == encode_frames(frames[:100], fmt, fps=30.0)
+
+
+@pytest.mark.parametrize("fmt", FORMATS, ids=lambda fmt: str(fmt.to_dict()))
+def test_round_trip_within_bounds(fmt, frames):
+    data = encode_frames(frames, fmt, start_seq=5)
+    decoded, seqs, decoded_fmt, fps = decode_frames(data)
+    assert decoded_fmt.to_dict() == fmt.to_dict() and fps == 30.0
+    assert decoded.shape == frames.shape
+    assert np.array_equal(seqs, np.arange(5, 5 + len(frames)))
+
+    decoder = LandmarkDecoder(fmt)
+    for i, record in enumerate(_records(data, fmt)):
+        seq, kind, shift = RECORD_HEADER.unpack_from(record)
+        streamed_seq, streamed = decoder.decode(record)
+        assert streamed_seq == seq == 5 + i
+        # The streaming decoder and the whole-stream decoder agree exactly
+        assert np.array_equal(np.asarray(streamed, dtype=np.float32), decoded[i].astype(np.float32))
+        error = np.abs(decoded[i].astype(np.float32) - frames[i])
+        assert np.all(error <= _bound(fmt, kind, shift, frames[i])), (i, kind, shift, float(error.max()))
+
+
+def test_float32_keyframes_are_exact(frames):
+    decoded, _, _, _ = decode_frames(encode_frames(frames, LandmarkFormat()))
+    assert np.array_equal(decoded, frames)
+
+
+def test_smooth_motion_stays_within_one_step(frames):
+    fmt = LandmarkFormat(keyframe_interval=30)
+    smooth = frames.copy()
+    smooth[..., 3] = 0.9  # no visibility dropouts
+    smooth[..., :3] = np.cumsum(np.full_like(smooth[..., :3], 1e-4), axis=0) + smooth[:1, :, :3]
+    decoded, _, _, _ = decode_frames(encode_frames(smooth, fmt))
+    assert np.abs(decoded - smooth).max() <= DELTA_STEP / 2 + 1e-6
+
+
+def test_truncated_stream_and_short_record_are_rejected(frames):
+    fmt = LandmarkFormat(float16=True, keyframe_interval=30)
+    data = encode_frames(frames[:40], fmt)
+    with pytest.raises(ValueError):
+        decode_frames(data[:-3])
+    with pytest.raises(ValueError):
+        LandmarkDecoder(fmt).decode(b"\x00\x01")
@@ -0,0 +1,81 @@
+import csv
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import log_store
+from analytics import LOG_COLUMNS
+from log_store import GroupCommitWriter, _bench_station, backup_shards, commit_rows
+
+
+def _row(user, reps):
+    return {"timestamp": "2025-08-16T18:19:12", "user": user, "exercise": "squat", "reps": reps,
+            "avg_score": 80.0, "duration_sec": 30.0, "calories": 4.2}
+
+
+def _read_lines(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_concurrent_stations_write_every_row_once(tmp_path):
+    path = str(tmp_path / "sessions.csv")
+    stations, threads, rows = 4, 3, 20
+    start_at = time.time() + 0.5
+    # Spawned, so no station inherits another process's writer thread
+    with ProcessPoolExecutor(stations, mp_context=multiprocessing.get_context("spawn")) as pool:
+        list(pool.map(_bench_station, [(path, s, threads, rows, start_at) for s in range(stations)]))
+    lines = _read_lines(path)
+    assert lines[0] == LOG_COLUMNS
+    body = lines[1:]
+    assert all(len(line) == len(LOG_COLUMNS) for line in body)
+    assert LOG_COLUMNS not in body
+    keys = [(line[1], int(line[3])) for line in body]
+    expected = {(f"station{s}_{t}", i) for s in range(stations) for t in range(threads) for i in range(rows)}
+    assert len(keys) == len(expected) and set(keys) == expected
+
+
+def test_rows_arriving_together_share_a_commit(tmp_path, monkeypatch):
+    path = str(tmp_path / "sessions.csv")
+    batches = []
+    real_commit = log_store.commit_rows
+
+    def recording_commit(rows, path):
+        batches.append(len(rows))
+        return real_commit(rows, path)
+
+    monkeypatch.setattr(log_store, "commit_rows", recording_commit)
+    writer = GroupCommitWriter(path, window=0.5)
+    futures = [writer.submit(_row("ann", i)) for i in range(100)]
+    assert all(future.result(10) is True for future in futures)
+    writer.close()
+    assert sum(batches) == 100 and len(batches) < 100
+    assert [int(line[3]) for line in _read_lines(path)[1:]] == list(range(100))
+
+
+def test_header_written_once_and_torn_tail_trimmed(tmp_path):
+    path = str(tmp_path / "sessions.csv")
+    commit_rows([_row("ann", 1)], path)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write("2025-08-16T18:20:00,bob,squ")  # a crash mid-write, never acknowledged
+    commit_rows([_row("cat", 2), _row("dan", 3)], path)
+    lines = _read_lines(path)
+    assert lines[0] == LOG_COLUMNS
+    assert [line[1] for line in lines[1:]] == ["ann", "cat", "dan"]
+
+
+def test_failed_commit_falls_back_to_backup_shard(tmp_path, monkeypatch):
+    path = str(tmp_path / "sessions.csv")
+
+    def failing_commit(rows, path):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(log_store, "commit_rows", failing_commit)
+    writer = GroupCommitWriter(path)
+    outcome = writer.append(_row("ann", 1))
+    writer.close()
+    assert outcome in backup_shards(path)
+    lines = _read_lines(outcome)
+    assert lines[0] == LOG_COLUMNS and lines[1][1] == "ann"
+    assert not os.path.exists(path)
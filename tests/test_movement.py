@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from movement import REFERENCE_ANGLES, RepComparator, compare_rep, default_reference
+
+
+@pytest.mark.parametrize("exercise", sorted(REFERENCE_ANGLES))
+def test_identical_rep_scores_100(exercise):
+    reference = default_reference(exercise).tolist()
+    assert compare_rep(reference, reference) == 100
+
+
+def test_identical_rep_has_no_error():
+    reference = default_reference("squat").tolist()
+    comparator = RepComparator(reference)
+    for angle in reference:
+        comparator.push(angle)
+    assert comparator.mean_error() == pytest.approx(0.0, abs=1e-6)
+
+
+def test_partial_rep_scores_lower():
+    reference = default_reference("squat")
+    partial = reference[0] + (reference - reference[0]) * 0.5
+    assert compare_rep(reference.tolist(), partial.tolist()) < 60
+
+
+def test_comparator_resets_between_reps():
+    reference = default_reference("pushup").tolist()
+    comparator = RepComparator(reference)
+    noisy = (np.array(reference) + np.random.default_rng(0).normal(0, 5, len(reference))).tolist()
+    for angle in noisy:
+        comparator.push(angle)
+    comparator.finish()
+    for angle in reference:
+        comparator.push(angle)
+    assert comparator.finish() == 100
@@ -0,0 +1,154 @@
+import glob
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+from utils import atomic_write_json
+
+TIMELINE_DIR = "logs/timelines"
+# Buckets kept per session; a one-hour session ends up with 16-second buckets
+DEFAULT_CAPACITY = 240
+BUCKET_SECONDS = 1.0
+FORM_SERIES = "form_score"
+
+
+class ScoreTimeline:
+    """Fixed-size summary of a session: mean, min and max of each series per time bucket.
+
+    Buckets start one second wide. When a sample lands past the last bucket, adjacent
+    buckets are merged in pairs and the bucket width doubles, so memory is
+    ``capacity`` buckets whatever the session length, with the whole session always
+    covered at even resolution. Rep completions are counted per bucket the same way.
+
+    Samples accumulate into plain floats for the current bucket and reach the arrays
+    once per bucket, so ``add`` costs a few additions per frame.
+    """
+
+    def __init__(self, angle_names: list = (), capacity: int = DEFAULT_CAPACITY, bucket_seconds: float = BUCKET_SECONDS):
+        if capacity < 2 or capacity % 2:
+            raise ValueError("capacity must be an even number of buckets")
+        self.angle_names = list(angle_names)
+        self.series = [FORM_SERIES] + self.angle_names
+        self.capacity = capacity
+        self.bucket_seconds = bucket_seconds
+        shape = (capacity, len(self.series))
+        self.sums = np.zeros(shape)
+        self.counts = np.zeros(shape, dtype=np.int64)
+        self.mins = np.full(shape, np.inf)
+        self.maxs = np.full(shape, -np.inf)
+        self.reps = np.zeros(capacity, dtype=np.int64)
+        self.used = 0
+        self._bucket = 0
+        self._sum = [0.0] * len(self.series)
+        self._count = [0] * len(self.series)
+        self._min = [float("inf")] * len(self.series)
+        self._max = [float("-inf")] * len(self.series)
+        self._reps = 0
+
+    def add(self, t: float, form_score, angles: dict = None) -> None:
+        """Record one scored frame ``t`` seconds into the session (angles that are None are skipped)"""
+        bucket = int(t / self.bucket_seconds)
+        if bucket != self._bucket:
+            self._move_to(bucket)
+        self._accumulate(0, form_score)
+        if angles is not None:
+            i = 1
+            for name in self.angle_names:
+                self._accumulate(i, angles.get(name))
+                i += 1
+
+    def _accumulate(self, i: int, value):
+        if value is None:
+            return
+        self._sum[i] += value
+        self._count[i] += 1
+        if value < self._min[i]:
+            self._min[i] = value
+        if value > self._max[i]:
+            self._max[i] = value
+
+    def rep(self, t: float) -> None:
+        bucket = int(t / self.bucket_seconds)
+        if bucket != self._bucket:
+            self._move_to(bucket)
+        self._reps += 1
+
+    def _move_to(self, bucket: int):
+        self._flush()
+        while bucket >= self.capacity:
+            self._merge_pairs()
+            bucket //= 2
+        self._bucket = max(bucket, 0)
+
+    def _flush(self):
+        """Fold the current bucket's accumulators into the arrays"""
+        if not any(self._count) and not self._reps:
+            return
+        row = self._bucket
+        self.sums[row] += self._sum
+        self.counts[row] += self._count
+        np.minimum(self.mins[row], self._min, out=self.mins[row])
+        np.maximum(self.maxs[row], self._max, out=self.maxs[row])
+        self.reps[row] += self._reps
+        self.used = max(self.used, row + 1)
+        for i in range(len(self.series)):
+            self._sum[i] = 0.0
+            self._count[i] = 0
+            self._min[i] = float("inf")
+            self._max[i] = float("-inf")
+        self._reps = 0
+
+    def _merge_pairs(self):
+        """Halve the resolution: bucket i becomes buckets 2i and 2i+1 combined"""
+        half = self.capacity // 2
+        for array, combine, empty in ((self.sums, np.add, 0), (self.counts, np.add, 0), (self.reps, np.add, 0),
+                                      (self.mins, np.minimum, np.inf), (self.maxs, np.maximum, -np.inf)):
+            array[:half] = combine(array[0::2], array[1::2])
+            array[half:] = empty
+        self.used = (self.used + 1) // 2
+        self.bucket_seconds *= 2
+
+    def to_dict(self) -> dict:
+        """JSON-ready summary of the buckets used so far (means, mins and maxes rounded to 0.1)"""
+        self._flush()
+        used = self.used
+        counts = self.counts[:used]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = self.sums[:used] / counts
+        series = {}
+        for j, name in enumerate(self.series):
+            seen = counts[:, j] > 0
+            series[name] = {
+                "mean": [round(float(v), 1) if ok else None for v, ok in zip(means[:, j], seen)],
+                "min": [round(float(v), 1) if ok else None for v, ok in zip(self.mins[:used, j], seen)],
+                "max": [round(float(v), 1) if ok else None for v, ok in zip(self.maxs[:used, j], seen)],
+            }
+        return {
+            "bucket_seconds": self.bucket_seconds,
+            "buckets": used,
+            "series": series,
+            "rep_events": self.reps[:used].tolist(),
+        }
+
+
+# ---------- Storage ----------
+def save_timeline(session_id: str, timeline: ScoreTimeline, meta: dict = None, out_dir: str = TIMELINE_DIR) -> str:
+    """Write a session's timeline next to the others as ``<session_id>.json``"""
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{session_id}.json")
+    atomic_write_json(path, {"session_id": session_id, "saved_at": datetime.now().isoformat(),
+                             **(meta or {}), **timeline.to_dict()})
+    return path
+
+
+def list_timelines(out_dir: str = TIMELINE_DIR, limit: int = 50) -> list:
+    """Timeline files, newest first"""
+    paths = glob.glob(os.path.join(out_dir, "*.json"))
+    return sorted(paths, key=os.path.getmtime, reverse=True)[:limit]
+
+
+def load_timeline(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
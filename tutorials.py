@@ -115,5 +115,13 @@ def show_tutorial(exercise):
     for i, point in enumerate(tutorial['key_points'], 1):
         st.markdown(f"**{i}.** {point}")
     
+    # Reference movement every rep is compared against
+    from movement import load_references
+    reference = load_references().get(exercise)
+    if reference is not None:
+        st.markdown("### Reference Movement")
+        st.line_chart(reference, height=180)
+        st.caption("Joint angle (degrees) through one ideal rep. Each rep you complete is scored against this curve.")
+    
     # Add a note about the form
     st.info("Note: Pay attention to the key points for proper execution.")
\ No newline at end of file
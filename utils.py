@@ -1,9 +1,14 @@
 import math
 import os
 import time
-import csv
 import json
-from datetime import datetime, timedelta
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 # ---------- Geometry ----------
 # Dictionary to store angle history for temporal smoothing
@@ -69,7 +74,7 @@ def calculate_angle_3d(a, b, c, confidences=None):
     
     return angle
 
-def smooth_angle(angle_key, current_angle, window_size=5, weight_recent=0.7, confidence=None):
+def smooth_angle(angle_key, current_angle, window_size=5, weight_recent=0.7, confidence=None, history=None):
     """Apply temporal smoothing to angle measurements to reduce jitter.
     
     Args:
@@ -78,47 +83,50 @@ def smooth_angle(angle_key, current_angle, window_size=5, weight_recent=0.7, con
         window_size: Number of frames to consider for smoothing
         weight_recent: Weight given to more recent measurements (0-1)
         confidence: Optional confidence score (0-1) for current measurement
+        history: Optional dict to keep the smoothing state in (defaults to the
+                 module-wide history; pass one per session to keep sessions apart)
         
     Returns:
         Smoothed angle value
     """
-    global angle_history
+    if history is None:
+        history = angle_history
     
     # Handle None values (low confidence measurements)
     if current_angle is None:
         # If we have history, return the most recent valid angle
-        if angle_key in angle_history and angle_history[angle_key]:
+        if angle_key in history and history[angle_key]:
             # Return the most recent angle from history
-            return angle_history[angle_key][-1][0]  # [0] is the angle, [1] is confidence
+            return history[angle_key][-1][0]  # [0] is the angle, [1] is confidence
         else:
             # No history and current is None, return a default
             return 0.0
     
     # Initialize history for this angle if it doesn't exist
-    if angle_key not in angle_history:
-        angle_history[angle_key] = []
+    if angle_key not in history:
+        history[angle_key] = []
     
     # Store both angle and confidence
     if confidence is None:
         confidence = 1.0  # Default confidence if not provided
     
     # Add current angle and confidence to history
-    angle_history[angle_key].append((current_angle, confidence))
+    history[angle_key].append((current_angle, confidence))
     
     # Keep only the most recent measurements based on window size
-    if len(angle_history[angle_key]) > window_size:
-        angle_history[angle_key] = angle_history[angle_key][-window_size:]
+    if len(history[angle_key]) > window_size:
+        history[angle_key] = history[angle_key][-window_size:]
     
     # Apply weighted average (more weight to recent and high-confidence measurements)
-    if len(angle_history[angle_key]) == 1:
+    if len(history[angle_key]) == 1:
         return current_angle
     
     total_weight = 0
     weighted_sum = 0
     
-    for i, (angle, conf) in enumerate(angle_history[angle_key]):
+    for i, (angle, conf) in enumerate(history[angle_key]):
         # Calculate weight based on recency and confidence
-        recency_factor = i / (len(angle_history[angle_key]) - 1)
+        recency_factor = i / (len(history[angle_key]) - 1)
         recency_weight = 1 + recency_factor * (weight_recent - 1)
         
         # Combine recency weight with confidence
@@ -311,28 +319,8 @@ ACHIEVEMENTS = {
 
 def check_achievements(user_data: dict, workout_data: dict) -> list:
     """Check which achievements should be unlocked based on workout data"""
-    new_achievements = []
-    
-    # First workout
-    if user_data.get("total_workouts", 0) == 0:
-        new_achievements.append("first_workout")
-    
-    # Perfect form
-    if workout_data.get("avg_score", 0) >= 95:
-        new_achievements.append("perfect_form")
-    
-    # Calorie burner
-    if workout_data.get("calories", 0) >= 500:
-        new_achievements.append("calorie_burner")
-    
-    # Speed demon
-    if workout_data.get("duration_sec", 0) < 600:  # 10 minutes
-        new_achievements.append("speed_demon")
-    
-    # Consistency check (would need weekly data)
-    # This is a placeholder for future implementation
-    
-    return new_achievements
+    from achievement_engine import get_engine
+    return get_engine().evaluate(user_data, workout_data)
 
 # ---------- Workout Planning ----------
 def generate_workout_plan(fitness_goal: str, experience_level: str, available_time: int) -> dict:
@@ -389,33 +377,41 @@ def session_filename(prefix: str, ext: str) -> str:
     ensure_dirs()
     return os.path.join(prefix, f"session_{ts}.{ext}")
 
+@contextmanager
+def log_lock(path: str = "logs/sessions.csv", shared: bool = False):
+    """Advisory lock around a session log, shared by appends, readers and compaction.
+
+    Writers take it exclusively; readers take it shared just long enough to open
+    their files. A no-op where ``fcntl`` is unavailable.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
 def append_log(row: dict, path: str = "logs/sessions.csv"):
-    """Append workout session data to CSV log"""
+    """Append workout session data to CSV log.
+
+    Goes through the process-wide group-commit writer (log_store.get_writer) and returns
+    once the row is on disk: True, or the backup shard path if the log itself failed.
+    """
+    from log_store import get_writer
+    from metrics import REGISTRY
     ensure_dirs()
-    file_exists = os.path.exists(path)
-    
+    started = time.perf_counter()
     try:
-        with open(path, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=[
-                "timestamp", "user", "exercise", "reps", "avg_score", "duration_sec", "calories"
-            ])
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(row)
+        outcome = get_writer(path).append(row)
+        REGISTRY.histogram("log_write_seconds", "Session log append latency").observe(time.perf_counter() - started)
+        return outcome
     except Exception as e:
-        print(f"Error writing to log: {e}")
-        # Create a backup log file if the main one fails
-        backup_path = path.replace('.csv', f'_backup_{int(time.time())}.csv')
-        try:
-            with open(backup_path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    "timestamp", "user", "exercise", "reps", "avg_score", "duration_sec", "calories"
-                ])
-                writer.writeheader()
-                writer.writerow(row)
-            print(f"Backup log created at: {backup_path}")
-        except Exception as backup_e:
-            print(f"Failed to create backup log: {backup_e}")
+        print(f"Failed to write session log: {e}")
+        return False
 
 def load_user_data(user_id: str = "default") -> dict:
     """Load user data from JSON file"""
@@ -447,9 +443,21 @@ def save_user_data(user_data: dict, user_id: str = "default"):
     """Save user data to JSON file"""
     ensure_dirs()
     filepath = f"user_data/{user_id}.json"
-    
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(user_data, f, indent=2, ensure_ascii=False)
+    atomic_write_json(filepath, user_data)
+
+def atomic_write_json(path: str, data):
+    """Write JSON through a temporary file so readers never see a partial file"""
+    directory = os.path.dirname(path) or "."
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 # ---------- Analytics ----------
 try:
@@ -466,25 +474,12 @@ def calculate_workout_stats(log_path: str = "logs/sessions.csv") -> dict:
         return {}
     
     try:
-        df = pd.read_csv(log_path, encoding='utf-8')
-        if df.empty:
-            return {}
-        
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df['date'] = df['timestamp'].dt.date
-        
-        stats = {
-            "total_workouts": len(df),
-            "total_reps": df['reps'].sum(),
-            "total_calories": df['calories'].sum(),
-            "avg_form_score": df['avg_score'].mean(),
-            "total_duration": df['duration_sec'].sum(),
-            "favorite_exercise": df['exercise'].mode().iloc[0] if not df['exercise'].mode().empty else "None",
-            "workout_frequency": len(df.groupby('date')),
-            "avg_workout_duration": df['duration_sec'].mean()
-        }
-        
-        return stats
+        from analytics import get_engine, stream_workout_stats, STREAMING_THRESHOLD_BYTES
+        from log_store import history_bytes
+        if history_bytes(log_path) > STREAMING_THRESHOLD_BYTES:
+            # Large histories are folded chunk by chunk instead of loaded whole
+            return stream_workout_stats(log_path)
+        return get_engine(log_path).stats()
     except Exception as e:
         print(f"Error calculating stats: {e}")
         return {}
@@ -498,30 +493,8 @@ def get_weekly_progress(log_path: str = "logs/sessions.csv", weeks: int = 4) ->
         return {}
     
     try:
-        df = pd.read_csv(log_path, encoding='utf-8')
-        if df.empty:
-            return {}
-        
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df['date'] = df['timestamp'].dt.date
-        
-        # Get date range
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(weeks=weeks)
-        
-        # Filter data
-        weekly_data = df[df['date'] >= start_date].copy()
-        weekly_data['week'] = weekly_data['date'].apply(lambda x: x.isocalendar()[1])
-        
-        # Group by week
-        weekly_stats = weekly_data.groupby('week').agg({
-            'reps': 'sum',
-            'calories': 'sum',
-            'avg_score': 'mean',
-            'duration_sec': 'sum'
-        }).reset_index()
-        
-        return weekly_stats.to_dict('records')
+        from analytics import get_engine
+        return get_engine(log_path).weekly_progress(weeks)
     except Exception as e:
         print(f"Error getting weekly progress: {e}")
         return {}